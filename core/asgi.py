@@ -3,6 +3,16 @@ ASGI config for the food delivery project.
 
 It exposes the ASGI callable as a module-level variable named
 ``application``. Django's ASGI documentation contains more details.
+
+Serve the site through this application (e.g. ``uvicorn
+core.asgi:application``) to get the live order streams in
+`orders.streams`: they are async views, so every open event stream is a
+suspended coroutine instead of a blocked worker thread. Under WSGI
+(``runserver``, gunicorn) streams are not available: the views answer
+204 and the tracking page and courier dashboard fall back to polling
+(see `core.events.streams_available`). With several worker processes set
+``EVENTS_BROKER=core.events.brokers.SocketBroker`` and run ``python
+manage.py event_broker`` so events reach streams in every worker.
 """
 import os
 from django.core.asgi import get_asgi_application  # type: ignore
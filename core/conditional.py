@@ -0,0 +1,83 @@
+"""
+Conditional GET support (``ETag`` / ``Last-Modified``).
+
+`conditional` wraps a view method with a cheap *validator* function that
+runs before the view. The validator returns a `Validators` tuple: a few
+values that change whenever the page would (typically ``max(updated_at)``
+and a row count from one aggregate query) plus an optional
+last-modified time. If the client's ``If-None-Match`` /
+``If-Modified-Since`` still match, the view is skipped and a bodiless
+304 is returned without rendering anything.
+
+The ETag also covers the current user, because pages show user-specific
+navigation. Validation is skipped while flash messages are pending, since
+those are rendered into the page once. Responses get ``Cache-Control:
+no-cache`` (clients and shared caches must revalidate, which is cheap
+now) and ``private`` for signed-in users.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, NamedTuple
+
+from django.http import HttpRequest, HttpResponse  # type: ignore
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers  # type: ignore
+from django.utils.http import http_date, quote_etag  # type: ignore
+
+
+class Validators(NamedTuple):
+    #: Values that identify the current version of the response
+    parts: tuple
+    last_modified: datetime | None = None
+
+
+def _has_pending_messages(request: HttpRequest) -> bool:
+    storage = getattr(request, '_messages', None)
+    # len() loads stored messages without marking them as shown
+    return storage is not None and len(storage) > 0
+
+
+def _etag(request: HttpRequest, parts: tuple) -> str:
+    user = getattr(request, 'user', None)
+    viewer = user.pk if user is not None and user.is_authenticated else 'anon'
+    digest = hashlib.sha1(repr((viewer, parts)).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional(compute: Callable[..., Validators | None]):
+    """
+    Decorate a ``get`` method with ETag/Last-Modified handling.
+
+    ``compute(request, *args, **kwargs)`` receives the view arguments and
+    returns `Validators`, or ``None`` to serve the request normally.
+    """
+    def decorator(view_method: Callable[..., HttpResponse]):
+        @wraps(view_method)
+        def wrapper(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+            validators = None if _has_pending_messages(request) else compute(request, *args, **kwargs)
+            if validators is None:
+                return view_method(self, request, *args, **kwargs)
+
+            etag = _etag(request, validators.parts)
+            last_modified = int(validators.last_modified.timestamp()) if validators.last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                if last_modified is not None and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                user = getattr(request, 'user', None)
+                if user is not None and user.is_authenticated:
+                    patch_cache_control(response, no_cache=True, private=True)
+                else:
+                    patch_cache_control(response, no_cache=True)
+                patch_vary_headers(response, ('Cookie',))
+            return response
+
+        return wrapper
+
+    return decorator
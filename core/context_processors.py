@@ -1,8 +1,24 @@
 from django.conf import settings
 
+from core.events import streams_available
+
 
 def stripe_public_key(request):
     """Expose the Stripe publishable key to all templates as STRIPE_PUBLIC_KEY."""
     return {
         'STRIPE_PUBLIC_KEY': getattr(settings, 'STRIPE_PUBLIC_KEY', '')
     }
+
+
+def fragment_cache(request):
+    """Lifetime of cached template fragments, for ``{% cache FRAGMENT_CACHE_TTL ... %}``."""
+    return {
+        'FRAGMENT_CACHE_TTL': getattr(settings, 'FRAGMENT_CACHE_TTL', 3600)
+    }
+
+
+def live_events(request):
+    """``live_events``: whether pages can open server-sent event streams (ASGI only)."""
+    return {
+        'live_events': streams_available(request)
+    }
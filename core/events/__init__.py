@@ -0,0 +1,130 @@
+"""
+Server-sent events.
+
+`publish` sends an event to a channel; `stream` turns a set of channels
+into a ``text/event-stream`` response for an async view. Both go through
+the broker named by ``EVENTS_BROKER`` (`.brokers.LocalBroker` by
+default; `.brokers.SocketBroker` relays between worker processes via
+``python manage.py event_broker``).
+
+Streams only work under the ASGI application (`core.asgi`), where an
+open stream is a suspended coroutine. Under WSGI Django would collect
+the endless iterator before sending a byte, holding a worker thread
+forever, and a subscription would be bound to a throwaway event loop;
+views check `streams_available` and pages use short polling instead
+(the ``live_events`` template flag). Each stream sends its ``initial`` events first, then whatever is
+published to its channels, plus a comment line every ``SSE_HEARTBEAT``
+seconds so proxies keep the connection open. A client that falls
+``EVENTS_QUEUE_SIZE`` events behind is disconnected; ``EventSource``
+reconnects on its own and starts over from a fresh ``initial`` snapshot.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Iterable
+
+from django.conf import settings  # type: ignore
+from django.core.handlers.asgi import ASGIRequest  # type: ignore
+from django.http import HttpResponse, StreamingHttpResponse  # type: ignore
+from django.utils.module_loading import import_string  # type: ignore
+
+from .brokers import Broker, LocalBroker, Message, SocketBroker, Subscription, SubscriptionClosed
+
+__all__ = [
+    'Broker',
+    'LocalBroker',
+    'Message',
+    'SocketBroker',
+    'Subscription',
+    'SubscriptionClosed',
+    'format_event',
+    'get_broker',
+    'publish',
+    'stream',
+    'streams_available',
+    'subscribe',
+    'unavailable',
+]
+
+DEFAULT_BROKER = 'core.events.brokers.LocalBroker'
+
+_broker: Broker | None = None
+
+
+def get_broker() -> Broker:
+    global _broker
+    path = getattr(settings, 'EVENTS_BROKER', DEFAULT_BROKER)
+    if _broker is None or f'{type(_broker).__module__}.{type(_broker).__name__}' != path:
+        broker_class = import_string(path)
+        options: dict[str, Any] = {'queue_size': getattr(settings, 'EVENTS_QUEUE_SIZE', 100)}
+        if issubclass(broker_class, SocketBroker):
+            options['address'] = getattr(settings, 'EVENTS_BROKER_URL', '127.0.0.1:7390')
+        _broker = broker_class(**options)
+    return _broker
+
+
+def publish(channel: str, event: str, data: Any) -> None:
+    """Send ``event`` to ``channel``; ``data`` must be JSON-serialisable as it is."""
+    get_broker().publish(channel, {'event': event, 'data': data})
+
+
+def subscribe(*channels: str) -> Subscription:
+    return get_broker().subscribe(*channels)
+
+
+def format_event(message: Message) -> str:
+    data = json.dumps(message['data'], separators=(',', ':'))
+    return f"event: {message['event']}\ndata: {data}\n\n"
+
+
+async def _events(subscription: Subscription, initial: Iterable[Message]) -> AsyncIterator[str]:
+    heartbeat = getattr(settings, 'SSE_HEARTBEAT', 15)
+    try:
+        yield 'retry: 3000\n\n'
+        for message in initial:
+            yield format_event(message)
+        while True:
+            message = await subscription.get(timeout=heartbeat)
+            yield ': keepalive\n\n' if message is None else format_event(message)
+    except SubscriptionClosed:
+        return
+    finally:
+        subscription.close()
+
+
+class _EventStream:
+    # Django calls close() when the response ends, even if the client went
+    # away before the generator ran; that releases the subscription
+    def __init__(self, subscription: Subscription, initial: list[Message]) -> None:
+        self.subscription = subscription
+        self.initial = initial
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return _events(self.subscription, self.initial)
+
+    def close(self) -> None:
+        self.subscription.close()
+
+
+def streams_available(request) -> bool:
+    """Whether ``request`` is served by the ASGI application, the only place a stream can run."""
+    return isinstance(request, ASGIRequest)
+
+
+def unavailable() -> HttpResponse:
+    """Answer for a stream requested under WSGI: 204 tells ``EventSource`` not to reconnect."""
+    return HttpResponse(status=204)
+
+
+def stream(subscription: Subscription, initial: Iterable[Message] = ()) -> StreamingHttpResponse:
+    """
+    Event-stream response over ``subscription``.
+
+    Subscribe before reading the state that ``initial`` describes, so no
+    change between the two is lost.
+    """
+    response = StreamingHttpResponse(_EventStream(subscription, list(initial)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
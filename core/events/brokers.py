@@ -0,0 +1,261 @@
+"""
+Pub/sub brokers behind `core.events`.
+
+A message is a dict with an ``event`` name and JSON-serialisable
+``data``. Publishing is synchronous and never blocks on subscribers, so
+it can be called from request threads and ``transaction.on_commit``
+callbacks. Subscribing happens inside an event loop (an async view): a
+`Subscription` is an ``asyncio.Queue`` that the broker fills from any
+thread with ``call_soon_threadsafe``.
+
+`LocalBroker` delivers within the process, which is all a single ASGI
+worker needs. `SocketBroker` relays through `core.events.server`, a
+small line-delimited JSON fan-out server standing in for Redis pub/sub,
+so several worker processes see each other's events.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+Message = dict[str, Any]
+
+_CLOSED = object()
+
+
+class SubscriptionClosed(Exception):
+    """The subscription was closed, or dropped because its consumer fell behind."""
+
+
+class Subscription:
+    """Messages for a set of channels, consumed from the event loop that created it."""
+
+    def __init__(self, broker: 'Broker', channels: tuple[str, ...], maxsize: int) -> None:
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.lagged = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+    def _deliver(self, message: Message) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A consumer this far behind gets disconnected; it reconnects
+            # and starts again from a fresh snapshot
+            self.lagged = True
+            self.close()
+
+    async def get(self, timeout: float | None = None) -> Message | None:
+        """The next message, or ``None`` after ``timeout`` seconds without one."""
+        if self._closed and self._queue.empty():
+            raise SubscriptionClosed
+        try:
+            message = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is _CLOSED:
+            raise SubscriptionClosed
+        return message
+
+    def close(self) -> None:
+        """Stop receiving; may be called from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not self.loop:
+            self.broker.unsubscribe(self)
+            try:
+                self.loop.call_soon_threadsafe(self.close)
+            except RuntimeError:  # the loop is gone
+                self._closed = True
+            return
+        if self._closed:
+            return
+        self._closed = True
+        self.broker.unsubscribe(self)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+
+def _deliver_all(subscriptions: list[Subscription], message: Message) -> None:
+    for subscription in subscriptions:
+        subscription._deliver(message)
+
+
+class Broker(ABC):
+    @abstractmethod
+    def publish(self, channel: str, message: Message) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, *channels: str) -> Subscription:
+        """Must be called from a running event loop."""
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription) -> None:
+        ...
+
+
+class LocalBroker(Broker):
+    """In-process fan-out; events published by other processes are not seen."""
+
+    def __init__(self, queue_size: int = 100) -> None:
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels: dict[str, set[Subscription]] = defaultdict(set)
+
+    def publish(self, channel: str, message: Message) -> None:
+        self.deliver(channel, message)
+
+    def deliver(self, channel: str, message: Message) -> int:
+        """Hand ``message`` to this process's subscribers; returns how many."""
+        with self._lock:
+            subscriptions = list(self._channels.get(channel, ()))
+        by_loop: dict[asyncio.AbstractEventLoop, list[Subscription]] = defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        # One wake-up per event loop, however many streams it serves
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, group, message)
+            except RuntimeError:  # the loop is gone
+                for subscription in group:
+                    self.unsubscribe(subscription)
+        return len(subscriptions)
+
+    def subscribe(self, *channels: str) -> Subscription:
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def channel_count(self) -> int:
+        with self._lock:
+            return len(self._channels)
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode() + b'\n'
+
+
+class SocketBroker(LocalBroker):
+    """
+    `LocalBroker` relayed through an `core.events.server.EventBrokerServer`.
+
+    Publishing sends the message to the server over one blocking socket
+    per process. Each event loop with subscribers keeps one connection that
+    subscribes to its channels and hands incoming messages to the local
+    subscribers. If the server cannot be reached, publishing logs and
+    drops the message, and listeners keep reconnecting.
+    """
+
+    def __init__(self, address: str = '127.0.0.1:7390', queue_size: int = 100, timeout: float = 1.0) -> None:
+        super().__init__(queue_size)
+        host, _, port = address.rpartition(':')
+        self.host, self.port = host or '127.0.0.1', int(port)
+        self.timeout = timeout
+        self._socket: socket.socket | None = None
+        self._send_lock = threading.Lock()
+        self._listeners: dict[asyncio.AbstractEventLoop, '_Listener'] = {}
+
+    def publish(self, channel: str, message: Message) -> None:
+        line = _encode({'op': 'pub', 'channel': channel, 'message': message})
+        with self._send_lock:
+            for attempt in range(2):
+                try:
+                    if self._socket is None:
+                        self._socket = socket.create_connection((self.host, self.port), self.timeout)
+                    self._socket.sendall(line)
+                    return
+                except OSError:
+                    if self._socket is not None:
+                        self._socket.close()
+                        self._socket = None
+        logger.warning('Event broker at %s:%s unreachable; dropped event for %s', self.host, self.port, channel)
+
+    def subscribe(self, *channels: str) -> Subscription:
+        subscription = super().subscribe(*channels)
+        listener = self._listeners.get(subscription.loop)
+        if listener is None or listener.task.done():
+            listener = self._listeners[subscription.loop] = _Listener(self, subscription.loop)
+        listener.add(channels)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        super().unsubscribe(subscription)
+        listener = self._listeners.get(subscription.loop)
+        if listener is not None:
+            with self._lock:
+                unused = [channel for channel in subscription.channels if channel not in self._channels]
+            listener.remove(unused)
+
+
+class _Listener:
+    """One server connection per event loop; lives as long as the loop."""
+
+    def __init__(self, broker: SocketBroker, loop: asyncio.AbstractEventLoop) -> None:
+        self.broker = broker
+        self.loop = loop
+        self.channels: set[str] = set()
+        self.writer: asyncio.StreamWriter | None = None
+        self.task = loop.create_task(self._run())
+
+    def _send(self, payload: dict) -> None:
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(_encode(payload))
+
+    def add(self, channels) -> None:
+        for channel in channels:
+            if channel not in self.channels:
+                self.channels.add(channel)
+                self._send({'op': 'sub', 'channel': channel})
+
+    def remove(self, channels) -> None:
+        for channel in channels:
+            if channel in self.channels:
+                self.channels.discard(channel)
+                self._send({'op': 'unsub', 'channel': channel})
+
+    async def _run(self) -> None:
+        delay = 0.1
+        while True:
+            try:
+                reader, self.writer = await asyncio.open_connection(self.broker.host, self.broker.port)
+                delay = 0.1
+                for channel in self.channels:
+                    self._send({'op': 'sub', 'channel': channel})
+                while line := await reader.readline():
+                    payload = json.loads(line)
+                    self.broker.deliver(payload['channel'], payload['message'])
+            except (OSError, ValueError) as exc:
+                logger.warning('Event broker connection failed: %s', exc)
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+                    self.writer = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
@@ -0,0 +1,121 @@
+"""
+A local stand-in for a pub/sub broker such as Redis.
+
+`EventBrokerServer` accepts TCP connections speaking line-delimited
+JSON and relays ``pub`` lines to every connection subscribed to the
+channel::
+
+    {"op": "sub", "channel": "order:42"}
+    {"op": "unsub", "channel": "order:42"}
+    {"op": "pub", "channel": "order:42", "message": {...}}
+
+Subscribers receive ``{"channel": ..., "message": ...}`` lines. A
+subscriber that stops reading is disconnected once ``max_buffer`` bytes
+are waiting for it, so one stuck worker cannot hold up the rest. Used by
+`core.events.brokers.SocketBroker`::
+
+    python manage.py event_broker --port 7390
+    EVENTS_BROKER=core.events.brokers.SocketBroker EVENTS_BROKER_URL=127.0.0.1:7390 uvicorn core.asgi:application --workers 4
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+
+class EventBrokerServer:
+    """Asyncio fan-out server; `start` runs it in a background thread."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, *, max_buffer: int = 1 << 20) -> None:
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.messages_relayed = 0
+        self._channels: dict[str, set[asyncio.StreamWriter]] = defaultdict(set)
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.base_events.Server | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+
+    @property
+    def address(self) -> str:
+        return f'{self.host}:{self.port}'
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def serve_forever(self) -> None:
+        asyncio.run(self._serve())
+
+    def start(self) -> 'EventBrokerServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='event-broker', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _close(self) -> None:
+        self._server.close()
+        for writer in self._clients:
+            writer.close()
+
+    def stop(self) -> None:
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._close)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: set[str] = set()
+        self._clients.add(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    payload = json.loads(line)
+                    op, channel = payload['op'], payload['channel']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if op == 'sub':
+                    subscribed.add(channel)
+                    self._channels[channel].add(writer)
+                elif op == 'unsub':
+                    subscribed.discard(channel)
+                    self._drop(channel, writer)
+                elif op == 'pub':
+                    self._relay(channel, payload.get('message'))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            for channel in subscribed:
+                self._drop(channel, writer)
+            writer.close()
+
+    def _drop(self, channel: str, writer: asyncio.StreamWriter) -> None:
+        writers = self._channels.get(channel)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self._channels[channel]
+
+    def _relay(self, channel: str, message) -> None:
+        writers = self._channels.get(channel)
+        if not writers:
+            return
+        line = json.dumps({'channel': channel, 'message': message}, separators=(',', ':')).encode() + b'\n'
+        for writer in list(writers):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                writer.close()
+                continue
+            writer.write(line)
+            self.messages_relayed += 1
@@ -0,0 +1,151 @@
+"""
+Geocoding with two cache levels.
+
+`geocode` looks an address up in
+
+1. a per-process LRU (``GEOCODE_LRU_SIZE`` entries),
+2. the `core.models.GeocodeCacheEntry` table, shared by all processes,
+3. the configured backend (``GEOCODER_BACKEND``, see `.backends`),
+
+and stores what the lower levels found in the upper ones. Addresses are
+normalised first (case, whitespace; empty means the city), so
+"Partizanska 1" and " partizanska  1 " share an entry.
+
+Coordinates are stored on `Restaurant` (when its address is saved) and
+on `Order` (at checkout), so read paths such as order tracking and
+dispatch use the stored columns. Rows from before those columns existed
+are filled by a data migration with the offline `HashGeocoder`; read
+paths only fall back to `geocode` for rows saved while the backend was
+failing.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from django.conf import settings  # type: ignore
+from django.utils.module_loading import import_string  # type: ignore
+
+from .backends import GeocoderBackend, GeocodingError, HashGeocoder, Point
+
+__all__ = [
+    'GeocoderBackend',
+    'GeocodingError',
+    'HashGeocoder',
+    'Point',
+    'clear_memory_cache',
+    'geocode',
+    'geocode_many',
+    'get_backend',
+    'normalize_address',
+    'stored_point',
+    'stored_points',
+]
+
+DEFAULT_BACKEND = 'core.geocoding.backends.HashGeocoder'
+DEFAULT_ADDRESS = 'skopje'
+
+_backend: GeocoderBackend | None = None
+_memory: OrderedDict[tuple[str, str], Point] = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_address(address: str | None) -> str:
+    return ' '.join((address or '').lower().split()) or DEFAULT_ADDRESS
+
+
+def get_backend() -> GeocoderBackend:
+    global _backend
+    path = getattr(settings, 'GEOCODER_BACKEND', DEFAULT_BACKEND)
+    if _backend is None or f'{type(_backend).__module__}.{type(_backend).__name__}' != path:
+        _backend = import_string(path)()
+    return _backend
+
+
+def clear_memory_cache() -> None:
+    with _lock:
+        _memory.clear()
+
+
+def _remember(key: tuple[str, str], point: Point) -> None:
+    with _lock:
+        _memory[key] = point
+        _memory.move_to_end(key)
+        while len(_memory) > getattr(settings, 'GEOCODE_LRU_SIZE', 4096):
+            _memory.popitem(last=False)
+
+
+def _recall(key: tuple[str, str]) -> Point | None:
+    with _lock:
+        point = _memory.get(key)
+        if point is not None:
+            _memory.move_to_end(key)
+        return point
+
+
+def geocode_many(addresses: Iterable[str | None]) -> dict[str, Point | None]:
+    """
+    Coordinates for several addresses, keyed by normalised address.
+
+    Costs one query for everything not in memory and one INSERT for what
+    the backend had to resolve. Addresses the backend does not know map
+    to ``None`` (and are not cached); `GeocodingError` propagates.
+    """
+    from core.models import GeocodeCacheEntry
+
+    backend = get_backend()
+    wanted = {normalize_address(address) for address in addresses}
+    found: dict[str, Point | None] = {}
+    for address in wanted:
+        point = _recall((backend.name, address))
+        if point is not None:
+            found[address] = point
+
+    missing = wanted - found.keys()
+    if missing:
+        rows = GeocodeCacheEntry.objects.filter(backend=backend.name, address__in=missing)
+        for address, lat, lng in rows.values_list('address', 'latitude', 'longitude'):
+            found[address] = (lat, lng)
+            _remember((backend.name, address), (lat, lng))
+
+        new_entries = []
+        for address in missing - found.keys():
+            point = backend.geocode(address)
+            found[address] = point
+            if point is not None:
+                _remember((backend.name, address), point)
+                new_entries.append(GeocodeCacheEntry(
+                    backend=backend.name, address=address, latitude=point[0], longitude=point[1],
+                ))
+        # Another process may have stored the same address meanwhile
+        GeocodeCacheEntry.objects.bulk_create(new_entries, ignore_conflicts=True)
+    return found
+
+
+def geocode(address: str | None) -> Point | None:
+    """Coordinates of ``address`` (see `geocode_many`)."""
+    return geocode_many([address])[normalize_address(address)]
+
+
+def stored_points(rows: Iterable[tuple[float | None, float | None, str | None]]) -> list[Point | None]:
+    """
+    ``(latitude, longitude, address)`` rows to points: the stored coordinates
+    where present, else one `geocode_many` call for all the others (rows
+    saved before geocoding, or while the backend was failing).
+    """
+    rows = list(rows)
+    missing = [address for lat, lng, address in rows if lat is None or lng is None]
+    try:
+        looked_up = geocode_many(missing) if missing else {}
+    except GeocodingError:
+        looked_up = {}
+    return [
+        (lat, lng) if lat is not None and lng is not None else looked_up.get(normalize_address(address))
+        for lat, lng, address in rows
+    ]
+
+
+def stored_point(latitude: float | None, longitude: float | None, address: str | None) -> Point | None:
+    """Single-row `stored_points`."""
+    return stored_points([(latitude, longitude, address)])[0]
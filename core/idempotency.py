@@ -0,0 +1,110 @@
+"""
+Idempotency keys for unsafe POST endpoints.
+
+Clients send a key either in the ``Idempotency-Key`` header (AJAX) or in
+an ``idempotency_key`` form field (plain HTML forms). The first request
+with a given key runs the view and its response is stored in the cache
+for ``IDEMPOTENCY_KEY_TTL`` seconds; repeated requests with the same key
+get that response replayed after a single cache lookup, without running
+the view again. A request that arrives while the first one is still
+running receives ``409 Conflict``.
+
+Keys are scoped to the user and the request path, so the same key can
+never replay another user's response. Which cache stores the keys is
+controlled by ``IDEMPOTENCY_CACHE_ALIAS``; use a shared backend (Redis,
+Memcached or Django's database cache) when running several processes.
+"""
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+from typing import Any, Callable
+
+from django.conf import settings  # type: ignore
+from django.core.cache import caches  # type: ignore
+from django.http import HttpRequest, HttpResponse, JsonResponse  # type: ignore
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_FIELD = 'idempotency_key'
+
+# Headers worth replaying; everything else (cookies, vary) is request-specific.
+_REPLAYED_HEADERS = ('Content-Type', 'Location')
+_IN_FLIGHT = '__in_flight__'
+# How long a claimed key blocks duplicates if the worker dies mid-request.
+_IN_FLIGHT_TTL = 60
+
+
+def _cache():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE_ALIAS', 'default')]
+
+
+def _request_key(request: HttpRequest) -> str | None:
+    key = request.headers.get(IDEMPOTENCY_HEADER) or request.POST.get(IDEMPOTENCY_FIELD)
+    key = (key or '').strip()
+    return key[:255] or None
+
+
+def _cache_key(request: HttpRequest, key: str) -> str:
+    user_id = getattr(request.user, 'pk', None)
+    digest = hashlib.sha256(f'{user_id}:{request.path}:{key}'.encode('utf-8')).hexdigest()
+    return f'idempotency:{digest}'
+
+
+def _snapshot(response: HttpResponse) -> dict[str, Any]:
+    return {
+        'status': response.status_code,
+        'content': response.content,
+        'headers': {name: response[name] for name in _REPLAYED_HEADERS if response.has_header(name)},
+    }
+
+
+def _replay(stored: Any) -> HttpResponse:
+    if stored == _IN_FLIGHT:
+        return JsonResponse(
+            {'error': 'A request with this idempotency key is still being processed.'},
+            status=409,
+        )
+    response = HttpResponse(stored['content'], status=stored['status'])
+    for name, value in stored['headers'].items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+    """
+    Decorate a class-based view handler (e.g. ``post``) so that requests
+    carrying an idempotency key run at most once per key.
+
+    Requests without a key are passed straight through. Server errors and
+    streaming responses are not stored, so the client may retry them.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        key = _request_key(request)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+
+        cache = _cache()
+        cache_key = _cache_key(request, key)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored)
+        if not cache.add(cache_key, _IN_FLIGHT, timeout=_IN_FLIGHT_TTL):
+            # Another request claimed the key between our get() and add().
+            return _replay(cache.get(cache_key, _IN_FLIGHT))
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.streaming or response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, _snapshot(response), timeout=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+        return response
+
+    return wrapper
@@ -0,0 +1,110 @@
+"""
+Run the local event broker, or benchmark event delivery.
+
+Usage:
+    python manage.py event_broker [--port 7390]
+    python manage.py event_broker --bench 1000 [--subscribers 500] [--rate 1000] [--broker local|socket]
+
+In serve mode, set ``EVENTS_BROKER=core.events.brokers.SocketBroker``
+and ``EVENTS_BROKER_URL=127.0.0.1:<port>`` for the web workers. In bench
+mode ``--subscribers`` subscriptions (one per simulated open stream) are
+created on one event loop, ``--bench`` events are published from another
+thread (``--rate`` per second) the way request threads publish them, and
+the publish-to-receive latency is reported as p50/p99. ``--broker
+socket`` relays through a broker server on an ephemeral port.
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.events.brokers import LocalBroker, SocketBroker
+from core.events.server import EventBrokerServer
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Run a local pub/sub broker for server-sent events (or benchmark event delivery)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=7390)
+        parser.add_argument('--bench', type=int, default=0, help='Publish this many events and report latency.')
+        parser.add_argument('--subscribers', type=int, default=500)
+        parser.add_argument('--channels', type=int, default=50, help='Subscribers are spread over this many channels.')
+        parser.add_argument('--rate', type=float, default=1000, help='Events published per second.')
+        parser.add_argument('--broker', choices=('local', 'socket'), default='local')
+
+    def handle(self, *args, **options):
+        if not options['bench']:
+            server = EventBrokerServer(options['host'], options['port'])
+            self.stdout.write(f"Event broker listening on {server.address} (Ctrl+C to stop)")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return
+
+        server = None
+        if options['broker'] == 'socket':
+            server = EventBrokerServer(options['host'], 0).start()
+            broker = SocketBroker(server.address, queue_size=options['bench'] + 1)
+        else:
+            broker = LocalBroker(queue_size=options['bench'] + 1)
+        try:
+            latencies, missing = asyncio.run(self._bench(broker, options))
+        finally:
+            if server is not None:
+                server.stop()
+
+        per_channel = options['subscribers'] / options['channels']
+        self.stdout.write(
+            f"{options['broker']}: {options['bench']} events to {options['subscribers']} subscribers "
+            f"(~{per_channel:.0f} per channel): {len(latencies)} deliveries, "
+            f"p50={statistics.median(latencies):.2f}ms p99={_percentile(latencies, 99):.2f}ms"
+        )
+        if missing:
+            raise CommandError(f"{missing} deliveries were lost.")
+
+    async def _bench(self, broker, options) -> tuple[list[float], int]:
+        channels = [f'bench:{i}' for i in range(options['channels'])]
+        subscriptions = [broker.subscribe(channels[i % len(channels)]) for i in range(options['subscribers'])]
+        expected_per_channel = {channel: 0 for channel in channels}
+        for i in range(options['subscribers']):
+            expected_per_channel[channels[i % len(channels)]] += 1
+        total = options['bench']
+        expected = sum(expected_per_channel[channels[i % len(channels)]] for i in range(total))
+        latencies: list[float] = []
+
+        async def consume(subscription) -> None:
+            while (message := await subscription.get(timeout=5)) is not None:
+                latencies.append((time.perf_counter() - message['data']['sent']) * 1000)
+                if message['data']['last']:
+                    return
+
+        def produce() -> None:
+            started = time.perf_counter()
+            for i in range(total):
+                # Paced, so the numbers are latency rather than backlog
+                delay = started + i / options['rate'] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                data = {'sent': time.perf_counter(), 'last': i >= total - len(channels)}
+                broker.publish(channels[i % len(channels)], {'event': 'bench', 'data': data})
+
+        if isinstance(broker, SocketBroker):
+            await asyncio.sleep(0.2)  # let the listener connect and subscribe
+        consumers = [asyncio.create_task(consume(subscription)) for subscription in subscriptions]
+        await asyncio.to_thread(produce)
+        await asyncio.gather(*consumers)
+        for subscription in subscriptions:
+            subscription.close()
+        return latencies, expected - len(latencies)
@@ -0,0 +1,64 @@
+"""
+Fill in missing restaurant and delivery coordinates.
+
+Usage:
+    python manage.py geocode_addresses [--batch-size 500] [--all]
+
+Geocodes (through the cache, see `core.geocoding`) every restaurant
+without ``latitude``/``longitude`` and every order without delivery
+coordinates, e.g. rows saved before the columns existed or while the
+geocoder was failing. ``--all`` recomputes every row, for example after
+switching ``GEOCODER_BACKEND``.
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.geocoding import geocode_many, normalize_address
+from orders.models import Order
+from restaurants.models import Restaurant
+
+_TARGETS = (
+    # model, address field, latitude field, longitude field
+    (Restaurant, 'address', 'latitude', 'longitude'),
+    (Order, 'delivery_address', 'delivery_latitude', 'delivery_longitude'),
+)
+
+
+class Command(BaseCommand):
+    help = "Geocode restaurants and orders that have no stored coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Recompute coordinates for every row.')
+
+    def handle(self, *args, **options):
+        for model, address_field, lat_field, lng_field in _TARGETS:
+            queryset = model.objects.order_by('pk')
+            if not options['all']:
+                queryset = queryset.filter(**{f'{lat_field}__isnull': True})
+            updated = unresolved = 0
+            last_pk = 0
+            while True:
+                rows = list(
+                    queryset.filter(pk__gt=last_pk).values_list('pk', address_field)[:options['batch_size']]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                points = geocode_many(address for _, address in rows)
+                changed = []
+                for pk, address in rows:
+                    point = points[normalize_address(address)]
+                    if point is None:
+                        unresolved += 1
+                        continue
+                    changed.append(model(pk=pk, **{lat_field: point[0], lng_field: point[1]}))
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, [lat_field, lng_field])
+                updated += len(changed)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {updated} geocoded, {unresolved} not found"
+            )
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,26 @@
+"""
+Models for the core app.
+
+`GeocodeCacheEntry` is the persistent level of the geocoding cache (see
+`core.geocoding`): one row per backend and normalised address.
+"""
+from __future__ import annotations
+
+from django.db import models  # type: ignore
+
+
+class GeocodeCacheEntry(models.Model):
+    backend = models.CharField(max_length=50)
+    address = models.CharField(max_length=255, help_text='Normalised address (see core.geocoding).')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['backend', 'address'], name='geocode_backend_address_uniq'),
+        ]
+        verbose_name_plural = 'geocode cache entries'
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f'{self.address} ({self.latitude}, {self.longitude})'
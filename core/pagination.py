@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination.
+
+`paginate_keyset` pages through a queryset ordered by a unique key, e.g.
+``('name', 'id')`` or ``('-created_at', '-id')``. Each page is fetched with
+``WHERE key > last_seen ORDER BY key LIMIT n``, so the cost of a page
+depends only on its size and not on how deep into the results it is,
+unlike ``OFFSET``. Rows inserted or deleted between requests do not shift
+later pages.
+
+The cursor handed to clients is an opaque URL-safe string that encodes
+the ordering values of the last row returned.
+"""
+from __future__ import annotations
+
+import base64
+import datetime
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError  # type: ignore
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+from django.db import models  # type: ignore
+
+# Upper bound for client-supplied page sizes
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was tampered with or belongs to another ordering."""
+
+
+@dataclass
+class KeysetPage:
+    items: list[Any]
+    next_cursor: str | None = None
+    ordering: Sequence[str] = field(default=(), repr=False)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _model_field(model, path: str) -> models.Field:
+    opts = model._meta
+    parts = path.split('__')
+    for part in parts[:-1]:
+        opts = opts.get_field(part).related_model._meta
+    return opts.get_field(parts[-1])
+
+
+def _value(obj: Any, path: str) -> Any:
+    for part in path.split('__'):
+        obj = obj[part] if isinstance(obj, dict) else getattr(obj, part)
+    return obj
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o: Any) -> Any:
+        # DjangoJSONEncoder rounds datetimes to milliseconds, which would
+        # skip or repeat rows whose keys differ only in the microseconds
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, model, ordering: Sequence[str]) -> list[Any]:
+    """Decode ``cursor`` back into typed values for ``ordering`` on ``model``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor('Malformed cursor.') from exc
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Cursor does not match this ordering.')
+    try:
+        return [
+            _model_field(model, key.lstrip('-')).to_python(value)
+            for key, value in zip(ordering, values)
+        ]
+    except (FieldDoesNotExist, ValidationError) as exc:
+        raise InvalidCursor('Cursor does not match this ordering.') from exc
+
+
+def after(ordering: Sequence[str], values: Sequence[Any]) -> models.Q:
+    """
+    Filter for rows strictly after ``values`` in ``ordering``.
+
+    ``(a, b) > (x, y)`` expands to ``a > x OR (a = x AND b > y)``; a leading
+    ``-`` on a key flips its comparison.
+    """
+    condition = models.Q()
+    equal: dict[str, Any] = {}
+    for key, value in zip(ordering, values):
+        name = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        condition |= models.Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def paginate_keyset(
+    queryset: models.QuerySet,
+    ordering: Sequence[str],
+    cursor: str | None = None,
+    limit: int = 20,
+    predicate: Callable[[Any], bool] | None = None,
+) -> KeysetPage:
+    """
+    Return the page of ``queryset`` that follows ``cursor``.
+
+    ``ordering`` must end in a unique key (normally ``'id'``/``'-id'``).
+    Rows rejected by the optional Python ``predicate`` are skipped and more
+    rows are fetched until the page is full, so it should only reject a
+    small share of them. Raises `InvalidCursor` for bad cursors.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    queryset = queryset.order_by(*ordering)
+    position = decode_cursor(cursor, queryset.model, ordering) if cursor else None
+
+    items: list[Any] = []
+    while True:
+        page = queryset.filter(after(ordering, position)) if position is not None else queryset
+        # One extra row tells whether another page exists
+        rows = list(page[:limit + 1])
+        for row in rows[:limit]:
+            position = [_value(row, key.lstrip('-')) for key in ordering]
+            if predicate is None or predicate(row):
+                items.append(row)
+                if len(items) == limit:
+                    break
+        if len(items) == limit:
+            more = len(rows) > limit or row is not rows[-1]
+            return KeysetPage(items, encode_cursor(position) if more else None, ordering)
+        if len(rows) <= limit:
+            return KeysetPage(items, None, ordering)
@@ -64,6 +64,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.stripe_public_key',
+                'core.context_processors.fragment_cache',
+                'core.context_processors.live_events',
             ],
         },
     },
@@ -77,9 +79,32 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': str(BASE_DIR / 'db.sqlite3'),
+        # A file rather than shared-cache memory, so the concurrency tests'
+        # threads wait on SQLite's write lock instead of failing with "table is locked"
+        'TEST': {'NAME': str(BASE_DIR / 'test_db.sqlite3')},
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# The local-memory cache is per process; point this at Redis/Memcached (or
+# Django's database cache) when running more than one worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'food-delivery',
+        # Room for menus and per-card template fragments (the default of 300 culls them constantly)
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+# Per-restaurant menu cache (restaurants/menu_cache.py)
+MENU_CACHE_ALIAS: str = 'default'
+MENU_CACHE_TTL: int = int(os.environ.get('MENU_CACHE_TTL', 600))
+# Product/restaurant card fragments ({% cache %} keys include updated_at, so edits never serve stale HTML)
+FRAGMENT_CACHE_TTL: int = int(os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+# Render a product's menu card into the cache as soon as it is saved (restaurants/fragments.py)
+PRERENDER_MENU_FRAGMENTS: bool = os.environ.get('PRERENDER_MENU_FRAGMENTS', '0') == '1'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -95,6 +120,52 @@ LANGUAGE_CODE: str = 'en-us'
 TIME_ZONE: str = 'UTC'
 USE_I18N: bool = True
 USE_TZ: bool = True
+# Local time zone of restaurant opening hours (see restaurants/hours.py)
+RESTAURANT_TIME_ZONE: str = os.environ.get('RESTAURANT_TIME_ZONE', 'Europe/Skopje')
+
+# Geocoding (core/geocoding): backend class and size of the per-process LRU in
+# front of the shared GeocodeCacheEntry table
+GEOCODER_BACKEND: str = os.environ.get('GEOCODER_BACKEND', 'core.geocoding.backends.HashGeocoder')
+GEOCODE_LRU_SIZE: int = int(os.environ.get('GEOCODE_LRU_SIZE', 4096))
+
+# Orders per page in the customer/owner/courier order lists (orders/lists.py)
+ORDER_LIST_PAGE_SIZE: int = int(os.environ.get('ORDER_LIST_PAGE_SIZE', 25))
+
+# Automatic courier dispatch (orders/dispatch.py, manage.py dispatch_orders)
+DISPATCH_INTERVAL: float = float(os.environ.get('DISPATCH_INTERVAL', 5))
+DISPATCH_BATCH: int = int(os.environ.get('DISPATCH_BATCH', 1000))
+DISPATCH_CAPACITY: int = int(os.environ.get('DISPATCH_CAPACITY', 1))
+DISPATCH_LOAD_PENALTY_KM: float = float(os.environ.get('DISPATCH_LOAD_PENALTY_KM', 2.0))
+DISPATCH_MAX_PICKUP_KM: float = float(os.environ.get('DISPATCH_MAX_PICKUP_KM', 10))
+DISPATCH_ACTIVE_WINDOW: int = int(os.environ.get('DISPATCH_ACTIVE_WINDOW', 12 * 3600))
+DISPATCH_DEPOT: tuple[float, float] = (41.9973, 21.4280)  # Skopje city centre
+
+# In-process spatial indexes (core/spatial.py): grid cell size, forced
+# rebuild interval, and the default radius of "near me" lookups
+SPATIAL_INDEX_CELL_KM: float = float(os.environ.get('SPATIAL_INDEX_CELL_KM', 0.5))
+SPATIAL_INDEX_MAX_AGE: int = int(os.environ.get('SPATIAL_INDEX_MAX_AGE', 300))
+NEARBY_RADIUS_KM: float = float(os.environ.get('NEARBY_RADIUS_KM', 10))
+
+# Server-sent events (core/events): pub/sub broker class, the address of
+# `manage.py event_broker` for SocketBroker, events a slow client may fall
+# behind before it is disconnected, and seconds between keepalive comments
+EVENTS_BROKER: str = os.environ.get('EVENTS_BROKER', 'core.events.brokers.LocalBroker')
+EVENTS_BROKER_URL: str = os.environ.get('EVENTS_BROKER_URL', '127.0.0.1:7390')
+EVENTS_QUEUE_SIZE: int = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+SSE_HEARTBEAT: int = int(os.environ.get('SSE_HEARTBEAT', 15))
+
+# Delivery estimates (orders/eta.py): courier speed and detour factor over
+# the straight line, prep time without history and how many recent orders
+# it is learned from, wait for a courier, minutes per extra delivery the
+# courier carries, and cache lifetimes in seconds
+ETA_SPEED_KMH: float = float(os.environ.get('ETA_SPEED_KMH', 20))
+ETA_ROUTE_FACTOR: float = float(os.environ.get('ETA_ROUTE_FACTOR', 1.3))
+ETA_DEFAULT_PREP_MINUTES: float = float(os.environ.get('ETA_DEFAULT_PREP_MINUTES', 15))
+ETA_PREP_SAMPLE: int = int(os.environ.get('ETA_PREP_SAMPLE', 50))
+ETA_DISPATCH_MINUTES: float = float(os.environ.get('ETA_DISPATCH_MINUTES', 5))
+ETA_STOP_MINUTES: float = float(os.environ.get('ETA_STOP_MINUTES', 5))
+ETA_CACHE_TTL: int = int(os.environ.get('ETA_CACHE_TTL', 60))
+ETA_PREP_CACHE_TTL: int = int(os.environ.get('ETA_PREP_CACHE_TTL', 600))
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL: str = '/static/'
@@ -120,12 +191,38 @@ STRIPE_SECRET_KEY: str = os.environ.get(
     'sk_test_51SUuLl6LISy3DXkrCzIUISUdC36P3bIPry9sVw3HgNBxBRHVeDkYUGNcIb7VThdBI26WnZRiViW59z5VTnQrD2He00hn4vAmhk',
 )
 
+# Stripe client tuning (see payments/providers/stripe_provider.py). Point STRIPE_API_BASE at
+# `python manage.py fake_stripe` to run without network access.
+STRIPE_API_BASE: str | None = os.environ.get('STRIPE_API_BASE') or None
+STRIPE_TIMEOUT: float = float(os.environ.get('STRIPE_TIMEOUT', 10))
+STRIPE_MAX_RETRIES: int = int(os.environ.get('STRIPE_MAX_RETRIES', 2))
+STRIPE_INTENT_WAIT: float = float(os.environ.get('STRIPE_INTENT_WAIT', 2.0))
+# Opt-in: start an intent for every placed order instead of when the payment page asks for
+# one. Costs a provider call per order, abandoned checkouts included.
+STRIPE_PREFETCH_INTENTS: bool = os.environ.get('STRIPE_PREFETCH_INTENTS', '0') == '1'
+
+# Webhook signing secret (whsec_...) for payments/webhooks/stripe/
+STRIPE_WEBHOOK_SECRET: str = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+STRIPE_WEBHOOK_TOLERANCE: int = int(os.environ.get('STRIPE_WEBHOOK_TOLERANCE', 300))
+
+# Payment provider (see payments/providers/): 'stripe' or the in-process 'fake'.
+# Stripe falls back to the fake provider when it is not installed/configured.
+PAYMENT_PROVIDER: str = os.environ.get('PAYMENT_PROVIDER', 'stripe')
+PAYMENT_PROVIDER_WORKERS: int = int(os.environ.get('PAYMENT_PROVIDER_WORKERS', 4))
+PAYMENT_FAKE_LATENCY: float = float(os.environ.get('PAYMENT_FAKE_LATENCY', 0.0))
+PAYMENT_FAKE_FAILURE_RATE: float = float(os.environ.get('PAYMENT_FAKE_FAILURE_RATE', 0.0))
+PAYMENT_FAKE_SEED: int = int(os.environ.get('PAYMENT_FAKE_SEED', 0))
+
 # For local dev: allow CSRF for localhost if you see CSRF warnings with fetch()
 CSRF_TRUSTED_ORIGINS = [
     'http://127.0.0.1:8000',
     'http://localhost:8000',
 ]
 
+# Idempotency keys for checkout / payment POSTs (see core/idempotency.py)
+IDEMPOTENCY_CACHE_ALIAS: str = 'default'
+IDEMPOTENCY_KEY_TTL: int = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
 # Login and logout redirects
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
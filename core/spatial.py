@@ -0,0 +1,262 @@
+"""
+In-process spatial index for nearest / within-radius queries.
+
+`GridIndex` projects ``(lat, lng)`` points onto a local kilometre plane
+(equirectangular around a reference latitude; well under 1% error at city
+scale) and hashes them into square cells of ``cell_km``. A query only
+visits the cells around the query point, ring by ring, so its cost
+depends on how many points are nearby, not on how many are indexed.
+
+`SharedIndex` wraps a `GridIndex` that is built lazily from the database
+(a ``loader`` returning ``(id, lat, lng)`` rows) and kept current:
+
+- changes made by this process are applied in place (`SharedIndex.upsert`
+  / `SharedIndex.discard`, usually from signal handlers);
+- every change also bumps a version number in the default cache, so other
+  processes sharing that cache notice and rebuild on their next query;
+- ``SPATIAL_INDEX_MAX_AGE`` seconds after a build the index is rebuilt
+  anyway, which catches writes that bypass signals (``QuerySet.update``).
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+import time
+from typing import Callable, Hashable, Iterable, Iterator
+
+from django.conf import settings  # type: ignore
+from django.core.cache import cache  # type: ignore
+
+Point = tuple[float, float]  # (lat, lng)
+
+KM_PER_DEGREE = 111.32
+
+
+def project(point: Point, ref_lat: float) -> tuple[float, float]:
+    """``(lat, lng)`` to ``(x, y)`` kilometres on the plane around ``ref_lat``."""
+    lat, lng = point
+    return lng * KM_PER_DEGREE * math.cos(math.radians(ref_lat)), lat * KM_PER_DEGREE
+
+
+class GridIndex:
+    """Points bucketed into square cells; not thread-safe on its own."""
+
+    def __init__(self, cell_km: float = 0.5, ref_lat: float = 42.0) -> None:
+        self.cell_km = cell_km
+        self.ref_lat = ref_lat
+        self._cells: dict[tuple[int, int], dict[Hashable, tuple[float, float]]] = {}
+        self._where: dict[Hashable, tuple[int, int]] = {}
+        # Bounding box of all cells ever used (never shrinks)
+        self._bounds: list[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell_km), math.floor(y / self.cell_km)
+
+    def insert(self, key: Hashable, point: Point) -> None:
+        self.remove(key)
+        x, y = project(point, self.ref_lat)
+        cell = self._cell(x, y)
+        self._cells.setdefault(cell, {})[key] = (x, y)
+        self._where[key] = cell
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            b = self._bounds
+            b[0], b[1], b[2], b[3] = min(b[0], cell[0]), max(b[1], cell[0]), min(b[2], cell[1]), max(b[3], cell[1])
+
+    def remove(self, key: Hashable) -> None:
+        cell = self._where.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self._cells[cell]
+
+    def _ring(self, cx: int, cy: int, r: int) -> Iterator[dict]:
+        if r == 0:
+            bucket = self._cells.get((cx, cy))
+            if bucket:
+                yield bucket
+            return
+        for dx in range(-r, r + 1):
+            for dy in (-r, r) if abs(dx) != r else range(-r, r + 1):
+                bucket = self._cells.get((cx + dx, cy + dy))
+                if bucket:
+                    yield bucket
+
+    def iter_nearest(self, point: Point, max_km: float | None = None) -> Iterator[tuple[float, Hashable]]:
+        """Yield ``(distance_km, key)`` in increasing distance, lazily."""
+        if not self._where:
+            return
+        x, y = project(point, self.ref_lat)
+        cx, cy = self._cell(x, y)
+        limit = math.inf if max_km is None else max_km
+        # Beyond this ring every cell is empty or out of range
+        min_x, max_x, min_y, max_y = self._bounds
+        span = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy, 0)
+        # Rings before the one touching the bounding box are empty
+        first = max(min_x - cx, cx - max_x, min_y - cy, cy - max_y, 0)
+        if max_km is not None:
+            span = min(span, math.ceil(max_km / self.cell_km) + 1)
+        pending: list[tuple[float, int, Hashable]] = []
+        seq = 0
+
+        def push(bucket: dict) -> None:
+            nonlocal seq
+            for key, (px, py) in bucket.items():
+                distance = math.hypot(px - x, py - y)
+                if distance <= limit:
+                    heapq.heappush(pending, (distance, seq, key))
+                    seq += 1
+
+        for r in range(first, span + 1):
+            if 8 * r > len(self._cells):
+                # A ring now has more cells than are occupied in total:
+                # visit the remaining occupied cells best-first instead
+                yield from self._best_first(x, y, cx, cy, r, limit, pending, push)
+                return
+            for bucket in self._ring(cx, cy, r):
+                push(bucket)
+            # Points closer than the edge of rings 0..r have all been seen
+            covered = min(
+                x - (cx - r) * self.cell_km, (cx + r + 1) * self.cell_km - x,
+                y - (cy - r) * self.cell_km, (cy + r + 1) * self.cell_km - y,
+            )
+            while pending and pending[0][0] <= covered:
+                distance, _, key = heapq.heappop(pending)
+                yield distance, key
+        while pending:
+            distance, _, key = heapq.heappop(pending)
+            yield distance, key
+
+    def _best_first(self, x, y, cx, cy, r, limit, pending, push) -> Iterator[tuple[float, Hashable]]:
+        size = self.cell_km
+        cells = []
+        for (kx, ky) in self._cells:
+            if max(abs(kx - cx), abs(ky - cy)) >= r:
+                # Lower bound: distance from the query point to the cell square
+                dx = max(kx * size - x, 0.0, x - (kx + 1) * size)
+                dy = max(ky * size - y, 0.0, y - (ky + 1) * size)
+                cells.append((math.hypot(dx, dy), kx, ky))
+        heapq.heapify(cells)
+        while cells and cells[0][0] <= limit:
+            bound, kx, ky = heapq.heappop(cells)
+            while pending and pending[0][0] <= bound:
+                distance, _, key = heapq.heappop(pending)
+                yield distance, key
+            push(self._cells[(kx, ky)])
+        while pending:
+            distance, _, key = heapq.heappop(pending)
+            yield distance, key
+
+    def nearest(self, point: Point, k: int = 1, max_km: float | None = None) -> list[tuple[float, Hashable]]:
+        result = []
+        for item in self.iter_nearest(point, max_km):
+            result.append(item)
+            if len(result) == k:
+                break
+        return result
+
+    def within(self, point: Point, radius_km: float) -> list[tuple[float, Hashable]]:
+        """All points within ``radius_km``, nearest first."""
+        x, y = project(point, self.ref_lat)
+        # Everything is collected anyway, so skip the lazy ring order: one
+        # pass over the covered cells (or over all cells, if fewer) and a sort
+        (cx0, cy0), (cx1, cy1) = self._cell(x - radius_km, y - radius_km), self._cell(x + radius_km, y + radius_km)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            cells = [bucket for (kx, ky), bucket in self._cells.items() if cx0 <= kx <= cx1 and cy0 <= ky <= cy1]
+        else:
+            cells = [self._cells[(kx, ky)] for kx in range(cx0, cx1 + 1) for ky in range(cy0, cy1 + 1)
+                     if (kx, ky) in self._cells]
+        found = []
+        for bucket in cells:
+            for key, (px, py) in bucket.items():
+                distance = math.hypot(px - x, py - y)
+                if distance <= radius_km:
+                    found.append((distance, key))
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class SharedIndex:
+    """A `GridIndex` over database rows, rebuilt when stale (see module docstring)."""
+
+    def __init__(self, name: str, loader: Callable[[], Iterable[tuple[Hashable, float, float]]],
+                 cell_km: float = 0.5) -> None:
+        self.name = name
+        self.loader = loader
+        self.cell_km = cell_km
+        self._index: GridIndex | None = None
+        self._version: int | None = None
+        self._built_at = 0.0
+        self._lock = threading.RLock()
+
+    @property
+    def _version_key(self) -> str:
+        return f'spatial:v:{self.name}'
+
+    def _shared_version(self) -> int:
+        version = cache.get(self._version_key)
+        if version is None:
+            cache.add(self._version_key, time.time_ns(), timeout=None)
+            version = cache.get(self._version_key)
+        return version
+
+    def _bump(self) -> None:
+        try:
+            version = cache.incr(self._version_key)
+        except ValueError:
+            self._version = None
+            return
+        # Still current only if no other process changed anything in between
+        self._version = version if self._version == version - 1 else None
+
+    def rebuild(self) -> GridIndex:
+        with self._lock:
+            version = self._shared_version()
+            ref_lat = getattr(settings, 'DISPATCH_DEPOT', (42.0, 21.4))[0]
+            index = GridIndex(self.cell_km, ref_lat)
+            for key, lat, lng in self.loader():
+                index.insert(key, (lat, lng))
+            self._index, self._version, self._built_at = index, version, time.monotonic()
+            return index
+
+    def index(self) -> GridIndex:
+        max_age = getattr(settings, 'SPATIAL_INDEX_MAX_AGE', 300)
+        with self._lock:
+            if (
+                self._index is None
+                or self._version != self._shared_version()
+                or time.monotonic() - self._built_at > max_age
+            ):
+                return self.rebuild()
+            return self._index
+
+    def upsert(self, key: Hashable, point: Point | None) -> None:
+        with self._lock:
+            if self._index is not None:
+                if point is None:
+                    self._index.remove(key)
+                else:
+                    self._index.insert(key, point)
+            self._bump()
+
+    def discard(self, key: Hashable) -> None:
+        self.upsert(key, None)
+
+    def nearest(self, point: Point, k: int = 1, max_km: float | None = None) -> list[tuple[float, Hashable]]:
+        index = self.index()
+        with self._lock:
+            return index.nearest(point, k, max_km)
+
+    def within(self, point: Point, radius_km: float) -> list[tuple[float, Hashable]]:
+        index = self.index()
+        with self._lock:
+            return index.within(point, radius_km)
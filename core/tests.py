@@ -0,0 +1,106 @@
+"""
+Tests for the core helpers: idempotency keys.
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from django.core.cache import caches  # type: ignore
+from django.http import HttpResponse, JsonResponse  # type: ignore
+from django.test import RequestFactory, SimpleTestCase, override_settings  # type: ignore
+from django.views import View  # type: ignore
+
+from .idempotency import IDEMPOTENCY_FIELD, idempotent
+
+
+class CountingView(View):
+    """Answers with how many times it ran, calling ``during`` (if set) while running."""
+
+    calls = 0
+    during = None
+
+    @idempotent
+    def post(self, request):
+        type(self).calls += 1
+        if type(self).during is not None:
+            type(self).during()
+        response = JsonResponse({'call': self.calls}, status=201)
+        response['Location'] = f'/things/{self.calls}/'
+        response['X-Not-Replayed'] = 'yes'
+        return response
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'idempotency-tests'}},
+    IDEMPOTENCY_CACHE_ALIAS='default',
+)
+class IdempotentTests(SimpleTestCase):
+    """`core.idempotency.idempotent` runs a view once per user, path and key."""
+
+    def setUp(self):
+        caches['default'].clear()
+        CountingView.calls = 0
+        CountingView.during = None
+        self.factory = RequestFactory()
+        self.alice = SimpleNamespace(pk=1)
+        self.bob = SimpleNamespace(pk=2)
+
+    def _post(self, key: str | None = 'key-1', user=None, path: str = '/things/', form: bool = False) -> HttpResponse:
+        if form:
+            request = self.factory.post(path, {IDEMPOTENCY_FIELD: key} if key else {})
+        else:
+            headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+            request = self.factory.post(path, **headers)
+        request.user = user or self.alice
+        return CountingView.as_view()(request)
+
+    def test_replays_stored_response(self):
+        first = self._post()
+        replay = self._post()
+        self.assertEqual(CountingView.calls, 1)
+        self.assertEqual((replay.status_code, replay.content), (first.status_code, first.content))
+        self.assertEqual(replay['Location'], '/things/1/')
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertFalse(replay.has_header('X-Not-Replayed'))
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+
+    def test_form_field_key(self):
+        self._post(form=True)
+        self.assertEqual(self._post(form=True)['Idempotent-Replayed'], 'true')
+        self.assertEqual(CountingView.calls, 1)
+
+    def test_without_key_always_runs(self):
+        self._post(key=None)
+        self._post(key=None)
+        self.assertEqual(CountingView.calls, 2)
+
+    def test_conflict_while_in_flight(self):
+        retries = []
+        CountingView.during = lambda: retries.append(self._post())
+        first = self._post()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual([response.status_code for response in retries], [409])
+        CountingView.during = None
+        self.assertEqual(CountingView.calls, 1)
+        # Once the first request finished its response is replayed
+        self.assertEqual(self._post().content, first.content)
+
+    def test_scoped_to_user_and_path(self):
+        self._post(user=self.alice)
+        other_user = self._post(user=self.bob)
+        other_path = self._post(user=self.alice, path='/other/')
+        self.assertEqual(CountingView.calls, 3)
+        self.assertFalse(other_user.has_header('Idempotent-Replayed'))
+        self.assertFalse(other_path.has_header('Idempotent-Replayed'))
+        self.assertEqual(self._post(user=self.bob)['Idempotent-Replayed'], 'true')
+
+    def test_server_errors_are_not_stored(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        CountingView.during = fail
+        with self.assertRaises(RuntimeError):
+            self._post()
+        CountingView.during = None
+        self.assertEqual(self._post().status_code, 201)
+        self.assertEqual(CountingView.calls, 2)
@@ -1,8 +1,8 @@
 """
-Admin configuration for orders and order items.
+Admin configuration for orders, order items, the transition log and the sales rollups.
 """
 from django.contrib import admin  # type: ignore
-from .models import Order, OrderItem
+from .models import DailyProductSales, DailySales, Order, OrderItem, OrderTransition
 
 
 class OrderItemInline(admin.TabularInline):
@@ -12,8 +12,37 @@ class OrderItemInline(admin.TabularInline):
     can_delete = False
 
 
+class OrderTransitionInline(admin.TabularInline):
+    # The log is append-only; it is shown, never edited
+    model = OrderTransition
+    extra = 0
+    fields = ('created_at', 'transition', 'from_status', 'to_status', 'actor')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'restaurant', 'status', 'total', 'created_at')
     list_filter = ('status', 'restaurant')
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderTransitionInline]
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    # Maintained by orders/sales.py; rebuild with manage.py backfill_sales
+    list_display = ('day', 'restaurant', 'orders', 'revenue')
+    list_filter = ('restaurant',)
+    date_hierarchy = 'day'
+    readonly_fields = ('restaurant', 'day', 'orders', 'revenue')
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ('day', 'restaurant', 'product', 'orders', 'quantity', 'revenue')
+    list_filter = ('restaurant',)
+    date_hierarchy = 'day'
+    readonly_fields = ('restaurant', 'day', 'product', 'orders', 'quantity', 'revenue')
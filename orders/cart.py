@@ -0,0 +1,89 @@
+"""
+Cart resolution for the orders app.
+
+The session cart only stores ``{product_id: quantity}`` pairs. Every
+view that renders or checks out the cart needs the matching `Product`
+rows together with their restaurant, so this module resolves the whole
+cart in a single query instead of one lookup per line.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Mapping
+
+from restaurants.models import Product, Restaurant  # type: ignore
+
+
+@dataclass
+class CartLine:
+    """A cart entry joined with its product (restaurant already loaded)."""
+    product: Product
+    quantity: int
+
+    @property
+    def line_total(self) -> Decimal:
+        return self.product.price * self.quantity
+
+
+@dataclass
+class ResolvedCart:
+    """
+    Result of `resolve_cart`.
+
+    ``missing_ids`` lists every cart entry whose product no longer exists,
+    so callers can report (or prune) them together rather than failing on
+    the first one.
+    """
+    lines: list[CartLine] = field(default_factory=list)
+    missing_ids: list[int] = field(default_factory=list)
+
+    @property
+    def subtotal(self) -> Decimal:
+        return sum((line.line_total for line in self.lines), Decimal('0.00'))
+
+    @property
+    def restaurants(self) -> list[Restaurant]:
+        seen: dict[int, Restaurant] = {}
+        for line in self.lines:
+            seen.setdefault(line.product.restaurant_id, line.product.restaurant)
+        return list(seen.values())
+
+    @property
+    def restaurant(self) -> Restaurant | None:
+        """The cart's restaurant, or ``None`` if the cart is empty or mixed."""
+        restaurants = self.restaurants
+        return restaurants[0] if len(restaurants) == 1 else None
+
+    @property
+    def is_single_restaurant(self) -> bool:
+        return len(self.restaurants) <= 1
+
+    def __bool__(self) -> bool:
+        return bool(self.lines)
+
+
+def resolve_cart(cart: Mapping[str, int]) -> ResolvedCart:
+    """
+    Load all products referenced by ``cart`` with one ``select_related``
+    query and return them in cart order.
+    """
+    resolved = ResolvedCart()
+    wanted: list[tuple[int, int]] = []
+    for product_id_str, quantity in cart.items():
+        try:
+            wanted.append((int(product_id_str), int(quantity)))
+        except (TypeError, ValueError):
+            continue
+
+    products = Product.objects.select_related('restaurant').in_bulk(
+        [product_id for product_id, _ in wanted]
+    ) if wanted else {}
+
+    for product_id, quantity in wanted:
+        product = products.get(product_id)
+        if product is None:
+            resolved.missing_ids.append(product_id)
+        else:
+            resolved.lines.append(CartLine(product=product, quantity=quantity))
+    return resolved
@@ -0,0 +1,319 @@
+"""
+Automatic courier dispatch.
+
+`run_tick` matches confirmed, unassigned orders to couriers in one
+batch, oldest order first:
+
+- Orders and couriers are placed on a local plane (kilometres, an
+  equirectangular projection around the batch; accurate to well under 1%
+  at city scale).
+- The cost of giving an order to a courier is the distance from where
+  the courier will next be free to the restaurant, plus
+  ``DISPATCH_LOAD_PENALTY_KM`` for every delivery the courier is
+  carrying. A courier who is free is where they last dropped an order off
+  (the depot, ``DISPATCH_DEPOT``, for couriers without one); a busy
+  courier is free at the drop-off of their newest active delivery.
+  Couriers at ``DISPATCH_CAPACITY`` take no more orders; pairs farther
+  apart than ``DISPATCH_MAX_PICKUP_KM`` are never matched.
+- Matching runs in rounds. In each round every order in turn gets the
+  cheapest courier not taken yet in that round (greedy); a courier who
+  got one is then placed at its drop-off point, one delivery heavier,
+  for the next round. With numpy the cost matrix is computed in one go
+  and every order's cheapest couriers are sorted once per round, which
+  leaves a short scan of plain lists; a pure-Python loop computes the
+  same assignment when numpy is not installed.
+
+All assignments of a tick are written in one transaction with
+`orders.state.assign_couriers`, a few hundred orders per UPDATE. Like
+`orders.services.claim_order` the UPDATE only touches orders that are
+still confirmed and unassigned, so an order a courier accepted by hand in
+the meantime is skipped rather than reassigned.
+
+Couriers count as available if they logged in within
+``DISPATCH_ACTIVE_WINDOW`` seconds. Coordinates are read from the stored
+restaurant/order columns (see `core.geocoding`).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Sequence
+
+from django.conf import settings  # type: ignore
+from django.db.models import Count, OuterRef, Q, Subquery  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from accounts.models import User
+from core.geocoding import stored_point, stored_points
+from core.spatial import KM_PER_DEGREE as _KM_PER_DEGREE
+from .lists import available_orders
+from .models import Order
+from .state import assign_couriers
+
+try:
+    import numpy  # type: ignore
+except ImportError:
+    numpy = None  # type: ignore
+
+Point = tuple[float, float]  # (lat, lng)
+
+ACTIVE_STATUSES = (Order.STATUS_ACCEPTED, Order.STATUS_PICKED_UP)
+
+# Orders per cost matrix block, and cheapest couriers kept per order, in
+# the numpy matcher (it scans the whole row when all of those are taken)
+_BLOCK = 256
+_CANDIDATES = 16
+
+
+@dataclass(frozen=True)
+class Job:
+    order_id: int
+    pickup: Point
+    dropoff: Point
+
+
+@dataclass(frozen=True)
+class CourierState:
+    courier_id: int
+    position: Point
+    load: int = 0
+
+
+@dataclass
+class TickResult:
+    orders: int = 0
+    couriers: int = 0
+    assignments: list[tuple[int, int]] = field(default_factory=list)
+    #: Matched orders a courier took by hand before the tick committed
+    conflicts: int = 0
+
+
+# --- Matching (no database access) ---
+
+def _project(points: Sequence[Point], lat0: float) -> tuple[list[float], list[float]]:
+    scale = math.cos(math.radians(lat0))
+    return (
+        [lng * _KM_PER_DEGREE * scale for _, lng in points],
+        [lat * _KM_PER_DEGREE for lat, _ in points],
+    )
+
+
+def match(
+    jobs: Sequence[Job],
+    couriers: Sequence[CourierState],
+    *,
+    capacity: int = 1,
+    load_penalty_km: float = 2.0,
+    max_pickup_km: float | None = None,
+    use_numpy: bool | None = None,
+) -> list[tuple[int, int]]:
+    """
+    Assign ``jobs`` (in priority order) to ``couriers``.
+
+    Works in rounds in which every courier below ``capacity`` takes at
+    most one order. Within a round costs do not change, so each order in
+    turn gets the cheapest courier nobody took yet; a courier who got an
+    order is then placed at its drop-off, one delivery heavier, for the
+    next round. Returns ``(order_id, courier_id)`` pairs. ``use_numpy``
+    forces one implementation; by default numpy is used when installed.
+    """
+    if not jobs or not couriers:
+        return []
+    lat0 = sum(point[0] for point in (*(j.pickup for j in jobs), *(c.position for c in couriers))) / (
+        len(jobs) + len(couriers)
+    )
+    job_x, job_y = _project([job.pickup for job in jobs], lat0)
+    drop_x, drop_y = _project([job.dropoff for job in jobs], lat0)
+    courier_x, courier_y = _project([courier.position for courier in couriers], lat0)
+    load = [courier.load for courier in couriers]
+    limit = math.inf if max_pickup_km is None else max_pickup_km
+
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    round_fn = _round_numpy if use_numpy else _round_python
+
+    pairs: list[tuple[int, int]] = []
+    waiting = list(range(len(jobs)))
+    while waiting:
+        free = [c for c in range(len(couriers)) if load[c] < capacity]
+        if not free:
+            break
+        won = round_fn(
+            [job_x[j] for j in waiting], [job_y[j] for j in waiting],
+            [courier_x[c] for c in free], [courier_y[c] for c in free],
+            [load[c] * load_penalty_km for c in free], limit,
+        )
+        if not won:
+            break
+        for w, f in won:
+            j, c = waiting[w], free[f]
+            pairs.append((j, c))
+            load[c] += 1
+            courier_x[c], courier_y[c] = drop_x[j], drop_y[j]
+        taken = {w for w, _ in won}
+        waiting = [j for w, j in enumerate(waiting) if w not in taken]
+    pairs.sort()
+    return [(jobs[j].order_id, couriers[c].courier_id) for j, c in pairs]
+
+
+def _round_python(job_x, job_y, courier_x, courier_y, extra, limit) -> list[tuple[int, int]]:
+    free = set(range(len(courier_x)))
+    limit_sq = limit * limit
+    pairs = []
+    for j in range(len(job_x)):
+        if not free:
+            break
+        x, y = job_x[j], job_y[j]
+        best, best_cost = -1, math.inf
+        for c in free:
+            dx, dy = courier_x[c] - x, courier_y[c] - y
+            d2 = dx * dx + dy * dy
+            if d2 > limit_sq:
+                continue
+            cost = math.sqrt(d2) + extra[c]
+            if cost < best_cost:
+                best, best_cost = c, cost
+        if best < 0:
+            continue
+        pairs.append((j, best))
+        free.discard(best)
+    return pairs
+
+
+def _round_numpy(job_x, job_y, courier_x, courier_y, extra, limit) -> list[tuple[int, int]]:
+    job_x, job_y = numpy.asarray(job_x), numpy.asarray(job_y)
+    courier_x, courier_y, extra = numpy.asarray(courier_x), numpy.asarray(courier_y), numpy.asarray(extra)
+    free = numpy.arange(len(courier_x))
+    pairs = []
+    # A block of orders at a time against the couriers still free, so rows
+    # past the point where every courier is taken are never computed
+    for start in range(0, len(job_x), _BLOCK):
+        if not len(free):
+            break
+        dx = job_x[start:start + _BLOCK, None] - courier_x[free]
+        dy = job_y[start:start + _BLOCK, None] - courier_y[free]
+        cost = numpy.sqrt(dx * dx + dy * dy)
+        cost[cost > limit] = numpy.inf
+        cost += extra[free]
+        # Each order's cheapest couriers, cheapest first. Costs do not change
+        # within a round, so the first of them nobody took yet is the best
+        n_free = len(free)
+        k = min(n_free, _CANDIDATES)
+        candidates = numpy.argpartition(cost, k - 1, axis=1)[:, :k] if k < n_free else numpy.indices(cost.shape)[1]
+        candidate_cost = numpy.take_along_axis(cost, candidates, axis=1)
+        order = numpy.argsort(candidate_cost, axis=1, kind='stable')
+        candidates = numpy.take_along_axis(candidates, order, axis=1).tolist()
+        candidate_cost = numpy.take_along_axis(candidate_cost, order, axis=1).tolist()
+
+        taken = [False] * n_free
+        left = n_free
+        for j, (row, row_cost) in enumerate(zip(candidates, candidate_cost)):
+            best = -1
+            for c, value in zip(row, row_cost):
+                if value == math.inf:
+                    break
+                if not taken[c]:
+                    best = c
+                    break
+            else:
+                if k < n_free:
+                    # All of this order's candidates are gone: scan the whole row
+                    rest = numpy.where(taken, numpy.inf, cost[j])
+                    c = int(rest.argmin())
+                    if rest[c] != numpy.inf:
+                        best = c
+            if best < 0:
+                continue
+            pairs.append((start + j, int(free[best])))
+            taken[best] = True
+            left -= 1
+            if not left:
+                break
+        free = free[~numpy.asarray(taken)]
+    return pairs
+
+
+# --- Database side ---
+
+def _last_delivered(courier):
+    # Delivery is the last change made to an order, so updated_at is when it was delivered
+    return Order.objects.filter(courier=courier, status=Order.STATUS_DELIVERED).order_by('-updated_at', '-id')
+
+
+def load_jobs(batch: int) -> list[Job]:
+    rows = list(
+        available_orders()
+        .order_by('created_at', 'id')
+        .values_list(
+            'pk', 'restaurant__latitude', 'restaurant__longitude', 'restaurant__address',
+            'delivery_latitude', 'delivery_longitude', 'delivery_address',
+        )[:batch]
+    )
+    points = stored_points([*(row[1:4] for row in rows), *(row[4:7] for row in rows)])
+    return [
+        # An order whose drop-off cannot be placed leaves its courier at the restaurant
+        Job(row[0], pickup, dropoff or pickup)
+        for row, pickup, dropoff in zip(rows, points[:len(rows)], points[len(rows):])
+        if pickup is not None
+    ]
+
+
+def load_couriers(now=None) -> list[CourierState]:
+    now = now or timezone.now()
+    window = timedelta(seconds=getattr(settings, 'DISPATCH_ACTIVE_WINDOW', 12 * 3600))
+    depot = tuple(getattr(settings, 'DISPATCH_DEPOT', (41.9973, 21.4280)))
+    active = Order.objects.filter(courier=OuterRef('pk'), status__in=ACTIVE_STATUSES).order_by('-created_at', '-id')
+    rows = list(
+        User.objects.filter(role=User.ROLE_COURIER, is_active=True, last_login__gte=now - window)
+        .annotate(
+            load=Count('deliveries', filter=Q(deliveries__status__in=ACTIVE_STATUSES)),
+            active_order=Subquery(active.values('pk')[:1]),
+            last_order=Subquery(_last_delivered(OuterRef('pk')).values('pk')[:1]),
+        )
+        .values_list('pk', 'load', 'active_order', 'last_order')
+    )
+    order_ids = {order_id for _, _, *orders in rows for order_id in orders if order_id is not None}
+    stored = list(
+        Order.objects.filter(pk__in=order_ids)
+        .values_list('pk', 'delivery_latitude', 'delivery_longitude', 'delivery_address')
+    )
+    points = dict(zip((row[0] for row in stored), stored_points(row[1:] for row in stored)))
+    return [
+        # Busy couriers are free where their last active delivery ends;
+        # idle ones wait where they dropped off last, or at the depot
+        CourierState(pk, points.get(active_order) or points.get(last_order) or depot, load)
+        for pk, load, active_order, last_order in rows
+    ]
+
+
+def courier_position(courier) -> Point:
+    """Where ``courier`` is: the drop-off point of their last delivered order, else the depot."""
+    last = (
+        _last_delivered(courier)
+        .values_list('delivery_latitude', 'delivery_longitude', 'delivery_address').first()
+    )
+    point = stored_point(*last) if last is not None else None
+    return point or tuple(getattr(settings, 'DISPATCH_DEPOT', (41.9973, 21.4280)))
+
+
+def run_tick(*, dry_run: bool = False, now=None) -> TickResult:
+    """Match waiting orders to available couriers and store the assignments."""
+    jobs = load_jobs(getattr(settings, 'DISPATCH_BATCH', 1000))
+    couriers = load_couriers(now) if jobs else []
+    result = TickResult(orders=len(jobs), couriers=len(couriers))
+    pairs = match(
+        jobs,
+        couriers,
+        capacity=getattr(settings, 'DISPATCH_CAPACITY', 1),
+        load_penalty_km=getattr(settings, 'DISPATCH_LOAD_PENALTY_KM', 2.0),
+        max_pickup_km=getattr(settings, 'DISPATCH_MAX_PICKUP_KM', None),
+    )
+    if dry_run:
+        result.assignments = pairs
+        return result
+
+    applied = assign_couriers(dict(pairs))
+    result.assignments = [(order_id, courier_id) for order_id, courier_id in pairs if applied.get(order_id) == courier_id]
+    result.conflicts = len(pairs) - len(result.assignments)
+    return result
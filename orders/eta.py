@@ -0,0 +1,170 @@
+"""
+Server-side delivery estimates for order tracking.
+
+`estimate` computes when an order should be picked up and delivered:
+
+- travel time is the straight-line distance times ``ETA_ROUTE_FACTOR``
+  (streets are not straight) at ``ETA_SPEED_KMH``;
+- the kitchen needs the restaurant's typical preparation time: the
+  median confirmed → picked up time of its last ``ETA_PREP_SAMPLE``
+  orders in the transition log (``ETA_DEFAULT_PREP_MINUTES`` without
+  history), cached per restaurant;
+- an assigned courier first rides from their position
+  (`orders.dispatch.courier_position`) to the restaurant; an unassigned
+  order waits ``ETA_DISPATCH_MINUTES`` for one. Every other delivery the
+  courier is carrying adds ``ETA_STOP_MINUTES``.
+
+Estimates hold absolute times and are cached per order (``eta:<id>``,
+``ETA_CACHE_TTL``); `orders.state` drops the entry when the order
+changes status. `get_eta` adds the parts that move with the clock
+(route progress, minutes left) on every read, so polling the estimate
+costs a cache read rather than a recomputation.
+"""
+from __future__ import annotations
+
+import math
+import statistics
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from django.conf import settings  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.db.models import OuterRef  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.utils.dateparse import parse_datetime  # type: ignore
+
+from core.geocoding import stored_point
+from core.spatial import project
+from .metrics import entered_at
+from .models import Order, OrderTransition
+
+
+def _setting(name: str, default: float) -> float:
+    return getattr(settings, name, default)
+
+
+def _key(order_id: int) -> str:
+    return f'eta:{order_id}'
+
+
+def forget(order_ids: Iterable[int]) -> None:
+    """Drop cached estimates (called by `orders.state` after a status change)."""
+    cache.delete_many([_key(order_id) for order_id in order_ids])
+
+
+def _km(a, b) -> float:
+    ref_lat = (a[0] + b[0]) / 2
+    (ax, ay), (bx, by) = project(a, ref_lat), project(b, ref_lat)
+    return math.hypot(ax - bx, ay - by)
+
+
+def _travel(a, b) -> timedelta:
+    km = _km(a, b) * _setting('ETA_ROUTE_FACTOR', 1.3)
+    return timedelta(hours=km / _setting('ETA_SPEED_KMH', 20.0))
+
+
+def prep_time(restaurant_id: int) -> timedelta:
+    """Typical confirmed → picked up time of ``restaurant_id``, cached."""
+    key = f'eta:prep:{restaurant_id}'
+    minutes = cache.get(key)
+    if minutes is None:
+        picked_up = (
+            OrderTransition.objects.filter(order__restaurant_id=restaurant_id, to_status=Order.STATUS_PICKED_UP)
+            .annotate(confirmed_at=entered_at(Order.STATUS_CONFIRMED))
+            .filter(confirmed_at__isnull=False)
+            .order_by('-created_at')
+            .values_list('confirmed_at', 'created_at')[:int(_setting('ETA_PREP_SAMPLE', 50))]
+        )
+        samples = [(done - started).total_seconds() / 60 for started, done in picked_up]
+        minutes = statistics.median(samples) if samples else _setting('ETA_DEFAULT_PREP_MINUTES', 15.0)
+        cache.set(key, minutes, timeout=int(_setting('ETA_PREP_CACHE_TTL', 600)))
+    return timedelta(minutes=minutes)
+
+
+def estimate(order_id: int) -> dict[str, Any] | None:
+    """Compute the estimate for ``order_id`` (``None`` if there is no such order)."""
+    # Imported here: dispatch imports orders.state, which imports this module
+    from .dispatch import ACTIVE_STATUSES, courier_position
+
+    order = (
+        Order.objects.select_related('restaurant')
+        .annotate(
+            confirmed_at=entered_at(Order.STATUS_CONFIRMED, OuterRef('pk')),
+            picked_up_at=entered_at(Order.STATUS_PICKED_UP, OuterRef('pk')),
+            delivered_at=entered_at(Order.STATUS_DELIVERED, OuterRef('pk')),
+        )
+        .filter(pk=order_id)
+        .first()
+    )
+    if order is None:
+        return None
+    restaurant = order.restaurant
+    start = stored_point(restaurant.latitude, restaurant.longitude, restaurant.address)
+    end = stored_point(order.delivery_latitude, order.delivery_longitude, order.delivery_address)
+    now = timezone.now()
+    stop = timedelta(minutes=_setting('ETA_STOP_MINUTES', 5.0))
+    travel = _travel(start, end) if start and end else timedelta(0)
+    load = 0
+    if order.courier_id is not None:
+        load = Order.objects.filter(courier_id=order.courier_id, status__in=ACTIVE_STATUSES).exclude(pk=order.pk).count()
+
+    pickup_at = delivery_at = None
+    status = order.status
+    if status in (Order.STATUS_PLACED, Order.STATUS_PENDING, Order.STATUS_CONFIRMED, Order.STATUS_ACCEPTED):
+        ready_at = (order.confirmed_at or now) + prep_time(restaurant.pk)
+        if order.courier_id is None:
+            courier_at = now + timedelta(minutes=_setting('ETA_DISPATCH_MINUTES', 5.0))
+        else:
+            position = courier_position(order.courier_id)
+            courier_at = now + (_travel(position, start) if start else timedelta(0)) + load * stop
+        pickup_at = max(ready_at, courier_at)
+        delivery_at = pickup_at + travel
+    elif status == Order.STATUS_PICKED_UP:
+        pickup_at = order.picked_up_at or order.updated_at
+        delivery_at = max(pickup_at + travel + load * stop, now)
+    elif status == Order.STATUS_DELIVERED:
+        delivery_at = order.delivered_at or order.updated_at
+        pickup_at = order.picked_up_at
+
+    return {
+        'order': order.pk,
+        'status': status,
+        # Who may read it, so the endpoint can answer from the cache alone
+        'viewers': [order.user_id, restaurant.owner_id, order.courier_id],
+        'pickup_at': pickup_at.isoformat() if pickup_at else None,
+        'delivery_at': delivery_at.isoformat() if delivery_at else None,
+        'route': {'from': start, 'to': end} if start and end else None,
+        'computed_at': now.isoformat(),
+    }
+
+
+def _progress(status: str, pickup_at: datetime | None, delivery_at: datetime | None, now: datetime) -> float:
+    if status == Order.STATUS_DELIVERED:
+        return 1.0
+    if status != Order.STATUS_PICKED_UP or pickup_at is None or delivery_at is None or delivery_at <= pickup_at:
+        return 0.0
+    # Never show the courier at the door before they report delivery
+    return min(0.97, max(0.0, (now - pickup_at) / (delivery_at - pickup_at)))
+
+
+def get_eta(order_id: int) -> dict[str, Any] | None:
+    """The cached estimate for ``order_id`` plus its clock-dependent fields."""
+    key = _key(order_id)
+    eta = cache.get(key)
+    if eta is None:
+        eta = estimate(order_id)
+        if eta is None:
+            return None
+        cache.set(key, eta, timeout=int(_setting('ETA_CACHE_TTL', 60)))
+
+    now = timezone.now()
+    pickup_at = parse_datetime(eta['pickup_at']) if eta['pickup_at'] else None
+    delivery_at = parse_datetime(eta['delivery_at']) if eta['delivery_at'] else None
+    remaining = None
+    if delivery_at is not None and eta['status'] != Order.STATUS_DELIVERED:
+        remaining = max(0, math.ceil((delivery_at - now).total_seconds() / 60))
+    return {
+        **eta,
+        'progress': round(_progress(eta['status'], pickup_at, delivery_at, now), 4),
+        'minutes_remaining': remaining,
+    }
@@ -0,0 +1,69 @@
+"""
+Order status events for the SSE streams (see `core.events`).
+
+Every status transition calls `publish_status` with the ids it changed.
+After the transaction commits, the orders are read back in one query and
+a ``status`` event goes to:
+
+- ``order:<id>``: the order's tracking page;
+- ``couriers``: every courier dashboard, when an order becomes available
+  (``confirmed``) or leaves the board (``accepted``, ``canceled``);
+- ``courier:<id>``: the assigned courier's dashboard, for the later
+  steps (``picked_up``, ``delivered``).
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from django.db import transaction  # type: ignore
+
+from core import events
+from .models import Order
+
+BOARD_CHANNEL = 'couriers'
+# Statuses that add an order to, or remove it from, the available board
+_BOARD_STATUSES = (Order.STATUS_CONFIRMED, Order.STATUS_ACCEPTED, Order.STATUS_CANCELED)
+_STATUS_LABELS = dict(Order.STATUS_CHOICES)
+STATUS_FIELDS = ('pk', 'status', 'courier_id', 'restaurant_id', 'restaurant__name', 'updated_at')
+
+
+def order_channel(order_id: int) -> str:
+    return f'order:{order_id}'
+
+
+def courier_channel(courier_id: int) -> str:
+    return f'courier:{courier_id}'
+
+
+def status_event(row: dict[str, Any]) -> events.Message:
+    """``status`` event for a ``values(*STATUS_FIELDS)`` row."""
+    return {
+        'event': 'status',
+        'data': {
+            'id': row['pk'],
+            'status': row['status'],
+            'status_display': _STATUS_LABELS.get(row['status'], row['status']),
+            'courier_id': row['courier_id'],
+            'restaurant': {'id': row['restaurant_id'], 'name': row['restaurant__name']},
+            'updated_at': row['updated_at'].isoformat(),
+        },
+    }
+
+
+def publish_status(order_ids: Iterable[int]) -> None:
+    """Publish the current status of ``order_ids`` once the transaction commits."""
+    order_ids = list(order_ids)
+    if order_ids:
+        transaction.on_commit(lambda: _publish(order_ids))
+
+
+def _publish(order_ids: list[int]) -> None:
+    for row in Order.objects.filter(pk__in=order_ids).values(*STATUS_FIELDS):
+        message = status_event(row)
+        event, data = message['event'], message['data']
+        events.publish(order_channel(row['pk']), event, data)
+        if row['status'] in _BOARD_STATUSES:
+            # Board events reach the assigned courier's dashboard as well
+            events.publish(BOARD_CHANNEL, event, data)
+        elif row['courier_id'] is not None:
+            events.publish(courier_channel(row['courier_id']), event, data)
@@ -0,0 +1,136 @@
+"""
+Order lists shown to customers, owners and couriers.
+
+Every list is a queryset built here and paged with keyset pagination
+(`core.pagination`) on ``(created_at, id)``, newest first. A page costs
+one ``... WHERE (created_at, id) < last_seen ORDER BY created_at DESC,
+id DESC LIMIT n`` query however long the history behind it is; the old
+views rendered every matching order.
+
+The same pages are available as JSON (``?format=json`` or an
+``Accept: application/json`` header), with the ``next`` cursor of each
+page to be passed back as the page's cursor parameter.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings  # type: ignore
+from django.db.models import QuerySet  # type: ignore
+from django.http import HttpRequest  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from core.pagination import KeysetPage, paginate_keyset
+from core.spatial import Point
+from restaurants.nearby import restaurants_within
+from .models import Order
+
+ORDERING = ('-created_at', '-id')
+_RELATED = ('user', 'restaurant')
+
+
+# --- Querysets ---
+
+def customer_orders(user) -> QuerySet:
+    return Order.objects.filter(user=user).select_related(*_RELATED)
+
+
+def owner_orders(user) -> QuerySet:
+    return Order.objects.filter(restaurant__owner=user).select_related(*_RELATED)
+
+
+def confirmed_orders() -> QuerySet:
+    return Order.objects.filter(status=Order.STATUS_CONFIRMED).select_related(*_RELATED)
+
+
+def available_orders() -> QuerySet:
+    return (
+        Order.objects.filter(status=Order.STATUS_CONFIRMED, courier__isnull=True)
+        .select_related(*_RELATED)
+    )
+
+
+def nearby_available_orders(point: Point, radius_km: float | None = None, limit: int = 20) -> list[Order]:
+    """
+    Available orders whose restaurant is within ``radius_km`` of ``point``,
+    nearest restaurant first (oldest order first per restaurant). Each
+    order gets a ``pickup_km`` attribute. The restaurants come from the
+    spatial index; the orders from one indexed ``restaurant_id IN`` query.
+    """
+    distances = {pk: distance for distance, pk in restaurants_within(point, radius_km)}
+    if not distances:
+        return []
+    orders = list(available_orders().filter(restaurant_id__in=distances))
+    for order in orders:
+        order.pickup_km = distances[order.restaurant_id]
+    orders.sort(key=lambda order: (order.pickup_km, order.created_at, order.pk))
+    return orders[:limit]
+
+
+def courier_active_orders(courier) -> QuerySet:
+    return (
+        Order.objects.filter(courier=courier, status__in=[Order.STATUS_ACCEPTED, Order.STATUS_PICKED_UP])
+        .select_related(*_RELATED)
+    )
+
+
+def courier_delivered_orders(courier) -> QuerySet:
+    return (
+        Order.objects.filter(courier=courier, status=Order.STATUS_DELIVERED)
+        .select_related(*_RELATED)
+    )
+
+
+# --- Paging ---
+
+def page_size(request: HttpRequest) -> int:
+    """``?limit=`` if given, else ``ORDER_LIST_PAGE_SIZE``; raises ValueError if not a number."""
+    default = getattr(settings, 'ORDER_LIST_PAGE_SIZE', 25)
+    return int(request.GET.get('limit') or default)
+
+
+def order_page(request: HttpRequest, queryset: QuerySet, cursor_param: str = 'cursor') -> KeysetPage:
+    """The page of ``queryset`` selected by ``request``; raises InvalidCursor/ValueError."""
+    return paginate_keyset(queryset, ORDERING, request.GET.get(cursor_param) or None, page_size(request))
+
+
+def next_page_url(request: HttpRequest, page: KeysetPage, cursor_param: str = 'cursor') -> str | None:
+    """URL of the page after ``page``, keeping the other query parameters (e.g. other lists' cursors)."""
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params[cursor_param] = page.next_cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def first_page_url(request: HttpRequest, cursor_param: str = 'cursor') -> str | None:
+    """URL back to the newest orders, or ``None`` when already there."""
+    if not request.GET.get(cursor_param):
+        return None
+    params = request.GET.copy()
+    del params[cursor_param]
+    return f'{request.path}?{params.urlencode()}' if params else request.path
+
+
+def wants_json(request: HttpRequest) -> bool:
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('accept', '')
+
+
+def serialize_order(order: Order) -> dict[str, Any]:
+    return {
+        'id': order.pk,
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'restaurant': {'id': order.restaurant_id, 'name': order.restaurant.name},
+        'customer': order.user.username,
+        'courier_id': order.courier_id,
+        'delivery_address': order.delivery_address,
+        'total': str(order.total),
+        'created_at': order.created_at.isoformat(),
+        'updated_at': order.updated_at.isoformat(),
+        'track_url': reverse('orders:track_order', args=[order.pk]),
+    }
+
+
+def serialize_page(page: KeysetPage) -> dict[str, Any]:
+    return {'results': [serialize_order(order) for order in page.items], 'next': page.next_cursor}
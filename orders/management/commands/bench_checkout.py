@@ -0,0 +1,139 @@
+"""
+Micro-benchmark for order placement.
+
+Usage:
+    python manage.py bench_checkout [--orders 200] [--lines 5]
+
+Places the same synthetic cart many times through the legacy
+per-row path (``Order.objects.create`` + one ``OrderItem.objects.create``
+per line, autocommit) and through `orders.services.place_order`
+(one transaction, one ``bulk_create``), then prints INSERTs and UPDATEs
+per order and p50/p99 latency for each.
+
+Both paths do the same work around the inserts (geocoding the address,
+reserving stock, writing the transition log), so the difference is only
+how the order and its items are written. The cost of that shared work
+is measured on its own, in one transaction, and printed as ``shared``. All rows created by
+the benchmark are removed afterwards.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+import uuid
+from decimal import Decimal
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts.models import User
+from orders.cart import resolve_cart
+from core.geocoding import geocode
+from orders.models import Order, OrderItem
+from orders.services import place_order
+from orders.state import record_placed
+from restaurants.models import Restaurant, Product
+from restaurants.stock import reserve_stock
+
+
+def _legacy_place_order(*, user, cart, delivery_address: str) -> Order:
+    """
+    The pre-transactional implementation, kept here for comparison only,
+    with the geocoding, stock reservation and transition log that
+    `place_order` has gained since, so both paths do the same work.
+    """
+    latitude, longitude = geocode(delivery_address) or (None, None)
+    reserve_stock((line.product.pk, line.quantity) for line in cart.lines)
+    order = Order.objects.create(
+        user=user,
+        restaurant=cart.restaurant,
+        status=Order.STATUS_PLACED,
+        delivery_address=delivery_address,
+        delivery_latitude=latitude,
+        delivery_longitude=longitude,
+        subtotal=cart.subtotal,
+        delivery_fee=Decimal('0.00'),
+        total=cart.subtotal,
+    )
+    for line in cart.lines:
+        OrderItem.objects.create(
+            order=order,
+            product=line.product,
+            quantity=line.quantity,
+            price_at_time=line.product.price,
+        )
+    record_placed(order)
+    return order
+
+
+def _shared_work(*, user, cart, delivery_address: str, log_order: Order) -> None:
+    """What both paths do besides writing the order and its items, in one transaction like `place_order`."""
+    geocode(delivery_address)
+    with transaction.atomic():
+        reserve_stock((line.product.pk, line.quantity) for line in cart.lines)
+        record_placed(log_order)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark order placement (legacy per-row inserts vs. bulk transactional path)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200, help='Orders to place per variant.')
+        parser.add_argument('--lines', type=int, default=5, help='Cart lines per order.')
+
+    @override_settings(STRIPE_PREFETCH_INTENTS=False)
+    def handle(self, *args, **options):
+        n_orders: int = options['orders']
+        n_lines: int = options['lines']
+
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(username=f'bench-owner-{tag}', role=User.ROLE_OWNER)
+        customer = User.objects.create_user(username=f'bench-customer-{tag}')
+        try:
+            restaurant = Restaurant.objects.create(name=f'Bench {tag}', owner=owner)
+            products = Product.objects.bulk_create([
+                Product(restaurant=restaurant, name=f'Item {i}', price=Decimal('4.50'), quantity=10 ** 6)
+                for i in range(n_lines)
+            ])
+            cart = resolve_cart({str(p.pk): 2 for p in products})
+            # The shared-work run logs its transitions against this order
+            log_order = Order.objects.create(
+                user=customer, restaurant=restaurant, delivery_address='Skopje',
+                subtotal=Decimal('0.00'), total=Decimal('0.00'),
+            )
+            variants = (
+                ('shared', partial(_shared_work, log_order=log_order)),
+                ('legacy', _legacy_place_order),
+                ('bulk', place_order),
+            )
+            for label, fn in variants:
+                latencies: list[float] = []
+                statements: dict[str, int] = {'INSERT': 0, 'UPDATE': 0}
+                for _ in range(n_orders):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        fn(user=customer, cart=cart, delivery_address='Skopje')
+                        latencies.append((time.perf_counter() - started) * 1000)
+                    for query in queries:
+                        verb = query['sql'].lstrip().split(None, 1)[0].upper()
+                        if verb in statements:
+                            statements[verb] += 1
+
+                self.stdout.write(
+                    f"{label:>6}: {statements['INSERT'] / n_orders:.1f} inserts/order, "
+                    f"{statements['UPDATE'] / n_orders:.1f} updates/order, "
+                    f"p50={statistics.median(latencies):.2f}ms "
+                    f"p99={_percentile(latencies, 99):.2f}ms "
+                    f"({n_orders} orders x {n_lines} lines)"
+                )
+        finally:
+            customer.delete()
+            owner.delete()
@@ -0,0 +1,114 @@
+"""
+Benchmark the courier dispatch tick.
+
+Usage:
+    python manage.py bench_dispatch [--orders 1000] [--couriers 500] [--rounds 20] [--ticks 5] [--capacity 1]
+
+Matches random orders and couriers spread over Skopje with
+`orders.dispatch.match`, once with numpy (if installed) and once with the
+pure-Python fallback, and prints p50/p99 per tick. Then runs ``--ticks``
+full `orders.dispatch.run_tick` calls (queries, matching and the
+assignment transaction) against synthetic rows with stored coordinates,
+each rolled back before the next, inside a transaction that is rolled
+back afterwards.
+"""
+from __future__ import annotations
+
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from orders import dispatch
+from orders.models import Order
+from restaurants.models import Restaurant
+
+_LAT, _LNG = (41.97, 42.03), (21.38, 21.48)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark batched courier matching (numpy vs pure Python) and a full dispatch tick."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--couriers', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--ticks', type=int, default=5, help='Full ticks to run against the database.')
+        parser.add_argument('--capacity', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def point():
+            return (rng.uniform(*_LAT), rng.uniform(*_LNG))
+
+        jobs = [dispatch.Job(i, point(), point()) for i in range(options['orders'])]
+        couriers = [dispatch.CourierState(i, point(), rng.randint(0, 1)) for i in range(options['couriers'])]
+
+        variants = [('python', False)]
+        if dispatch.numpy is not None:
+            variants.insert(0, ('numpy', True))
+        else:
+            self.stdout.write(self.style.WARNING('numpy is not installed; only the pure-Python matcher is measured.'))
+        for label, use_numpy in variants:
+            timings = []
+            for _ in range(options['rounds']):
+                started = time.perf_counter()
+                pairs = dispatch.match(jobs, couriers, capacity=options['capacity'], use_numpy=use_numpy)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"match {label:>6}: {len(jobs)} orders x {len(couriers)} couriers -> {len(pairs)} assigned, "
+                f"p50={statistics.median(timings):.1f}ms p99={_percentile(timings, 99):.1f}ms"
+            )
+
+        self._full_tick(options, point)
+
+    def _full_tick(self, options, point) -> None:
+        tag = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            owner = User.objects.create_user(username=f'dispatch-owner-{tag}', role=User.ROLE_OWNER)
+            customer = User.objects.create_user(username=f'dispatch-customer-{tag}')
+            restaurants = Restaurant.objects.bulk_create([
+                Restaurant(name=f'Dispatch {tag} {i}', owner=owner, address=f'Street {i}', latitude=lat, longitude=lng)
+                for i, (lat, lng) in enumerate(point() for _ in range(50))
+            ])
+            User.objects.bulk_create([
+                User(username=f'dispatch-courier-{tag}-{i}', role=User.ROLE_COURIER, last_login=timezone.now())
+                for i in range(options['couriers'])
+            ])
+            Order.objects.bulk_create([
+                Order(
+                    user=customer, restaurant=restaurants[i % len(restaurants)], status=Order.STATUS_CONFIRMED,
+                    delivery_address=f'Address {i}', delivery_latitude=lat, delivery_longitude=lng,
+                    subtotal=Decimal('5.00'), total=Decimal('5.00'),
+                )
+                for i, (lat, lng) in enumerate(point() for _ in range(options['orders']))
+            ])
+            timings = []
+            with override_settings(DISPATCH_CAPACITY=options['capacity'], DISPATCH_BATCH=options['orders']):
+                for _ in range(options['ticks']):
+                    savepoint = transaction.savepoint()
+                    started = time.perf_counter()
+                    result = dispatch.run_tick()
+                    timings.append((time.perf_counter() - started) * 1000)
+                    transaction.savepoint_rollback(savepoint)
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f"full tick: {result.orders} orders, {result.couriers} couriers -> "
+            f"{len(result.assignments)} assigned, p50={statistics.median(timings):.1f}ms "
+            f"max={max(timings):.1f}ms over {len(timings)} ticks (rolled back)"
+        )
@@ -0,0 +1,61 @@
+"""
+Benchmark delivery estimates: computed per request vs. served from cache.
+
+Usage:
+    python manage.py bench_eta [--orders 200] [--rounds 5]
+
+Takes the most recent ``--orders`` orders and prints p50/p99 per lookup
+for `orders.eta.estimate` (what every tracking page view cost when it
+recomputed) and for `orders.eta.get_eta` with a warm cache (what a
+polling tracking page costs now). Read-only apart from the cache.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.eta import estimate, forget, get_eta
+from orders.models import Order
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark computed vs. cached delivery estimates (p50/p99 per lookup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--rounds', type=int, default=5, help='Cached reads per order.')
+
+    def handle(self, *args, **options):
+        order_ids = list(Order.objects.order_by('-created_at').values_list('pk', flat=True)[:options['orders']])
+        if not order_ids:
+            raise CommandError("No orders to estimate; run seed_data first.")
+
+        forget(order_ids)
+        computed: list[float] = []
+        for order_id in order_ids:
+            started = time.perf_counter()
+            estimate(order_id)
+            computed.append((time.perf_counter() - started) * 1000)
+
+        for order_id in order_ids:
+            get_eta(order_id)  # warm the cache
+        cached: list[float] = []
+        for _ in range(options['rounds']):
+            for order_id in order_ids:
+                started = time.perf_counter()
+                get_eta(order_id)
+                cached.append((time.perf_counter() - started) * 1000)
+
+        for label, samples in (('computed', computed), ('cached', cached)):
+            self.stdout.write(
+                f"{label:>8}: {len(samples)} lookups, "
+                f"p50={statistics.median(samples):.3f}ms p99={_percentile(samples, 99):.3f}ms"
+            )
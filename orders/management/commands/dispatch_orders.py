@@ -0,0 +1,52 @@
+"""
+Assign waiting orders to couriers automatically.
+
+Usage:
+    python manage.py dispatch_orders [--loop] [--interval 5] [--dry-run]
+
+Runs one `orders.dispatch.run_tick` and exits; with ``--loop`` it keeps
+running a tick every ``--interval`` seconds (``DISPATCH_INTERVAL``).
+``--dry-run`` prints the matching without assigning anything.
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.dispatch import run_tick
+
+
+class Command(BaseCommand):
+    help = "Match confirmed orders to available couriers in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep dispatching every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between ticks.')
+        parser.add_argument('--dry-run', action='store_true', help='Print the matching, assign nothing.')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'DISPATCH_INTERVAL', 5)
+        total = 0
+        try:
+            while True:
+                started = time.monotonic()
+                result = run_tick(dry_run=options['dry_run'])
+                elapsed = (time.monotonic() - started) * 1000
+                total += len(result.assignments)
+                if result.orders or not options['loop']:
+                    self.stdout.write(
+                        f"{result.orders} waiting order(s), {result.couriers} courier(s): "
+                        f"{len(result.assignments)} assigned, {result.conflicts} taken meanwhile "
+                        f"({elapsed:.1f}ms)"
+                    )
+                if options['dry_run'] and options['verbosity'] > 1:
+                    for order_id, courier_id in result.assignments:
+                        self.stdout.write(f"    order #{order_id} -> courier {courier_id}")
+                if not options['loop']:
+                    break
+                time.sleep(max(0.0, interval - elapsed / 1000))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} order(s) {'matched' if options['dry_run'] else 'assigned'}."))
@@ -0,0 +1,91 @@
+"""
+Check the query plans of the order list queries.
+
+Usage:
+    python manage.py explain_order_queries [--verbose]
+
+Runs ``EXPLAIN`` on the first page and on a follow-up (cursor) page of
+every order list in `orders.lists`, i.e. exactly the queries the order
+views send. Prints one line per query and exits with an error if any of
+them reads a whole table instead of using an index (``SCAN <table>`` on
+SQLite, ``Seq Scan`` on PostgreSQL). Plans that still sort in a temporary
+B-tree are reported as warnings. ``--verbose`` prints the full plans.
+
+Run it after changing `orders.lists` or the ``Order`` indexes. Works on
+an empty database; no rows are read or written.
+"""
+from __future__ import annotations
+
+import re
+from typing import Callable
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from accounts.models import User
+from core.pagination import after
+from orders import lists
+
+_FULL_SCAN = {
+    # "SCAN orders_order" / "SCAN T0 USING INDEX ..." (a full index walk is still a full scan)
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)\S+'),
+    'postgresql': re.compile(r'\bSeq Scan on \S+'),
+}
+_SORT = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY'),
+    'postgresql': re.compile(r'\bSort\b'),
+}
+
+
+def _hot_queries(user: User) -> dict[str, Callable[[], QuerySet]]:
+    return {
+        'my orders': lambda: lists.customer_orders(user),
+        'owner orders': lambda: lists.owner_orders(user),
+        'courier: confirmed orders': lambda: lists.confirmed_orders(),
+        'courier: available orders': lambda: lists.available_orders(),
+        'courier: active orders': lambda: lists.courier_active_orders(user),
+        'courier: delivered orders': lambda: lists.courier_delivered_orders(user),
+    }
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the order list queries and fail if any of them does a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help='Print the full query plans.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in _FULL_SCAN:
+            raise CommandError(f"Plan checks are not implemented for the {vendor!r} backend.")
+
+        # Plans do not depend on who the user is, only on the shape of the query
+        user = User(pk=0, username='explain')
+        limit = getattr(settings, 'ORDER_LIST_PAGE_SIZE', 25) + 1
+        position = [timezone.now(), 2 ** 31]
+
+        scans: list[str] = []
+        for name, build in _hot_queries(user).items():
+            for page, queryset in (
+                ('first page', build().order_by(*lists.ORDERING)),
+                ('next page', build().order_by(*lists.ORDERING).filter(after(lists.ORDERING, position))),
+            ):
+                plan = queryset[:limit].explain()
+                label = f'{name} ({page})'
+                full = _FULL_SCAN[vendor].findall(plan)
+                if full:
+                    scans.append(label)
+                    self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}: {", ".join(full)}'))
+                elif _SORT[vendor].search(plan):
+                    self.stdout.write(self.style.WARNING(f'SORT       {label}'))
+                else:
+                    self.stdout.write(f'ok         {label}')
+                if options['verbose'] or full:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if scans:
+            raise CommandError(f"{len(scans)} order quer{'y' if len(scans) == 1 else 'ies'} fall back to a full scan.")
+        self.stdout.write(self.style.SUCCESS('All order list queries use an index.'))
@@ -0,0 +1,76 @@
+"""
+Report delivery stage timings from the order transition log.
+
+Usage:
+    python manage.py order_sla [--hours 24] [--target dispatch=300 ...]
+
+Prints count, p50, p90 and p99 per stage (`orders.metrics.STAGES`) for
+orders that finished the stage within the last ``--hours``, and how long
+the orders now on the courier board have been waiting. ``--target
+STAGE=SECONDS`` makes the command exit with an error when that stage's
+p90 is above the target, so it can run from cron or CI.
+"""
+from __future__ import annotations
+
+import statistics
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.metrics import STAGES, stage_durations, waiting_for_courier
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _fmt(seconds: float) -> str:
+    return f'{seconds / 60:.1f}m' if seconds >= 120 else f'{seconds:.0f}s'
+
+
+class Command(BaseCommand):
+    help = "Report p50/p90/p99 delivery stage timings from the order transition log."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24)
+        parser.add_argument('--target', action='append', default=[], metavar='STAGE=SECONDS',
+                            help='Fail if the p90 of STAGE exceeds SECONDS.')
+
+    def handle(self, *args, **options):
+        targets: dict[str, float] = {}
+        for spec in options['target']:
+            stage, _, seconds = spec.rpartition('=')
+            if stage not in STAGES:
+                raise CommandError(f"Unknown stage {stage!r}; choose from {', '.join(STAGES)}.")
+            targets[stage] = float(seconds)
+
+        now = timezone.now()
+        since = now - timedelta(hours=options['hours'])
+        missed = []
+        for stage in STAGES:
+            samples = stage_durations(stage, since)
+            if not samples:
+                self.stdout.write(f'{stage:>10}: no orders')
+                continue
+            p90 = _percentile(samples, 90)
+            line = (
+                f'{stage:>10}: {len(samples)} orders, p50={_fmt(statistics.median(samples))} '
+                f'p90={_fmt(p90)} p99={_fmt(_percentile(samples, 99))}'
+            )
+            if stage in targets and p90 > targets[stage]:
+                missed.append(stage)
+                self.stdout.write(self.style.ERROR(f'{line} (target {_fmt(targets[stage])})'))
+            else:
+                self.stdout.write(line)
+
+        waiting = waiting_for_courier()
+        if waiting:
+            self.stdout.write(f'{len(waiting)} order(s) waiting for a courier, oldest for {_fmt((now - waiting[0]).total_seconds())}')
+        else:
+            self.stdout.write('No orders waiting for a courier.')
+
+        if missed:
+            raise CommandError(f"p90 above target for: {', '.join(missed)}.")
@@ -0,0 +1,146 @@
+"""
+Optional benchmark for concurrent courier assignment.
+
+The correctness check (no order is ever won twice) lives in
+``orders.tests.ConcurrentClaimTests`` and runs with ``manage.py test``;
+this command is for timing the strategies at a larger scale against a
+real database and is not part of the test suite.
+
+Usage:
+    python manage.py stress_courier_claims [--couriers 16] [--orders 200]
+
+Creates confirmed orders and courier accounts, then lets every courier
+thread grab orders at the same time through three strategies:
+
+- ``legacy``: the old read / check ``courier_id is None`` / save sequence,
+  kept here for comparison only;
+- ``assign``: every courier tries to accept every order (in its own random
+  order) with `orders.services.claim_order`;
+- ``next``: every courier calls `orders.services.claim_next_order` until
+  nothing is left.
+
+For each strategy it prints how many claims reported success, how many
+orders were won more than once (double assignments) and whether every
+order ended up with the courier that was told it won. Exits with an error
+if ``assign`` or ``next`` produced a double assignment or a database
+error. All rows created by the run are removed afterwards.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import User
+from orders.models import Order
+from orders.services import claim_next_order, claim_order
+from restaurants.models import Restaurant
+
+
+def _legacy_claim(order_id: int, courier) -> bool:
+    """The pre-atomic implementation of CourierAssignOrderView.post."""
+    order = Order.objects.get(pk=order_id)
+    if order.status != Order.STATUS_CONFIRMED or order.courier_id is not None:
+        return False
+    order.courier = courier
+    order.status = Order.STATUS_ACCEPTED
+    order.save(update_fields=['courier', 'status'])
+    return True
+
+
+class Command(BaseCommand):
+    help = "Benchmark claiming orders from many concurrent courier threads (optional; see orders.tests)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--couriers', type=int, default=16, help='Concurrent courier threads.')
+        parser.add_argument('--orders', type=int, default=200, help='Orders to claim per strategy.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(username=f'claim-owner-{tag}', role=User.ROLE_OWNER)
+        customer = User.objects.create_user(username=f'claim-customer-{tag}')
+        couriers = [
+            User.objects.create_user(username=f'claim-courier-{tag}-{i}', role=User.ROLE_COURIER)
+            for i in range(options['couriers'])
+        ]
+        failures: list[str] = []
+        try:
+            restaurant = Restaurant.objects.create(name=f'Claims {tag}', owner=owner)
+            for strategy in ('legacy', 'assign', 'next'):
+                problems = self._run(strategy, restaurant, customer, couriers, options['orders'], options['seed'])
+                if problems and strategy != 'legacy':
+                    failures.append(strategy)
+        finally:
+            Order.objects.filter(user=customer).delete()
+            customer.delete()
+            owner.delete()
+            User.objects.filter(pk__in=[c.pk for c in couriers]).delete()
+
+        if failures:
+            raise CommandError(f"Double assignments or errors with: {', '.join(failures)}.")
+        self.stdout.write(self.style.SUCCESS('No double assignments with claim_order / claim_next_order.'))
+
+    def _run(self, strategy: str, restaurant, customer, couriers, n_orders: int, seed: int) -> int:
+        Order.objects.filter(user=customer).delete()
+        Order.objects.bulk_create([
+            Order(
+                user=customer, restaurant=restaurant, status=Order.STATUS_CONFIRMED,
+                delivery_address='Skopje', subtotal=Decimal('5.00'), total=Decimal('5.00'),
+            )
+            for _ in range(n_orders)
+        ])
+        order_ids = list(Order.objects.filter(user=customer).values_list('pk', flat=True))
+
+        wins: list[tuple[int, int]] = []
+        errors: list[Exception] = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(couriers))
+
+        def work(index: int, courier) -> None:
+            rng = random.Random(seed * 1000 + index)
+            mine: list[tuple[int, int]] = []
+            try:
+                start.wait()
+                if strategy == 'next':
+                    while (order := claim_next_order(courier)) is not None:
+                        mine.append((order.pk, courier.pk))
+                else:
+                    claim = _legacy_claim if strategy == 'legacy' else claim_order
+                    for order_id in rng.sample(order_ids, len(order_ids)):
+                        if claim(order_id, courier):
+                            mine.append((order_id, courier.pk))
+            except Exception as exc:  # reported below; a dead thread must not hang the run
+                errors.append(exc)
+            finally:
+                connection.close()
+                with lock:
+                    wins.extend(mine)
+
+        threads = [threading.Thread(target=work, args=(i, c)) for i, c in enumerate(couriers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        won = Counter(order_id for order_id, _ in wins)
+        doubles = sum(1 for count in won.values() if count > 1)
+        stored = dict(Order.objects.filter(pk__in=order_ids).values_list('pk', 'courier_id'))
+        mismatched = sum(1 for order_id, courier_id in wins if stored.get(order_id) != courier_id)
+        unclaimed = sum(1 for courier_id in stored.values() if courier_id is None)
+        self.stdout.write(
+            f"{strategy:>6}: {len(wins)} successful claims for {n_orders} orders by {len(couriers)} couriers "
+            f"in {elapsed:.2f}s | double assignments={doubles} lost updates={mismatched} "
+            f"unclaimed={unclaimed} errors={len(errors)}"
+        )
+        for exc in errors[:3]:
+            self.stdout.write(self.style.WARNING(f"    {type(exc).__name__}: {exc}"))
+        return doubles + mismatched + len(errors)
@@ -0,0 +1,54 @@
+"""
+Delivery timings read from the transition log (`OrderTransition`).
+
+Each stage is the time between an order entering one status and
+entering a later one, e.g. ``dispatch``: confirmed → accepted, the wait
+for a courier. The log has the exact time of every change, which
+``Order.updated_at`` (the last change only) cannot give.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from django.db.models import OuterRef, Subquery  # type: ignore
+
+from .models import Order, OrderTransition
+
+STAGES: dict[str, tuple[str, str]] = {
+    'payment': (Order.STATUS_PLACED, Order.STATUS_CONFIRMED),
+    'dispatch': (Order.STATUS_CONFIRMED, Order.STATUS_ACCEPTED),
+    'pickup': (Order.STATUS_ACCEPTED, Order.STATUS_PICKED_UP),
+    'delivery': (Order.STATUS_PICKED_UP, Order.STATUS_DELIVERED),
+    'end to end': (Order.STATUS_PLACED, Order.STATUS_DELIVERED),
+}
+
+
+def entered_at(status: str, order=OuterRef('order')) -> Subquery:
+    """When ``order`` first entered ``status``."""
+    return Subquery(
+        OrderTransition.objects.filter(order=order, to_status=status)
+        .order_by('created_at', 'id').values('created_at')[:1]
+    )
+
+
+def stage_durations(stage: str, since: datetime) -> list[float]:
+    """Seconds spent in ``stage`` by orders that completed it since ``since``."""
+    start, end = STAGES[stage]
+    rows = (
+        OrderTransition.objects.filter(to_status=end, created_at__gte=since)
+        .annotate(started=entered_at(start))
+        .filter(started__isnull=False)
+        .values_list('started', 'created_at')
+    )
+    return [(finished - started).total_seconds() for started, finished in rows]
+
+
+def waiting_for_courier() -> list[datetime]:
+    """When each order now waiting on the courier board was confirmed, oldest first."""
+    return sorted(
+        confirmed
+        for confirmed in Order.objects.filter(status=Order.STATUS_CONFIRMED, courier__isnull=True)
+        .annotate(confirmed_at=entered_at(Order.STATUS_CONFIRMED, OuterRef('pk')))
+        .values_list('confirmed_at', flat=True)
+        if confirmed is not None
+    )
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_delivery_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transition', models.CharField(help_text='Name of the transition, e.g. "confirm"', max_length=20)),
+                ('from_status', models.CharField(blank=True, help_text='Empty for the placement itself', max_length=20)),
+                ('to_status', models.CharField(choices=[('placed', 'Placed'), ('accepted', 'Accepted'), ('pending', 'Pending'), ('confirmed', 'Confirmed'), ('picked_up', 'Picked up'), ('delivered', 'Delivered'), ('canceled', 'Canceled')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, help_text='User who made the change (empty for payments and dispatch)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='orders.order')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['order', 'created_at'], name='transition_order_idx'), models.Index(fields=['to_status', 'created_at'], name='transition_status_idx')],
+            },
+        ),
+    ]
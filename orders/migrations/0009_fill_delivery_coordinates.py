@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:20
+
+import hashlib
+
+from django.db import migrations
+
+
+def _hash_point(address):
+    # Frozen copy of core.geocoding: normalize_address + HashGeocoder, the
+    # offline backend. Run ``manage.py geocode_addresses --all`` afterwards
+    # when another GEOCODER_BACKEND is configured.
+    address = ' '.join((address or '').lower().split()) or 'skopje'
+    digest = hashlib.sha256(address.encode('utf-8')).digest()
+    x = int.from_bytes(digest[0:2], 'big') / 65535
+    y = int.from_bytes(digest[2:4], 'big') / 65535
+    return round(41.97 + 0.06 * x, 6), round(21.38 + 0.10 * y, 6)
+
+
+def fill_delivery_coordinates(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    missing = Order.objects.filter(delivery_latitude__isnull=True).order_by('pk')
+    last_pk = 0
+    while True:
+        rows = list(missing.filter(pk__gt=last_pk).values_list('pk', 'delivery_address')[:1000])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        changed = []
+        for pk, address in rows:
+            latitude, longitude = _hash_point(address)
+            changed.append(Order(pk=pk, delivery_latitude=latitude, delivery_longitude=longitude))
+        Order.objects.bulk_update(changed, ['delivery_latitude', 'delivery_longitude'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_daily_sales'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_delivery_coordinates, migrations.RunPython.noop),
+    ]
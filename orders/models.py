@@ -3,15 +3,20 @@ Models for the orders app.
 
 Defines the `Order` and `OrderItem` models which capture a user's
 purchase from a restaurant. Orders belong to a single restaurant and
-comprise one or more order items. Totals are stored redundantly to
+comprise one or more order items. `OrderTransition` is the append-only
+log of status changes written by `orders.state`. Totals are stored redundantly to
 speed up rendering and to decouple them from changes in product
 prices after an order is placed.
+
+`DailySales` and `DailyProductSales` are the delivered-order rollups
+behind the owner sales dashboard, maintained by `orders.sales`.
 """
 from __future__ import annotations
 
 from decimal import Decimal
 from django.conf import settings  # type: ignore
 from django.db import models  # type: ignore
+from django.utils import timezone  # type: ignore
 from restaurants.models import Restaurant, Product
 
 
@@ -68,6 +73,9 @@ class Order(models.Model):
         blank=True,
         help_text='Delivery address snapshot captured at checkout.'
     )
+    # Geocoded once at checkout (orders.services.place_order)
+    delivery_latitude = models.FloatField(null=True, blank=True, editable=False)
+    delivery_longitude = models.FloatField(null=True, blank=True, editable=False)
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -97,6 +105,20 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Order lists (orders/lists.py) filter on one of these prefixes and
+        # page newest first by (created_at, id); see explain_order_queries.
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            models.Index(fields=['restaurant', '-created_at', '-id'], name='order_restaurant_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+            models.Index(fields=['courier', 'status', '-created_at', '-id'], name='order_courier_status_idx'),
+            # Board of confirmed orders waiting for a courier
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='order_unassigned_idx',
+                condition=models.Q(courier__isnull=True),
+            ),
+        ]
 
     def __str__(self) -> str:  # type: ignore[override]
         return f"Order #{self.pk} for {self.user.username}"
@@ -137,3 +159,73 @@ class OrderItem(models.Model):
 
     def __str__(self) -> str:  # type: ignore[override]
         return f"{self.quantity} × {self.product.name}"
+
+
+class OrderTransition(models.Model):
+    """One status change of an order. Rows are only ever inserted, by `orders.state`."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='transitions')
+    transition = models.CharField(max_length=20, help_text='Name of the transition, e.g. "confirm"')
+    from_status = models.CharField(max_length=20, blank=True, help_text='Empty for the placement itself')
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        help_text='User who made the change (empty for payments and dispatch)',
+    )
+    # Same timestamp as the order's updated_at for this change
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='transition_order_idx'),
+            # SLA / dispatch metrics: "every change into <status> since <time>"
+            models.Index(fields=['to_status', 'created_at'], name='transition_status_idx'),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Order #{self.order_id}: {self.from_status or '-'} → {self.to_status}"
+
+
+class DailySales(models.Model):
+    """Delivered orders of one restaurant on one (restaurant-local) day."""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    # Sum of Order.total
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['restaurant', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'day'], name='dailysales_restaurant_day_uniq'),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Restaurant #{self.restaurant_id} on {self.day}: {self.orders} orders"
+
+
+class DailyProductSales(models.Model):
+    """Sales of one product in delivered orders of one (restaurant-local) day."""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='daily_product_sales')
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    # Orders containing the product, and units sold
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    # Sum of quantity × OrderItem.price_at_time
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['restaurant', 'day', 'product']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurant', 'day', 'product'], name='dailyproductsales_uniq',
+            ),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Product #{self.product_id} on {self.day}: {self.quantity} sold"
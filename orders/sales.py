@@ -0,0 +1,229 @@
+"""
+Daily sales rollups behind the owner sales dashboard.
+
+Delivered orders are summed per restaurant and restaurant-local day
+(``RESTAURANT_TIME_ZONE``) into `DailySales` (orders, revenue) and per
+product into `DailyProductSales` (orders, units, revenue), so a report
+over any date range reads at most one row per day and product instead of
+every historical order:
+
+- `record_delivered` adds orders as they are delivered; `orders.state`
+  calls it in the same transaction as the status change, so a delivery
+  is counted exactly once.
+- `backfill` rebuilds the days before ``until`` (default: today) from
+  history, reading delivered orders in id order ``chunk_size`` at a time.
+  Today is left to `record_delivered`, so a backfill never races the
+  live updates.
+- `sales_report` reads the rollups for the dashboard.
+
+Rows are added to with ``INSERT ... ON CONFLICT DO UPDATE`` (``SET x =
+x + EXCLUDED.x``) where the database has it (PostgreSQL, SQLite 3.24+),
+so concurrent deliveries for the same restaurant and day never lose an
+update; elsewhere with an ``F()`` UPDATE, then an INSERT for new rows.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Sequence
+
+from django.db import connection, transaction  # type: ignore
+from django.db.models import F, OuterRef, Sum  # type: ignore
+from django.db.models.functions import Coalesce  # type: ignore
+
+from restaurants.hours import restaurant_now
+from .metrics import entered_at
+from .models import DailyProductSales, DailySales, Order, OrderItem
+
+# Rows per INSERT
+_CHUNK = 500
+_CENT = Decimal('0.01')
+
+
+def local_day(moment: datetime) -> date:
+    """The restaurant-local calendar day of ``moment``."""
+    return restaurant_now(moment).date()
+
+
+def day_start(day: date) -> datetime:
+    """Local midnight at the start of ``day``, as an aware datetime."""
+    return datetime.combine(day, time.min, tzinfo=restaurant_now().tzinfo)
+
+
+def _supports_upsert() -> bool:
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 24, 0)
+    return False
+
+
+def _add(model, keys: Sequence[str], sums: Sequence[str], rows: dict[tuple, Sequence]) -> None:
+    """Add ``rows`` (``{key values: sum values}``) to ``model``'s counters, creating missing rows."""
+    if not rows:
+        return
+    if not _supports_upsert():
+        for key, values in rows.items():
+            lookup = {f'{name}_id' if model._meta.get_field(name).is_relation else name: value
+                      for name, value in zip(keys, key)}
+            if not model.objects.filter(**lookup).update(**{name: F(name) + value for name, value in zip(sums, values)}):
+                model.objects.create(**lookup, **dict(zip(sums, values)))
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in (*keys, *sums)]
+    columns = ', '.join(qn(field.column) for field in fields)
+    conflict = ', '.join(qn(model._meta.get_field(name).column) for name in keys)
+    updates = ', '.join(
+        f'{qn(column)} = {table}.{qn(column)} + EXCLUDED.{qn(column)}'
+        for column in (model._meta.get_field(name).column for name in sums)
+    )
+    placeholders = '(' + ', '.join('%s' for _ in fields) + ')'
+    items = list(rows.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), _CHUNK):
+            chunk = items[start:start + _CHUNK]
+            params = [
+                field.get_db_prep_save(value, connection)
+                for key, values in chunk
+                for field, value in zip(fields, (*key, *values))
+            ]
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {", ".join(placeholders for _ in chunk)} '
+                f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}',
+                params,
+            )
+
+
+def _rollup(orders: Iterable[tuple[int, int, Decimal, date]]) -> int:
+    """Add ``(order id, restaurant id, total, day)`` rows and their items to the rollups."""
+    daily: dict[tuple, list] = defaultdict(lambda: [0, Decimal('0.00')])
+    placed: dict[int, tuple[int, date]] = {}
+    for order_id, restaurant_id, total, day in orders:
+        placed[order_id] = (restaurant_id, day)
+        row = daily[(restaurant_id, day)]
+        row[0] += 1
+        row[1] += total
+
+    products: dict[tuple, list] = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    items = (
+        OrderItem.objects.filter(order_id__in=placed)
+        # Same fallback as OrderItem.line_total for rows without a stored price
+        .annotate(price=Coalesce('price_at_time', 'product__price'))
+        .values_list('order_id', 'product_id', 'quantity', 'price')
+    )
+    for order_id, product_id, quantity, price in items:
+        row = products[(*placed[order_id], product_id)]
+        row[0] += 1
+        row[1] += quantity
+        row[2] += price * quantity
+
+    _add(DailySales, ('restaurant', 'day'), ('orders', 'revenue'), daily)
+    _add(DailyProductSales, ('restaurant', 'day', 'product'), ('orders', 'quantity', 'revenue'), products)
+    return len(placed)
+
+
+def record_delivered(order_ids: Iterable[int], delivered_at: datetime) -> None:
+    """Count orders that were just delivered (call inside the transaction that delivered them)."""
+    day = local_day(delivered_at)
+    orders = Order.objects.filter(pk__in=list(order_ids)).values_list('pk', 'restaurant_id', 'total')
+    _rollup((order_id, restaurant_id, total, day) for order_id, restaurant_id, total in orders)
+
+
+def backfill(
+    since: date | None = None,
+    until: date | None = None,
+    chunk_size: int = 1000,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Rebuild the rollups of days ``since`` (default: all) up to, not including, ``until`` (default: today).
+
+    Existing rows of those days are deleted first; delivered orders are
+    then read in id order, ``chunk_size`` at a time, each chunk in its own
+    transaction. The delivery day comes from the transition log (the
+    order's ``updated_at`` for orders from before the log). ``progress``
+    is called with the running total after each chunk. Returns the
+    number of orders counted.
+    """
+    until = until or local_day(restaurant_now())
+    window: dict[str, Any] = {'day__lt': until}
+    delivered = (
+        Order.objects.filter(status=Order.STATUS_DELIVERED)
+        .annotate(delivered_at=Coalesce(entered_at(Order.STATUS_DELIVERED, OuterRef('pk')), 'updated_at'))
+        .filter(delivered_at__lt=day_start(until))
+    )
+    if since is not None:
+        window['day__gte'] = since
+        delivered = delivered.filter(delivered_at__gte=day_start(since))
+    with transaction.atomic():
+        DailyProductSales.objects.filter(**window).delete()
+        DailySales.objects.filter(**window).delete()
+
+    counted, last_id = 0, 0
+    while True:
+        chunk = list(
+            delivered.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'restaurant_id', 'total', 'delivered_at')[:chunk_size]
+        )
+        if not chunk:
+            return counted
+        with transaction.atomic():
+            counted += _rollup((pk, restaurant_id, total, local_day(at)) for pk, restaurant_id, total, at in chunk)
+        last_id = chunk[-1][0]
+        if progress is not None:
+            progress(counted)
+
+
+def _money(value) -> Decimal:
+    # SQLite sums decimals as floats
+    return Decimal(value or 0).quantize(_CENT)
+
+
+def sales_report(restaurant_ids: Iterable[int], since: date, until: date, top: int = 10) -> dict[str, Any]:
+    """
+    Revenue, order count, average basket, a per-day series and the best
+    selling products of ``restaurant_ids`` from ``since`` to ``until``
+    (both inclusive), read from the rollups only.
+    """
+    restaurant_ids = list(restaurant_ids)
+    rows = {
+        day: (orders, _money(revenue))
+        for day, orders, revenue in DailySales.objects.filter(
+            restaurant_id__in=restaurant_ids, day__gte=since, day__lte=until,
+        ).order_by().values_list('day').annotate(Sum('orders'), Sum('revenue'))
+    }
+    days = []
+    day = since
+    while day <= until:
+        orders, revenue = rows.get(day, (0, _money(0)))
+        days.append({'day': day, 'orders': orders, 'revenue': revenue})
+        day += timedelta(days=1)
+    orders = sum(row['orders'] for row in days)
+    revenue = sum((row['revenue'] for row in days), _money(0))
+    products = (
+        DailyProductSales.objects.filter(restaurant_id__in=restaurant_ids, day__gte=since, day__lte=until)
+        .order_by().values('product_id', 'product__name')
+        .annotate(orders=Sum('orders'), quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-revenue', '-quantity', 'product__name')[:top]
+    )
+    return {
+        'since': since,
+        'until': until,
+        'orders': orders,
+        'revenue': revenue,
+        'average_basket': (revenue / orders).quantize(_CENT) if orders else None,
+        'days': days,
+        'top_products': [
+            {
+                'product': row['product_id'],
+                'name': row['product__name'],
+                'orders': row['orders'],
+                'quantity': row['quantity'],
+                'revenue': _money(row['revenue']),
+            }
+            for row in products
+        ],
+    }
@@ -0,0 +1,172 @@
+"""
+Order placement for the orders app.
+
+`place_order` turns a resolved cart into an `Order` with its
+`OrderItem` rows as one atomic unit of work: totals are computed in
+memory from the already loaded products and all items are written with
+a single ``bulk_create``, so a crash can never leave an order with only
+part of its lines. Stock for every line is reserved in the same
+transaction and handed back by `cancel_order`. The delivery address is
+geocoded here, once, so later reads use the stored coordinates.
+
+Couriers take orders with `claim_order` / `claim_next_order`: the claim
+is a single conditional UPDATE, so two couriers can never both win the
+same order. Status changes go through the state machine in
+`orders.state`.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import connection, transaction  # type: ignore
+
+from core.geocoding import GeocodingError, geocode
+from restaurants.stock import release_stock, reserve_stock  # type: ignore
+from .cart import ResolvedCart
+from .models import Order, OrderItem
+from .state import record_placed, transition
+#: Candidates tried per round by `claim_next_order` on backends without SKIP LOCKED.
+CLAIM_BATCH = 10
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order."""
+
+
+class OutOfStockError(CheckoutError):
+    """Raised when one or more cart lines could not be reserved."""
+
+    def __init__(self, products: list) -> None:
+        self.products = products
+        names = ', '.join(product.name for product in products)
+        super().__init__(f'Not enough stock for: {names}.')
+
+
+def place_order(*, user, cart: ResolvedCart, delivery_address: str) -> Order:
+    """
+    Create an order and its items from ``cart`` inside one transaction.
+
+    Prices are snapshotted into ``price_at_time`` from the products that
+    were loaded while resolving the cart. Raises `OutOfStockError` (and
+    writes nothing) if any line cannot be reserved.
+    """
+    if not cart:
+        raise CheckoutError('Your cart is empty.')
+    if not cart.is_single_restaurant:
+        raise CheckoutError('All items in the cart must be from the same restaurant.')
+    restaurant = cart.restaurant
+    if restaurant is None:
+        raise CheckoutError('Unable to determine restaurant for this cart.')
+
+    subtotal = cart.subtotal
+    delivery_fee = Decimal('0.00')
+    try:
+        latitude, longitude = geocode(delivery_address) or (None, None)
+    except GeocodingError:
+        latitude, longitude = None, None  # filled in later by manage.py geocode_addresses
+
+    with transaction.atomic():
+        failed = reserve_stock((line.product.pk, line.quantity) for line in cart.lines)
+        if failed:
+            raise OutOfStockError([line.product for line in cart.lines if line.product.pk in failed])
+
+        order = Order.objects.create(
+            user=user,
+            restaurant=restaurant,
+            status=Order.STATUS_PLACED,
+            delivery_address=delivery_address,
+            delivery_latitude=latitude,
+            delivery_longitude=longitude,
+            subtotal=subtotal,
+            delivery_fee=delivery_fee,
+            total=subtotal + delivery_fee,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=line.product,
+                quantity=line.quantity,
+                price_at_time=line.product.price,
+            )
+            for line in cart.lines
+        ])
+        record_placed(order)
+    return order
+
+
+def cancel_orders(order_ids: Iterable[int], actor=None) -> list[int]:
+    """
+    Cancel every order in ``order_ids`` that has not been confirmed yet and
+    release the stock of all of them with one batched UPDATE.
+
+    The status change is a conditional UPDATE (`orders.state`), so
+    concurrent cancels (or a cancel racing a payment failure) release the
+    stock exactly once. Returns the ids of the orders this call canceled.
+    """
+    with transaction.atomic():
+        canceled = transition('cancel', order_ids, actor=actor)
+        if canceled:
+            release_stock(
+                OrderItem.objects.filter(order_id__in=canceled).values_list('product_id', 'quantity')
+            )
+    return canceled
+
+
+def cancel_order(order: Order, actor=None) -> bool:
+    """
+    Cancel ``order`` if it has not been confirmed yet and release its stock.
+    Returns ``True`` if this call canceled the order.
+    """
+    if not cancel_orders([order.pk], actor=actor):
+        return False
+    order.status = Order.STATUS_CANCELED
+    return True
+
+
+def _claimable():
+    return Order.objects.filter(status=Order.STATUS_CONFIRMED, courier__isnull=True)
+
+
+def claim_order(order_id: int, courier) -> bool:
+    """
+    Assign a confirmed, unassigned order to ``courier`` and mark it accepted.
+
+    ``UPDATE ... WHERE status = 'confirmed' AND courier_id IS NULL``: of any
+    number of concurrent claims exactly one updates the row. Returns
+    ``True`` if this call won the order.
+    """
+    return bool(
+        transition('accept', [order_id], actor=courier, guards={'courier': None}, values={'courier': courier})
+    )
+
+
+def claim_next_order(courier, max_rounds: int = 5) -> Order | None:
+    """
+    Claim the longest-waiting available order for ``courier``.
+
+    Where the database supports it the candidate row is locked with
+    ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent couriers are handed
+    different orders without waiting on each other. Elsewhere (SQLite) a
+    batch of the oldest candidates is tried with `claim_order` in turn and
+    re-read when all of them were taken by others. Returns the claimed
+    order, or ``None`` if nothing is waiting.
+    """
+    oldest = _claimable().order_by('created_at', 'id')
+    claimed = None
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = oldest.select_for_update(skip_locked=True, of=('self',)).values_list('pk', flat=True).first()
+            if pk is not None and claim_order(pk, courier):
+                claimed = pk
+    else:
+        for _ in range(max_rounds):
+            candidates = list(oldest.values_list('pk', flat=True)[:CLAIM_BATCH])
+            if not candidates:
+                break
+            claimed = next((pk for pk in candidates if claim_order(pk, courier)), None)
+            if claimed is not None:
+                break
+    if claimed is None:
+        return None
+    return Order.objects.select_related('restaurant', 'user').get(pk=claimed)
@@ -0,0 +1,254 @@
+"""
+The order state machine.
+
+Every status change goes through this module::
+
+    place     -                       -> placed      (place_order)
+    confirm   placed                  -> confirmed   (payment captured, owner)
+    accept    confirmed, no courier   -> accepted    (sets the courier)
+    pick_up   accepted                -> picked_up
+    deliver   picked_up               -> delivered
+    cancel    placed, pending         -> canceled
+
+`transition` applies one of them to any number of orders as one
+conditional UPDATE per source status::
+
+    UPDATE orders_order SET status = 'confirmed', updated_at = <now>
+    WHERE id IN (...) AND status = 'placed' [AND <guards>] RETURNING id
+
+Orders no longer in the source status, or failing a guard (e.g. "this
+courier's order"), are left alone, so two concurrent changes can never
+both win and confirming 200 orders costs one statement. Every order that
+moved gets an `OrderTransition` row (one bulk insert, same transaction
+and timestamp as ``updated_at``) and a live status event
+(`orders.events`), and its cached delivery estimate (`orders.eta`) is
+dropped. Delivered orders are added to the daily sales rollups
+(`orders.sales`) in the same transaction. `assign_couriers` is the batched form of ``accept``
+used by dispatch, with a different courier per order.
+
+Where the database has no ``UPDATE ... RETURNING`` (MySQL, SQLite before
+3.35) each order gets its own conditional UPDATE instead.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+from django.db import connection, transaction  # type: ignore
+from django.db.models import Model  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .eta import forget as forget_eta
+from .events import publish_status
+from .models import Order, OrderTransition
+from .sales import record_delivered
+
+
+@dataclass(frozen=True)
+class Transition:
+    name: str
+    sources: tuple[str, ...]
+    target: str
+
+
+PLACE = Transition('place', (), Order.STATUS_PLACED)
+CONFIRM = Transition('confirm', (Order.STATUS_PLACED,), Order.STATUS_CONFIRMED)
+ACCEPT = Transition('accept', (Order.STATUS_CONFIRMED,), Order.STATUS_ACCEPTED)
+PICK_UP = Transition('pick_up', (Order.STATUS_ACCEPTED,), Order.STATUS_PICKED_UP)
+DELIVER = Transition('deliver', (Order.STATUS_PICKED_UP,), Order.STATUS_DELIVERED)
+CANCEL = Transition('cancel', (Order.STATUS_PLACED, Order.STATUS_PENDING), Order.STATUS_CANCELED)
+
+TRANSITIONS: dict[str, Transition] = {t.name: t for t in (PLACE, CONFIRM, ACCEPT, PICK_UP, DELIVER, CANCEL)}
+
+#: Statuses from which an order can still be canceled and its stock released.
+CANCELABLE_STATUSES = CANCEL.sources
+
+# Ids per UPDATE, well below every backend's parameter limit
+_CHUNK = 500
+
+
+def _supports_returning() -> bool:
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def _column(name: str) -> str:
+    return connection.ops.quote_name(Order._meta.get_field(name).column)
+
+
+def _db_value(name: str, value: Any) -> Any:
+    if isinstance(value, Model):
+        value = value.pk
+    return Order._meta.get_field(name).get_db_prep_save(value, connection)
+
+
+def _update(ids: list[int], source: str, target: str, now, guards: Mapping[str, Any], values: Mapping[str, Any]) -> list[int]:
+    """Move those of ``ids`` that are in ``source`` and pass ``guards``; returns the moved ids."""
+    assignments = {'status': target, 'updated_at': now, **values}
+    set_sql = ', '.join(f'{_column(name)} = %s' for name in assignments)
+    params: list = [_db_value(name, value) for name, value in assignments.items()]
+    where = [f'{_column("status")} = %s']
+    where_params: list = [source]
+    for name, value in guards.items():
+        if value is None:
+            where.append(f'{_column(name)} IS NULL')
+        else:
+            where.append(f'{_column(name)} = %s')
+            where_params.append(_db_value(name, value))
+    table = connection.ops.quote_name(Order._meta.db_table)
+    pk = _column('id')
+
+    with connection.cursor() as cursor:
+        if _supports_returning():
+            placeholders = ', '.join('%s' for _ in ids)
+            cursor.execute(
+                f'UPDATE {table} SET {set_sql} WHERE {pk} IN ({placeholders}) AND {" AND ".join(where)} '
+                f'RETURNING {pk}',
+                params + ids + where_params,
+            )
+            return [row[0] for row in cursor.fetchall()]
+        moved = []
+        for order_id in ids:
+            cursor.execute(
+                f'UPDATE {table} SET {set_sql} WHERE {pk} = %s AND {" AND ".join(where)}',
+                params + [order_id] + where_params,
+            )
+            if cursor.rowcount:
+                moved.append(order_id)
+        return moved
+
+
+def _forget_eta(order_ids: list[int]) -> None:
+    if order_ids:
+        transaction.on_commit(lambda: forget_eta(order_ids))
+
+
+def _log(rows: Iterable[tuple[int, str, str, int | None]], name: str, now) -> None:
+    """
+    Insert ``(order id, from, to, actor id)`` rows into the transition log.
+
+    A plain multi-row INSERT rather than ``bulk_create``: building a model
+    instance per row cost more than the statement itself for the hundreds
+    of rows a dispatch tick or a bulk confirm writes.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    meta = OrderTransition._meta
+    names = ('order', 'transition', 'from_status', 'to_status', 'actor', 'created_at')
+    columns = ', '.join(qn(meta.get_field(field).column) for field in names)
+    created_at = meta.get_field('created_at').get_db_prep_save(now, connection)
+    size = min(_CHUNK, connection.ops.bulk_batch_size(names, rows) or _CHUNK)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            cursor.execute(
+                f'INSERT INTO {qn(meta.db_table)} ({columns}) VALUES '
+                + ', '.join('(%s, %s, %s, %s, %s, %s)' for _ in chunk),
+                [
+                    value
+                    for order_id, source, target, actor_id in chunk
+                    for value in (order_id, name, source, target, actor_id, created_at)
+                ],
+            )
+
+
+def transition(
+    name: str | Transition,
+    order_ids: Iterable[int],
+    *,
+    actor=None,
+    guards: Mapping[str, Any] | None = None,
+    values: Mapping[str, Any] | None = None,
+) -> list[int]:
+    """
+    Apply transition ``name`` to ``order_ids``; returns the ids that moved, in input order.
+
+    ``guards`` are extra ``field=value`` conditions (``None`` means IS
+    NULL); ``values`` are extra fields to set. ``actor`` is recorded in
+    the log.
+    """
+    step = TRANSITIONS[name] if isinstance(name, str) else name
+    pending = list(dict.fromkeys(order_ids))
+    actor_id = actor.pk if isinstance(actor, Model) else actor
+    now = timezone.now()
+    moved: dict[int, str] = {}
+    with transaction.atomic():
+        for source in step.sources:
+            for start in range(0, len(pending), _CHUNK):
+                for order_id in _update(pending[start:start + _CHUNK], source, step.target, now, guards or {}, values or {}):
+                    moved[order_id] = source
+            pending = [order_id for order_id in pending if order_id not in moved]
+        _log(((order_id, source, step.target, actor_id) for order_id, source in moved.items()), step.name, now)
+        if step is DELIVER and moved:
+            record_delivered(moved, now)
+        publish_status(moved)
+        _forget_eta(list(moved))
+    return [order_id for order_id in dict.fromkeys(order_ids) if order_id in moved]
+
+
+def transition_one(name: str | Transition, order: Order, **kwargs) -> bool:
+    """`transition` for one loaded order, updating ``order`` in memory when it moved."""
+    step = TRANSITIONS[name] if isinstance(name, str) else name
+    if not transition(step, [order.pk], **kwargs):
+        return False
+    order.status = step.target
+    for field, value in (kwargs.get('values') or {}).items():
+        setattr(order, field, value)
+    return True
+
+
+def record_placed(order: Order) -> None:
+    """Log the creation of ``order`` (call inside the transaction that created it)."""
+    _log([(order.pk, '', order.status, order.user_id)], PLACE.name, order.created_at)
+    publish_status([order.pk])
+
+
+def assign_couriers(assignments: Mapping[int, int]) -> dict[int, int]:
+    """
+    ``accept`` with a courier per order: ``{order_id: courier_id}``.
+
+    One UPDATE with a CASE per chunk, same guard as ``accept`` (confirmed,
+    no courier yet). Returns the assignments that were applied; the rest
+    were taken or changed in the meantime.
+    """
+    now = timezone.now()
+    table = connection.ops.quote_name(Order._meta.db_table)
+    pk, courier, status, updated = _column('id'), _column('courier'), _column('status'), _column('updated_at')
+    applied: dict[int, int] = {}
+    items = list(assignments.items())
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(items), _CHUNK):
+            chunk = dict(items[start:start + _CHUNK])
+            if _supports_returning():
+                cases = ' '.join('WHEN %s THEN %s' for _ in chunk)
+                placeholders = ', '.join('%s' for _ in chunk)
+                cursor.execute(
+                    f'UPDATE {table} SET {courier} = CASE {pk} {cases} END, {status} = %s, {updated} = %s '
+                    f'WHERE {pk} IN ({placeholders}) AND {status} = %s AND {courier} IS NULL '
+                    f'RETURNING {pk}, {courier}',
+                    [value for pair in chunk.items() for value in pair]
+                    + [ACCEPT.target, _db_value('updated_at', now), *chunk, Order.STATUS_CONFIRMED],
+                )
+                applied.update(cursor.fetchall())
+            else:
+                for order_id, courier_id in chunk.items():
+                    cursor.execute(
+                        f'UPDATE {table} SET {courier} = %s, {status} = %s, {updated} = %s '
+                        f'WHERE {pk} = %s AND {status} = %s AND {courier} IS NULL',
+                        [courier_id, ACCEPT.target, _db_value('updated_at', now), order_id, Order.STATUS_CONFIRMED],
+                    )
+                    if cursor.rowcount:
+                        applied[order_id] = courier_id
+        _log(
+            ((order_id, Order.STATUS_CONFIRMED, ACCEPT.target, courier_id) for order_id, courier_id in applied.items()),
+            ACCEPT.name,
+            now,
+        )
+        publish_status(applied)
+        _forget_eta(list(applied))
+    return applied
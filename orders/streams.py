@@ -0,0 +1,52 @@
+"""
+Live order updates as server-sent events (see `core.events`).
+
+- `OrderEventsView` (``track/<id>/events/``): ``status`` events of one
+  order, starting with its current status. Open to the customer, the
+  restaurant owner and the assigned courier.
+- `CourierEventsView` (``courier/events/``): orders appearing on or
+  leaving the available board, and status changes of the courier's own
+  orders.
+
+Both are async views: under the ASGI application an open stream costs a
+suspended coroutine. Under WSGI they answer 204 without subscribing (see
+`core.events.streams_available`); the pages poll instead.
+"""
+from __future__ import annotations
+
+from django.core.exceptions import PermissionDenied  # type: ignore
+from django.http import Http404, HttpRequest, HttpResponse  # type: ignore
+from django.views import View  # type: ignore
+
+from core import events
+from .events import BOARD_CHANNEL, STATUS_FIELDS, courier_channel, order_channel, status_event
+from .models import Order
+
+
+class OrderEventsView(View):
+    async def get(self, request: HttpRequest, order_id: int) -> HttpResponse:
+        if not events.streams_available(request):
+            return events.unavailable()
+        user = await request.auser()
+        if not user.is_authenticated:
+            raise PermissionDenied('Log in to follow this order.')
+        order = await Order.objects.select_related('restaurant').filter(pk=order_id).afirst()
+        if order is None:
+            raise Http404('No such order.')
+        if user.pk not in (order.user_id, order.restaurant.owner_id, order.courier_id):
+            raise PermissionDenied('You do not have access to this order.')
+
+        subscription = events.subscribe(order_channel(order_id))
+        # Read after subscribing: a change in between shows up in the stream
+        rows = [row async for row in Order.objects.filter(pk=order_id).values(*STATUS_FIELDS)]
+        return events.stream(subscription, [status_event(row) for row in rows])
+
+
+class CourierEventsView(View):
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        if not events.streams_available(request):
+            return events.unavailable()
+        user = await request.auser()
+        if not user.is_authenticated or not user.is_courier():
+            raise PermissionDenied('Only couriers can follow the order board.')
+        return events.stream(events.subscribe(BOARD_CHANNEL, courier_channel(user.pk)))
@@ -0,0 +1,471 @@
+"""
+Tests for the cart and checkout pages, order cancelation, the order state
+machine, the sales rollups, courier order claims, courier positions and
+dispatch matching.
+"""
+from __future__ import annotations
+
+import random
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.messages import get_messages  # type: ignore
+from django.db import connection  # type: ignore
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings  # type: ignore
+from django.urls import reverse  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from accounts.models import User
+from restaurants.models import Product, Restaurant
+from . import dispatch
+from .dispatch import CourierState, Job, courier_position, load_couriers, match
+from .models import DailyProductSales, DailySales, Order, OrderItem, OrderTransition
+from .sales import backfill, local_day
+from .services import claim_next_order, claim_order
+from .state import transition, transition_one
+
+# Session, user, then the one select_related query that resolves the cart
+CART_QUERIES = 3
+
+
+class CartQueryCountTests(TestCase):
+    """The cart and checkout pages load every line with one query, whatever the cart size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='cart-owner', role=User.ROLE_OWNER)
+        restaurant = Restaurant.objects.create(name='Cart test', owner=owner)
+        cls.products = Product.objects.bulk_create([
+            Product(restaurant=restaurant, name=f'Dish {i:02d}', price=Decimal('4.20'), quantity=50)
+            for i in range(15)
+        ])
+        cls.customer = User.objects.create_user(username='cart-customer')
+
+    def setUp(self):
+        self.client.force_login(self.customer)
+
+    def _fill_cart(self, lines: int) -> None:
+        session = self.client.session
+        session['cart'] = {str(product.pk): 2 for product in self.products[:lines]}
+        session.save()
+
+    def _assertPageQueries(self, url_name: str) -> None:
+        for lines in (1, 15):
+            with self.subTest(lines=lines):
+                self._fill_cart(lines)
+                with self.assertNumQueries(CART_QUERIES):
+                    response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['items']), lines)
+
+    def test_cart_queries_do_not_grow_with_lines(self):
+        self._assertPageQueries('orders:cart')
+
+    def test_checkout_queries_do_not_grow_with_lines(self):
+        self._assertPageQueries('orders:checkout')
+
+
+class OrderCancelViewTests(TestCase):
+    """Canceling from the order lists: JSON for fetch() calls, messages and a redirect for forms."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='cancel-owner', role=User.ROLE_OWNER)
+        cls.customer = User.objects.create_user(username='cancel-customer')
+        cls.restaurant = Restaurant.objects.create(name='Cancel test', owner=owner)
+
+    def setUp(self):
+        self.client.force_login(self.customer)
+
+    def _order(self, status: str) -> Order:
+        return Order.objects.create(
+            user=self.customer, restaurant=self.restaurant, status=status,
+            delivery_address='Skopje', subtotal=Decimal('5.00'), total=Decimal('5.00'),
+        )
+
+    def _cancel(self, order: Order, ajax: bool = False):
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        return self.client.post(reverse('orders:order_cancel', args=[order.pk]), **headers)
+
+    def test_form_cancel(self):
+        order = self._order(Order.STATUS_PLACED)
+        response = self._cancel(order)
+        self.assertRedirects(response, reverse('orders:my_orders'), fetch_redirect_response=False)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_CANCELED)
+
+    def test_form_cancel_refused(self):
+        order = self._order(Order.STATUS_CONFIRMED)
+        response = self._cancel(order)
+        self.assertRedirects(response, reverse('orders:my_orders'), fetch_redirect_response=False)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            [f'Order #{order.pk} can no longer be canceled.'],
+        )
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_CONFIRMED)
+
+    def test_ajax_cancel_refused(self):
+        response = self._cancel(self._order(Order.STATUS_CONFIRMED), ajax=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class StateMachineTests(TestCase):
+    """`orders.state.transition` moves only orders in a source status that pass the guards, and logs each move."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='state-owner', role=User.ROLE_OWNER)
+        cls.customer = User.objects.create_user(username='state-customer')
+        cls.courier = User.objects.create_user(username='state-courier', role=User.ROLE_COURIER)
+        cls.other_courier = User.objects.create_user(username='state-other-courier', role=User.ROLE_COURIER)
+        cls.restaurant = Restaurant.objects.create(name='State test', owner=owner)
+
+    def _order(self, status: str, courier=None) -> Order:
+        return Order.objects.create(
+            user=self.customer, restaurant=self.restaurant, status=status, courier=courier,
+            delivery_address='Skopje', subtotal=Decimal('5.00'), total=Decimal('5.00'),
+        )
+
+    def _log(self) -> list[tuple]:
+        return list(OrderTransition.objects.values_list('order_id', 'transition', 'from_status', 'to_status', 'actor_id'))
+
+    def test_allowed_transition(self):
+        order = self._order(Order.STATUS_PLACED)
+        self.assertTrue(transition_one('confirm', order, actor=self.restaurant.owner))
+        self.assertEqual(order.status, Order.STATUS_CONFIRMED)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_CONFIRMED)
+        self.assertEqual(
+            self._log(),
+            [(order.pk, 'confirm', Order.STATUS_PLACED, Order.STATUS_CONFIRMED, self.restaurant.owner.pk)],
+        )
+        # Logged with the same timestamp as the order's updated_at
+        self.assertEqual(OrderTransition.objects.get().created_at, order.updated_at)
+
+    def test_wrong_source_status(self):
+        order = self._order(Order.STATUS_DELIVERED)
+        self.assertFalse(transition_one('confirm', order))
+        self.assertEqual(order.status, Order.STATUS_DELIVERED)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_DELIVERED)
+        self.assertEqual(self._log(), [])
+
+    def test_failed_guard(self):
+        order = self._order(Order.STATUS_ACCEPTED, courier=self.other_courier)
+        self.assertEqual(transition('pick_up', [order.pk], actor=self.courier, guards={'courier': self.courier}), [])
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_ACCEPTED)
+        self.assertEqual(self._log(), [])
+
+    def test_values_are_set(self):
+        order = self._order(Order.STATUS_CONFIRMED)
+        moved = transition('accept', [order.pk], guards={'courier': None}, values={'courier': self.courier})
+        self.assertEqual(moved, [order.pk])
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.courier_id), (Order.STATUS_ACCEPTED, self.courier.pk))
+
+    def test_bulk_skips_mixed_batch(self):
+        placed = self._order(Order.STATUS_PLACED)
+        pending = self._order(Order.STATUS_PENDING)
+        confirmed = self._order(Order.STATUS_CONFIRMED)
+        delivered = self._order(Order.STATUS_DELIVERED)
+        later = self._order(Order.STATUS_PLACED)
+        ids = [later.pk, delivered.pk, placed.pk, confirmed.pk, pending.pk, placed.pk]
+
+        # Input order, duplicates once; orders in neither source status are left alone
+        self.assertEqual(transition('cancel', ids, actor=self.customer), [later.pk, placed.pk, pending.pk])
+        self.assertEqual(
+            dict(Order.objects.values_list('pk', 'status')),
+            {
+                placed.pk: Order.STATUS_CANCELED,
+                pending.pk: Order.STATUS_CANCELED,
+                confirmed.pk: Order.STATUS_CONFIRMED,
+                delivered.pk: Order.STATUS_DELIVERED,
+                later.pk: Order.STATUS_CANCELED,
+            },
+        )
+        # One row per moved order, recording which source status it left
+        self.assertCountEqual(
+            self._log(),
+            [
+                (placed.pk, 'cancel', Order.STATUS_PLACED, Order.STATUS_CANCELED, self.customer.pk),
+                (later.pk, 'cancel', Order.STATUS_PLACED, Order.STATUS_CANCELED, self.customer.pk),
+                (pending.pk, 'cancel', Order.STATUS_PENDING, Order.STATUS_CANCELED, self.customer.pk),
+            ],
+        )
+        self.assertEqual(len(set(OrderTransition.objects.values_list('created_at', flat=True))), 1)
+
+        # Running the same batch again moves nothing and logs nothing
+        self.assertEqual(transition('cancel', ids, actor=self.customer), [])
+        self.assertEqual(OrderTransition.objects.count(), 3)
+
+
+class SalesRollupTests(TestCase):
+    """`DailySales`/`DailyProductSales` always equal a recount of the delivered orders."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='sales-owner', role=User.ROLE_OWNER)
+        cls.customer = User.objects.create_user(username='sales-customer')
+        cls.pizzeria = Restaurant.objects.create(name='Sales pizzeria', owner=owner)
+        cls.grill = Restaurant.objects.create(name='Sales grill', owner=owner)
+        cls.pizza = Product.objects.create(restaurant=cls.pizzeria, name='Pizza', price=Decimal('8.00'))
+        cls.calzone = Product.objects.create(restaurant=cls.pizzeria, name='Calzone', price=Decimal('9.50'))
+        cls.kebab = Product.objects.create(restaurant=cls.grill, name='Kebab', price=Decimal('6.25'))
+
+    def _order(self, status: str, *lines: tuple[Product, int], delivered_days_ago: int | None = None) -> Order:
+        """An order of ``(product, quantity)`` lines; delivered ones get a log row ``delivered_days_ago`` back."""
+        total = sum((product.price * quantity for product, quantity in lines), Decimal('0.00'))
+        order = Order.objects.create(
+            user=self.customer, restaurant=lines[0][0].restaurant, status=status,
+            delivery_address='Skopje', subtotal=total, total=total,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantity, price_at_time=product.price)
+            for product, quantity in lines
+        ])
+        if delivered_days_ago is not None:
+            OrderTransition.objects.create(
+                order=order, transition='deliver', from_status=Order.STATUS_PICKED_UP, to_status=status,
+                created_at=timezone.now() - timedelta(days=delivered_days_ago),
+            )
+        return order
+
+    def assertRollupsMatchOrders(self):
+        daily: dict[tuple, list] = defaultdict(lambda: [0, Decimal('0.00')])
+        products: dict[tuple, list] = defaultdict(lambda: [0, 0, Decimal('0.00')])
+        delivered = Order.objects.filter(status=Order.STATUS_DELIVERED).prefetch_related('items', 'transitions')
+        for order in delivered:
+            moments = [row.created_at for row in order.transitions.all() if row.to_status == Order.STATUS_DELIVERED]
+            day = local_day(min(moments, default=order.updated_at))
+            daily[(order.restaurant_id, day)][0] += 1
+            daily[(order.restaurant_id, day)][1] += order.total
+            for item in order.items.all():
+                row = products[(order.restaurant_id, day, item.product_id)]
+                row[0] += 1
+                row[1] += item.quantity
+                row[2] += item.price_at_time * item.quantity
+        stored_daily = DailySales.objects.values_list('restaurant_id', 'day', 'orders', 'revenue')
+        self.assertEqual({tuple(row[:2]): list(row[2:]) for row in stored_daily}, dict(daily))
+        stored_products = DailyProductSales.objects.values_list(
+            'restaurant_id', 'day', 'product_id', 'orders', 'quantity', 'revenue',
+        )
+        self.assertEqual({tuple(row[:3]): list(row[3:]) for row in stored_products}, dict(products))
+
+    def test_deliveries_are_recorded(self):
+        first = self._order(Order.STATUS_PICKED_UP, (self.pizza, 2), (self.calzone, 1))
+        second = self._order(Order.STATUS_PICKED_UP, (self.pizza, 1))
+        third = self._order(Order.STATUS_PICKED_UP, (self.kebab, 3))
+        self._order(Order.STATUS_CONFIRMED, (self.pizza, 4))
+        self.assertEqual(transition('deliver', [first.pk, third.pk]), [first.pk, third.pk])
+        self.assertRollupsMatchOrders()
+
+        # Same restaurant and day: the rows are added to, not replaced
+        transition('deliver', [second.pk])
+        self.assertRollupsMatchOrders()
+        self.assertEqual(DailySales.objects.get(restaurant=self.pizzeria).orders, 2)
+
+        # A repeated delivery moves nothing and counts nothing
+        self.assertEqual(transition('deliver', [first.pk]), [])
+        self.assertRollupsMatchOrders()
+
+    def test_backfill_rebuilds_past_days(self):
+        old = self._order(Order.STATUS_DELIVERED, (self.pizza, 1), (self.calzone, 2), delivered_days_ago=3)
+        self._order(Order.STATUS_DELIVERED, (self.pizza, 2), delivered_days_ago=3)
+        self._order(Order.STATUS_DELIVERED, (self.kebab, 1), delivered_days_ago=2)
+        fixed = self._order(Order.STATUS_DELIVERED, (self.calzone, 1), delivered_days_ago=1)
+        self._order(Order.STATUS_CANCELED, (self.pizza, 5))
+        # Delivered today through the state machine: left to record_delivered
+        live = self._order(Order.STATUS_PICKED_UP, (self.kebab, 2))
+        transition('deliver', [live.pk])
+
+        self.assertEqual(backfill(chunk_size=2), 4)
+        self.assertRollupsMatchOrders()
+
+        # History edited behind the rollups' back: the next backfill catches up
+        old.delete()
+        OrderItem.objects.filter(order=fixed).update(quantity=3)
+        Order.objects.filter(pk=fixed.pk).update(subtotal=Decimal('28.50'), total=Decimal('28.50'))
+        self.assertEqual(backfill(chunk_size=2), 3)
+        self.assertRollupsMatchOrders()
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    """Couriers grabbing the same confirmed orders at once never share one."""
+
+    COURIERS = 8
+    ORDERS = 30
+
+    def setUp(self):
+        owner = User.objects.create_user(username='claim-owner', role=User.ROLE_OWNER)
+        customer = User.objects.create_user(username='claim-customer')
+        restaurant = Restaurant.objects.create(name='Claims test', owner=owner)
+        self.couriers = [
+            User.objects.create_user(username=f'claim-courier-{i}', role=User.ROLE_COURIER)
+            for i in range(self.COURIERS)
+        ]
+        Order.objects.bulk_create([
+            Order(
+                user=customer, restaurant=restaurant, status=Order.STATUS_CONFIRMED,
+                delivery_address='Skopje', subtotal=Decimal('5.00'), total=Decimal('5.00'),
+            )
+            for _ in range(self.ORDERS)
+        ])
+        self.order_ids = list(Order.objects.values_list('pk', flat=True))
+
+    def _race(self, claim_all) -> list[tuple[int, int]]:
+        """Run ``claim_all(index, courier)`` for every courier at once; returns the (order, courier) wins."""
+        wins: list[tuple[int, int]] = []
+        errors: list[Exception] = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.COURIERS)
+
+        def work(index: int, courier) -> None:
+            try:
+                start.wait()
+                mine = claim_all(index, courier)
+                with lock:
+                    wins.extend((order_id, courier.pk) for order_id in mine)
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(i, c)) for i, c in enumerate(self.couriers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return wins
+
+    def assertNoDoubleAssignments(self, wins: list[tuple[int, int]]) -> None:
+        doubles = [order_id for order_id, count in Counter(order_id for order_id, _ in wins).items() if count > 1]
+        self.assertEqual(doubles, [])
+        stored = dict(Order.objects.values_list('pk', 'courier_id'))
+        self.assertEqual({order_id: courier_id for order_id, courier_id in wins}, stored)
+        self.assertEqual(
+            Order.objects.filter(status=Order.STATUS_ACCEPTED).count(), self.ORDERS,
+        )
+
+    def test_claim_order(self):
+        def claim_all(index: int, courier) -> list[int]:
+            order_ids = random.Random(index).sample(self.order_ids, len(self.order_ids))
+            return [order_id for order_id in order_ids if claim_order(order_id, courier)]
+
+        self.assertNoDoubleAssignments(self._race(claim_all))
+
+    def test_claim_next_order(self):
+        def claim_all(index: int, courier) -> list[int]:
+            mine = []
+            while (order := claim_next_order(courier)) is not None:
+                mine.append(order.pk)
+            return mine
+
+        self.assertNoDoubleAssignments(self._race(claim_all))
+
+
+@override_settings(DISPATCH_DEPOT=(41.9973, 21.4280))
+class CourierPositionTests(TestCase):
+    """
+    A courier is where they last dropped an order off, never at one still on
+    the way; dispatch plans their next pickup from the end of their active delivery.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='position-owner', role=User.ROLE_OWNER)
+        cls.customer = User.objects.create_user(username='position-customer')
+        cls.restaurant = Restaurant.objects.create(name='Position test', owner=owner)
+
+    def setUp(self):
+        self.courier = User.objects.create_user(username='position-courier', role=User.ROLE_COURIER)
+        self.client.force_login(self.courier)  # sets last_login, so dispatch counts the courier as active
+
+    def _order(self, status: str, point: tuple[float, float]) -> Order:
+        return Order.objects.create(
+            user=self.customer, restaurant=self.restaurant, courier=self.courier, status=status,
+            delivery_address='Skopje', delivery_latitude=point[0], delivery_longitude=point[1],
+            subtotal=Decimal('5.00'), total=Decimal('5.00'),
+        )
+
+    def _dispatch_position(self):
+        return next(state.position for state in load_couriers() if state.courier_id == self.courier.pk)
+
+    def test_depot_without_deliveries(self):
+        self.assertEqual(courier_position(self.courier), (41.9973, 21.4280))
+        self.assertEqual(self._dispatch_position(), (41.9973, 21.4280))
+
+    def test_last_delivered_drop_off(self):
+        self._order(Order.STATUS_DELIVERED, (42.0, 21.43))
+        self.assertEqual(courier_position(self.courier), (42.0, 21.43))
+        self.assertEqual(self._dispatch_position(), (42.0, 21.43))
+
+    def test_active_delivery(self):
+        self._order(Order.STATUS_DELIVERED, (42.0, 21.43))
+        self._order(Order.STATUS_ACCEPTED, (42.01, 21.40))
+        self.assertEqual(courier_position(self.courier), (42.0, 21.43))
+        self.assertEqual(self._dispatch_position(), (42.01, 21.40))
+
+    def test_nearby_ignores_unusable_radius(self):
+        for radius in ('nan', 'inf', '-1', '0'):
+            with self.subTest(radius=radius):
+                response = self.client.get(reverse('orders:courier_nearby'), {'radius': radius})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['position'], {'lat': 41.9973, 'lng': 21.4280})
+
+
+class MatchTests(SimpleTestCase):
+    """Greedy dispatch matching, with and without numpy."""
+
+    def _random(self, seed: int, orders: int, couriers: int, max_load: int):
+        rng = random.Random(seed)
+
+        def point():
+            return (rng.uniform(41.97, 42.03), rng.uniform(21.38, 21.48))
+
+        jobs = [Job(i, point(), point()) for i in range(orders)]
+        states = [CourierState(1000 + i, point(), rng.randint(0, max_load)) for i in range(couriers)]
+        return jobs, states
+
+    def test_nearest_courier_first_come(self):
+        jobs = [Job(1, (42.0, 21.40), (42.0, 21.45)), Job(2, (42.0, 21.401), (42.0, 21.45))]
+        couriers = [CourierState(10, (42.0, 21.43)), CourierState(11, (42.0, 21.402))]
+        # The older order gets the nearer courier even though it is nearer to the newer one too
+        self.assertEqual(match(jobs, couriers, use_numpy=False), [(1, 11), (2, 10)])
+
+    def test_capacity_and_drop_off_chaining(self):
+        jobs = [Job(1, (42.0, 21.40), (42.0, 21.46)), Job(2, (42.0, 21.461), (42.0, 21.40))]
+        couriers = [CourierState(10, (42.0, 21.40)), CourierState(11, (42.0, 21.43), load=2)]
+        # Courier 11 is full; courier 10 takes order 1 and, from its drop-off, order 2 in the next round
+        self.assertEqual(match(jobs, couriers, capacity=2, use_numpy=False), [(1, 10), (2, 10)])
+        # With capacity 1 courier 10 is full after order 1, so order 2 waits
+        self.assertEqual(match(jobs, couriers, capacity=1, use_numpy=False), [(1, 10)])
+
+    def test_max_pickup(self):
+        jobs = [Job(1, (42.0, 21.40), (42.0, 21.40))]
+        couriers = [CourierState(10, (42.1, 21.40))]
+        self.assertEqual(match(jobs, couriers, max_pickup_km=5, use_numpy=False), [])
+
+    @skipUnless(dispatch.numpy is not None, 'numpy is not installed')
+    def test_numpy_matches_python(self):
+        for seed, (orders, couriers, capacity, max_load, max_km) in enumerate([
+            (300, 120, 1, 1, None),
+            (300, 120, 1, 0, None),
+            (300, 120, 3, 2, None),
+            (400, 150, 2, 0, 2.0),
+            (50, 200, 1, 0, None),
+        ]):
+            with self.subTest(seed=seed):
+                jobs, states = self._random(seed, orders, couriers, max_load)
+                options = {'capacity': capacity, 'max_pickup_km': max_km}
+                self.assertEqual(
+                    match(jobs, states, use_numpy=True, **options),
+                    match(jobs, states, use_numpy=False, **options),
+                )
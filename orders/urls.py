@@ -2,6 +2,7 @@
 URL configuration for the orders app.
 """
 from django.urls import path  # type: ignore
+from .streams import CourierEventsView, OrderEventsView
 from .views import (
     AddToCartView,
     CartView,
@@ -9,15 +10,20 @@ from .views import (
     CheckoutPaymentView,
     MyOrdersView,
     OwnerOrdersView,
+    OwnerSalesView,
     CourierOrdersView,
     CourierDashboardView,
     CourierAssignOrderView,
+    CourierClaimNextOrderView,
+    CourierNearbyOrdersView,
     CourierStartDeliveryView,
     CourierCompleteOrderView,
     OrderConfirmView,
     CourierOrderDetailView,
     OrderTrackingView,
-    OrderMarkDeliveredView
+    OrderEtaView,
+    OrderMarkDeliveredView,
+    OrderCancelView,
 )
 
 app_name = 'orders'
@@ -29,16 +35,23 @@ urlpatterns = [
     path('checkout/<int:order_id>/pay/', CheckoutPaymentView.as_view(), name='checkout_pay'),
     path('my/', MyOrdersView.as_view(), name='my_orders'),
     path('owner/', OwnerOrdersView.as_view(), name='owner_orders'),
+    path('owner/sales/', OwnerSalesView.as_view(), name='owner_sales'),
     # Dashboard and actions for couriers
     path('courier/', CourierOrdersView.as_view(), name='courier_orders'),
     path('courier/dashboard/', CourierDashboardView.as_view(), name='courier_dashboard'),
     path('courier/assign/<int:order_id>/', CourierAssignOrderView.as_view(), name='courier_assign'),
+    path('courier/claim-next/', CourierClaimNextOrderView.as_view(), name='courier_claim_next'),
+    path('courier/nearby/', CourierNearbyOrdersView.as_view(), name='courier_nearby'),
+    path('courier/events/', CourierEventsView.as_view(), name='courier_events'),
     path('courier/orders/<int:order_id>/start/', CourierStartDeliveryView.as_view(), name='courier_start'),
     path('courier/complete/<int:order_id>/', CourierCompleteOrderView.as_view(), name='courier_complete'),
     path('<int:order_id>/confirm/', OrderConfirmView.as_view(), name='order_confirm'),
+    path('<int:order_id>/cancel/', OrderCancelView.as_view(), name='order_cancel'),
     path('courier/orders/<int:order_id>/', CourierOrderDetailView.as_view(),
          name='courier_order_detail'),
     path('track/<int:order_id>/', OrderTrackingView.as_view(), name='track_order'),
+    path('track/<int:order_id>/events/', OrderEventsView.as_view(), name='order_events'),
+    path('track/<int:order_id>/eta/', OrderEtaView.as_view(), name='order_eta'),
     path( 'track/<int:order_id>/mark-delivered/',OrderMarkDeliveredView.as_view(), name='track_mark_delivered'),
 
 ]
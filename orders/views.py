@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-import hashlib
-from decimal import Decimal
+import uuid
+from datetime import date, timedelta
 from typing import Dict
 
 from django.conf import settings
@@ -10,10 +10,22 @@ from django.contrib.auth.mixins import LoginRequiredMixin  # type: ignore
 from django.core.exceptions import PermissionDenied  # type: ignore
 from django.http import HttpRequest, HttpResponse, JsonResponse  # type: ignore
 from django.shortcuts import get_object_or_404, render, redirect  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.utils.dateparse import parse_datetime  # type: ignore
 from django.views import View  # type: ignore
 
-from restaurants.models import Product, Restaurant  # type: ignore
-from .models import Order, OrderItem  # type: ignore
+from core.geocoding import stored_point
+from core.idempotency import idempotent
+from core.pagination import InvalidCursor
+from restaurants.nearby import parse_point, parse_radius
+from . import lists
+from .cart import ResolvedCart, resolve_cart
+from .dispatch import courier_position
+from .eta import get_eta
+from .sales import local_day, sales_report
+from .models import Order  # type: ignore
+from .services import CheckoutError, cancel_order, claim_next_order, claim_order, place_order
+from .state import transition, transition_one
 
 
 # -----------------------------------------------------------------------------
@@ -36,31 +48,26 @@ def _remove_from_cart(session, product_id: int) -> None:
     session.modified = True
 
 
-def _is_ajax(request: HttpRequest) -> bool:
-    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
-
-
-def _dummy_geocode_sk(address: str) -> tuple[float, float]:
+def _resolve_session_cart(request: HttpRequest) -> ResolvedCart:
     """
-    Детерминистички "fake geocoding":
-    - било кој текст (адреса) -> координати во рамки на Скопје
-    - нема реален API, нема billing, 100% dummy за HCI проект
-    - истата адреса секогаш дава исти координати
+    Resolve the session cart in one query. Products that no longer exist
+    are dropped from the session and reported to the user in one message.
     """
-    normalized = (address or "").strip().lower() or "skopje"
-    h = hashlib.sha256(normalized.encode("utf-8")).digest()
-
-    # 0..1
-    x = int.from_bytes(h[0:2], "big") / 65535
-    y = int.from_bytes(h[2:4], "big") / 65535
+    cart = _get_cart(request.session)
+    resolved = resolve_cart(cart)
+    if resolved.missing_ids:
+        for product_id in resolved.missing_ids:
+            cart.pop(str(product_id), None)
+        request.session.modified = True
+        messages.warning(
+            request,
+            f'{len(resolved.missing_ids)} item(s) in your cart are no longer available and were removed.',
+        )
+    return resolved
 
-    # Приближна кутија околу Скопје (за demo изглед)
-    lat_min, lat_max = 41.97, 42.03
-    lng_min, lng_max = 21.38, 21.48
 
-    lat = lat_min + (lat_max - lat_min) * x
-    lng = lng_min + (lng_max - lng_min) * y
-    return (round(lat, 6), round(lng, 6))
+def _is_ajax(request: HttpRequest) -> bool:
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
 
 
 # -----------------------------------------------------------------------------
@@ -82,113 +89,59 @@ class CartView(LoginRequiredMixin, View):
     template_name = 'orders/cart.html'
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        cart = _get_cart(request.session)
-        items = []
-        subtotal = Decimal('0.00')
-        for product_id_str, quantity in cart.items():
-            product = get_object_or_404(Product, pk=int(product_id_str))
-            line_total = product.price * quantity
-            items.append({'product': product, 'quantity': quantity, 'line_total': line_total})
-            subtotal += line_total
-        return render(request, self.template_name, {'items': items, 'subtotal': subtotal})
+        resolved = _resolve_session_cart(request)
+        return render(request, self.template_name, {'items': resolved.lines, 'subtotal': resolved.subtotal})
 
 
 class CheckoutView(LoginRequiredMixin, View):
     """
     Create an order from the cart and redirect to the payment page.
     On GET: show a summary using current product prices.
-    On POST: create Order + OrderItems capturing price_at_time to satisfy NOT NULL.
+    On POST: create Order + OrderItems (price_at_time snapshot) in one transaction.
     """
     template_name = 'orders/checkout.html'
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        cart = _get_cart(request.session)
-        if not cart:
+        resolved = _resolve_session_cart(request)
+        if not resolved:
             messages.info(request, 'Your cart is empty.')
             return redirect('orders:cart')
 
-        items = []
-        subtotal = Decimal('0.00')
-        restaurant: Restaurant | None = None
-
-        for product_id_str, quantity in cart.items():
-            product = get_object_or_404(Product, pk=int(product_id_str))
-            if restaurant is None:
-                restaurant = product.restaurant
-            elif restaurant != product.restaurant:
-                messages.error(request, 'All items in the cart must be from the same restaurant.')
-                return redirect('orders:cart')
-
-            line_total = product.price * quantity
-            items.append({'product': product, 'quantity': quantity, 'line_total': line_total})
-            subtotal += line_total
+        if not resolved.is_single_restaurant:
+            messages.error(request, 'All items in the cart must be from the same restaurant.')
+            return redirect('orders:cart')
 
         return render(
             request,
             self.template_name,
             {
-                'items': items,
-                'subtotal': subtotal,
+                'items': resolved.lines,
+                'subtotal': resolved.subtotal,
+                'idempotency_key': uuid.uuid4().hex,
                 'STRIPE_PUBLIC_KEY': getattr(settings, 'STRIPE_PUBLIC_KEY', ''),
             },
         )
 
+    @idempotent
     def post(self, request: HttpRequest) -> HttpResponse:
-        cart = _get_cart(request.session)
-        if not cart:
-            messages.info(request, 'Your cart is empty.')
-            return redirect('orders:cart')
-
         # 1) Ја читаме адресата што корисникот ја внел во checkout form
         delivery_address = (request.POST.get('delivery_address') or '').strip() or 'Skopje'
 
-        # 2) Ги пресметуваме ставките + subtotal и правиме проверка за еден ресторан
-        line_items = []
-        subtotal = Decimal('0.00')
-        restaurant: Restaurant | None = None
-
-        for product_id_str, quantity in cart.items():
-            product = get_object_or_404(Product, pk=int(product_id_str))
-            if restaurant is None:
-                restaurant = product.restaurant
-            elif restaurant != product.restaurant:
-                messages.error(request, 'All items in the cart must be from the same restaurant.')
-                return redirect('orders:cart')
-
-            price_at_time = product.price
-            line_total = price_at_time * quantity
-            line_items.append((product, quantity, price_at_time))
-            subtotal += line_total
-
-        if restaurant is None:
-            messages.error(request, 'Unable to determine restaurant for this cart.')
-            return redirect('orders:cart')
+        # 2) Ги вчитуваме ставките со едно query
+        resolved = _resolve_session_cart(request)
 
-        # 3) Креираме нарачка и ја снимаме адресата во база
-        order = Order.objects.create(
-            user=request.user,
-            restaurant=restaurant,
-            status=Order.STATUS_PLACED,
-            delivery_address=delivery_address,
-            subtotal=subtotal,
-            delivery_fee=Decimal('0.00'),
-            total=subtotal,  # subtotal + delivery_fee (сега е 0)
-        )
-
-        # 4) Ги снимаме ставките со price_at_time (snapshot)
-        for product, quantity, price_at_time in line_items:
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price_at_time=price_at_time,
-            )
+        # 3) Креираме нарачка + ставки (price_at_time snapshot) во една трансакција
+        try:
+            order = place_order(user=request.user, cart=resolved, delivery_address=delivery_address)
+        except CheckoutError as exc:
+            messages.error(request, str(exc))
+            return redirect('orders:cart')
 
-        # 5) Празниме cart
+        # 4) Празниме cart
         request.session['cart'] = {}
         request.session.modified = True
 
-        # 6) Одиме на payment чекор
+        # 5) Одиме на payment чекор
         return redirect('orders:checkout_pay', order_id=order.pk)
 
 
@@ -220,49 +173,123 @@ class CheckoutPaymentView(LoginRequiredMixin, View):
                 'order': order,
                 'items': items,
                 'subtotal': order.total,
+                'idempotency_key': uuid.uuid4().hex,
                 'STRIPE_PUBLIC_KEY': getattr(settings, 'STRIPE_PUBLIC_KEY', ''),
             },
         )
 
 
-class MyOrdersView(LoginRequiredMixin, View):
+class OrderListMixin:
+    """
+    Render one keyset-paginated order list (see `orders.lists`) as HTML or JSON.
+
+    Subclasses implement ``get_queryset``; ``extra_context`` is passed to the template.
+    """
     template_name = 'orders/order_list.html'
+    extra_context: dict = {}
+
+    def get_queryset(self, request: HttpRequest):
+        raise NotImplementedError
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        orders = Order.objects.filter(user=request.user).select_related('restaurant')
-        return render(request, self.template_name, {'orders': orders})
+        try:
+            page = lists.order_page(request, self.get_queryset(request))
+        except (ValueError, InvalidCursor):
+            if lists.wants_json(request):
+                return JsonResponse({'error': 'Invalid limit or cursor.'}, status=400)
+            return redirect(request.path)
 
+        if lists.wants_json(request):
+            return JsonResponse(lists.serialize_page(page))
+        return render(request, self.template_name, {
+            'orders': page.items,
+            'next_url': lists.next_page_url(request, page),
+            'first_url': lists.first_page_url(request),
+            **self.extra_context,
+        })
+
+
+class MyOrdersView(LoginRequiredMixin, OrderListMixin, View):
+    def get_queryset(self, request: HttpRequest):
+        return lists.customer_orders(request.user)
 
-class OwnerOrdersView(LoginRequiredMixin, View):
-    template_name = 'orders/order_list.html'
+
+class OwnerOrdersView(LoginRequiredMixin, OrderListMixin, View):
+    extra_context = {'owner_mode': True}
 
     def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         if not request.user.is_authenticated:
             raise PermissionDenied('You do not have access to owner orders.')
         return super().dispatch(request, *args, **kwargs)
 
-    def get(self, request: HttpRequest) -> HttpResponse:
-        orders = (
-            Order.objects.filter(restaurant__owner=request.user)
-            .select_related('restaurant', 'user')
-        )
-        return render(request, self.template_name, {'orders': orders, 'owner_mode': True})
+    def get_queryset(self, request: HttpRequest):
+        return lists.owner_orders(request.user)
 
 
-class CourierOrdersView(LoginRequiredMixin, View):
-    template_name = 'orders/order_list.html'
+class OwnerSalesView(LoginRequiredMixin, View):
+    """
+    Sales of the owner's restaurants over a date range, read from the daily
+    rollups (`orders.sales`). GET parameters: ``from`` and ``to``
+    (YYYY-MM-DD, inclusive; default the last 30 days) and ``restaurant``
+    (one of the owner's, default all); ``?format=json`` returns the report.
+    """
+    template_name = 'orders/owner_sales.html'
+    default_days = 30
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not request.user.is_authenticated or not request.user.is_owner():
+            raise PermissionDenied('You do not have access to sales reports.')
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        restaurants = list(request.user.owned_restaurants.order_by('name').values_list('pk', 'name'))
+        owned = [pk for pk, _ in restaurants]
+        today = local_day(timezone.now())
+        try:
+            until = date.fromisoformat(request.GET['to']) if request.GET.get('to') else today
+            since = (
+                date.fromisoformat(request.GET['from']) if request.GET.get('from')
+                else until - timedelta(days=self.default_days - 1)
+            )
+            selected = int(request.GET['restaurant']) if request.GET.get('restaurant') else None
+        except ValueError:
+            since = until = selected = None
+        if since is None or since > until or (until - since).days > 366 or (selected is not None and selected not in owned):
+            if lists.wants_json(request):
+                return JsonResponse({'error': 'Invalid from, to or restaurant.'}, status=400)
+            return redirect(request.path)
+
+        report = sales_report([selected] if selected is not None else owned, since, until)
+        if lists.wants_json(request):
+            return JsonResponse(report)
+        peak = max((row['revenue'] for row in report['days']), default=0)
+        for row in report['days']:
+            row['share'] = round(row['revenue'] / peak * 100) if peak else 0
+        return render(request, self.template_name, {
+            'report': report,
+            'restaurants': restaurants,
+            'selected': selected,
+        })
+
+
+class CourierOrdersView(LoginRequiredMixin, OrderListMixin, View):
+    extra_context = {'courier_mode': True}
 
     def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         if not request.user.is_authenticated or not request.user.is_courier():
             raise PermissionDenied('You do not have access to courier orders.')
         return super().dispatch(request, *args, **kwargs)
 
-    def get(self, request: HttpRequest) -> HttpResponse:
-        orders = Order.objects.filter(status=Order.STATUS_CONFIRMED).select_related('user', 'restaurant')
-        return render(request, self.template_name, {'orders': orders, 'courier_mode': True})
+    def get_queryset(self, request: HttpRequest):
+        return lists.confirmed_orders()
 
 
 class CourierDashboardView(LoginRequiredMixin, View):
+    """
+    Courier dashboard with three independently paged lists. Each list has
+    its own cursor parameter (``available``, ``active``, ``delivered``);
+    ``?format=json`` returns all three pages.
+    """
     template_name = 'orders/courier_dashboard.html'
 
     def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
@@ -271,36 +298,61 @@ class CourierDashboardView(LoginRequiredMixin, View):
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        available_orders = (
-            Order.objects.filter(
-                status__in=[Order.STATUS_CONFIRMED],
-                courier__isnull=True
-            )
-            .select_related('user', 'restaurant')
-        )
-
-        my_active_orders = (
-            Order.objects.filter(
-                courier=request.user,
-                status__in=[Order.STATUS_ACCEPTED, Order.STATUS_PICKED_UP]
-            )
-            .select_related('user', 'restaurant')
-        )
-
-        my_delivered_orders = (
-            Order.objects.filter(courier=request.user, status=Order.STATUS_DELIVERED)
-            .select_related('user', 'restaurant')
-        )
+        sections = {
+            'available': lists.available_orders(),
+            'active': lists.courier_active_orders(request.user),
+            'delivered': lists.courier_delivered_orders(request.user),
+        }
+        try:
+            pages = {name: lists.order_page(request, qs, name) for name, qs in sections.items()}
+        except (ValueError, InvalidCursor):
+            if lists.wants_json(request):
+                return JsonResponse({'error': 'Invalid limit or cursor.'}, status=400)
+            return redirect(request.path)
+
+        if lists.wants_json(request):
+            return JsonResponse({name: lists.serialize_page(page) for name, page in pages.items()})
+
+        context = {}
+        for name, page in pages.items():
+            context[name] = {
+                'orders': page.items,
+                'next_url': lists.next_page_url(request, page, name),
+                'first_url': lists.first_page_url(request, name),
+            }
+        return render(request, self.template_name, {
+            'available_orders': context['available']['orders'],
+            'my_active_orders': context['active']['orders'],
+            'my_delivered_orders': context['delivered']['orders'],
+            'pages': context,
+        })
+
+
+class CourierNearbyOrdersView(LoginRequiredMixin, View):
+    """
+    JSON list of available orders near the courier, nearest pickup first.
+    The position is ``?near=lat,lng`` (e.g. from the browser's geolocation)
+    or, without it, the courier's last delivery point; ``radius`` (km) and
+    ``limit`` are optional.
+    """
 
-        return render(
-            request,
-            self.template_name,
-            {
-                'available_orders': available_orders,
-                'my_active_orders': my_active_orders,
-                'my_delivered_orders': my_delivered_orders,
-            },
-        )
+    def get(self, request: HttpRequest) -> HttpResponse:
+        if not request.user.is_courier():
+            raise PermissionDenied('Only couriers can look for nearby orders.')
+        try:
+            point = parse_point(request.GET['near']) if request.GET.get('near') else courier_position(request.user)
+            radius = parse_radius(request.GET.get('radius'))
+            limit = lists.page_size(request)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid near, radius or limit.'}, status=400)
+        orders = lists.nearby_available_orders(point, radius, limit)
+        return JsonResponse({
+            'position': {'lat': point[0], 'lng': point[1]},
+            'results': [
+                {**lists.serialize_order(order), 'pickup_km': round(order.pickup_km, 2)}
+                for order in orders
+            ],
+        })
 
 
 class CourierAssignOrderView(LoginRequiredMixin, View):
@@ -308,35 +360,53 @@ class CourierAssignOrderView(LoginRequiredMixin, View):
         if not request.user.is_courier():
             raise PermissionDenied('Only couriers can assign orders.')
 
-        order = get_object_or_404(Order, pk=order_id)
-
-        if order.status != Order.STATUS_CONFIRMED or order.courier_id is not None:
+        # Atomic claim: of several couriers accepting at once only one wins
+        if not claim_order(order_id, request.user):
+            get_object_or_404(Order, pk=order_id)
             return JsonResponse({'error': 'Order is not available for assignment.'}, status=400)
 
-        order.courier = request.user
-        order.status = Order.STATUS_ACCEPTED
-        order.save(update_fields=['courier', 'status'])
-
         if _is_ajax(request):
-            return JsonResponse({'id': order.id, 'status': order.status, 'courier': order.courier.username})
+            return JsonResponse({'id': order_id, 'status': Order.STATUS_ACCEPTED, 'courier': request.user.username})
 
-        messages.success(request, f'Order #{order.id} assigned to you and marked as accepted.')
+        messages.success(request, f'Order #{order_id} assigned to you and marked as accepted.')
         return redirect('orders:courier_dashboard')
 
 
+class CourierClaimNextOrderView(LoginRequiredMixin, View):
+    """Hand the courier the longest-waiting available order (see `claim_next_order`)."""
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        if not request.user.is_courier():
+            raise PermissionDenied('Only couriers can claim orders.')
+
+        order = claim_next_order(request.user)
+        if _is_ajax(request):
+            if order is None:
+                return JsonResponse({'error': 'No orders are waiting for a courier.'}, status=404)
+            return JsonResponse({
+                'id': order.id,
+                'status': order.status,
+                'restaurant': order.restaurant.name,
+                'delivery_address': order.delivery_address,
+            })
+
+        if order is None:
+            messages.info(request, 'No orders are waiting for a courier right now.')
+            return redirect('orders:courier_dashboard')
+        messages.success(request, f'Order #{order.id} from {order.restaurant.name} assigned to you.')
+        return redirect('orders:courier_order_detail', order_id=order.id)
+
+
 class CourierCompleteOrderView(LoginRequiredMixin, View):
     def post(self, request: HttpRequest, order_id: int) -> HttpResponse:
-        order = get_object_or_404(Order, pk=order_id, courier=request.user)
-        if order.status != Order.STATUS_PICKED_UP:
+        if not transition('deliver', [order_id], actor=request.user, guards={'courier': request.user}):
+            get_object_or_404(Order, pk=order_id, courier=request.user)
             return JsonResponse({'error': 'Order cannot be completed from its current status.'}, status=400)
 
-        order.status = Order.STATUS_DELIVERED
-        order.save(update_fields=['status'])
-
         if _is_ajax(request):
-            return JsonResponse({'id': order.id, 'status': order.status})
+            return JsonResponse({'id': order_id, 'status': Order.STATUS_DELIVERED})
 
-        messages.success(request, f'Order #{order.id} marked as delivered.')
+        messages.success(request, f'Order #{order_id} marked as delivered.')
         return redirect('orders:courier_dashboard')
 
 
@@ -362,12 +432,9 @@ class OrderConfirmView(LoginRequiredMixin, View):
                 return JsonResponse({'error': 'Not allowed.'}, status=403)
             raise PermissionDenied('You do not have permission to confirm this order.')
 
-        if order.status != Order.STATUS_PLACED:
+        if not transition_one('confirm', order, actor=request.user):
             return JsonResponse({'error': 'Order cannot be confirmed in its current status.'}, status=400)
 
-        order.status = Order.STATUS_CONFIRMED
-        order.save(update_fields=['status'])
-
         if _is_ajax(request):
             return JsonResponse({'id': order.id, 'status': order.status})
 
@@ -384,18 +451,14 @@ class CourierStartDeliveryView(LoginRequiredMixin, View):
         if not request.user.is_courier():
             raise PermissionDenied('Only couriers can start delivery.')
 
-        order = get_object_or_404(Order, pk=order_id, courier=request.user)
-
-        if order.status != Order.STATUS_ACCEPTED:
+        if not transition('pick_up', [order_id], actor=request.user, guards={'courier': request.user}):
+            get_object_or_404(Order, pk=order_id, courier=request.user)
             return JsonResponse({'error': 'Order is not in an accepted state.'}, status=400)
 
-        order.status = Order.STATUS_PICKED_UP
-        order.save(update_fields=['status'])
-
         if _is_ajax(request):
-            return JsonResponse({'id': order.id, 'status': order.status})
+            return JsonResponse({'id': order_id, 'status': Order.STATUS_PICKED_UP})
 
-        messages.success(request, f'Order #{order.id} marked as picked up.')
+        messages.success(request, f'Order #{order_id} marked as picked up.')
         return redirect('orders:courier_dashboard')
 
 
@@ -457,7 +520,7 @@ class OrderTrackingView(LoginRequiredMixin, View):
     template_name = 'orders/order_tracking.html'
 
     def get(self, request: HttpRequest, order_id: int) -> HttpResponse:
-        order = get_object_or_404(Order, pk=order_id, user=request.user)
+        order = get_object_or_404(Order.objects.select_related("restaurant"), pk=order_id, user=request.user)
         status = order.status
 
         # ----- 1) Чекор за progress bar -----
@@ -471,12 +534,13 @@ class OrderTrackingView(LoginRequiredMixin, View):
             # DELIVERED или било што друго (PENDING/CANCELED) → последен чекор
             current_step = 4
 
-        # ----- 2) Адреси и координати -----
-        restaurant_address = (getattr(order.restaurant, "address", "") or "").strip() or "Skopje"
+        # ----- 2) Адреси и координати (зачувани при save / checkout) -----
+        restaurant = order.restaurant
+        restaurant_address = (restaurant.address or "").strip() or "Skopje"
         delivery_address = (order.delivery_address or "").strip() or "Skopje"
 
-        start_coords = _dummy_geocode_sk(restaurant_address)
-        end_coords = _dummy_geocode_sk(delivery_address)
+        start_coords = stored_point(restaurant.latitude, restaurant.longitude, restaurant_address)
+        end_coords = stored_point(order.delivery_latitude, order.delivery_longitude, delivery_address)
 
         # ----- 3) Дали воопшто да прикажеме мапа -----
         show_map = (
@@ -486,6 +550,8 @@ class OrderTrackingView(LoginRequiredMixin, View):
                 Order.STATUS_PICKED_UP,
                 Order.STATUS_DELIVERED,
             ]
+            and start_coords is not None
+            and end_coords is not None
         )
 
         # ----- 4) Каде треба да стои скутерот (логика за front-end) -----
@@ -503,6 +569,9 @@ class OrderTrackingView(LoginRequiredMixin, View):
         # ----- 5) Дали да има анимација -----
         animate_courier = (status == Order.STATUS_PICKED_UP)
 
+        # ----- 6) Проценка за подигнување / достава (orders/eta.py) -----
+        eta = get_eta(order.pk)
+
         context = {
             "order": order,
             "current_step": current_step,
@@ -517,34 +586,80 @@ class OrderTrackingView(LoginRequiredMixin, View):
             "end_coords": end_coords,
             "animate_courier": animate_courier,
             "courier_position": courier_position,
+            "eta": eta,
+            "pickup_at": parse_datetime(eta["pickup_at"]) if eta and eta["pickup_at"] else None,
+            "delivery_at": parse_datetime(eta["delivery_at"]) if eta and eta["delivery_at"] else None,
         }
         return render(request, self.template_name, context)
 
+
+class OrderEtaView(LoginRequiredMixin, View):
+    """
+    JSON delivery estimate polled by the tracking page.
+
+    Served from the per-order cache in `orders.eta`, including the access
+    check, so a poll costs no queries while the estimate is fresh.
+    """
+
+    def get(self, request: HttpRequest, order_id: int) -> HttpResponse:
+        eta = get_eta(order_id)
+        if eta is None:
+            return JsonResponse({"error": "Order not found."}, status=404)
+        viewers = eta.pop("viewers")
+        if request.user.pk not in viewers:
+            raise PermissionDenied
+        return JsonResponse(eta)
+
+
 class OrderMarkDeliveredView(LoginRequiredMixin, View):
     """
-    Mark an order as delivered when tracking animation finishes.
-    This endpoint is called from the tracking page via AJAX/fetch.
+    Let the customer confirm that a picked-up order has arrived.
+    Accepts a normal POST or AJAX/fetch (JSON response).
     """
 
     def post(self, request: HttpRequest, order_id: int) -> HttpResponse:
-        # Only the customer that owns the order may mark it as delivered
-        order = get_object_or_404(Order, pk=order_id, user=request.user)
-
-        # We expect the order to be in PICKED_UP state
-        if order.status != Order.STATUS_PICKED_UP:
+        # Only the customer that owns the order may mark it as delivered,
+        # and only from the PICKED_UP state
+        if not transition("deliver", [order_id], actor=request.user, guards={"user": request.user}):
+            get_object_or_404(Order, pk=order_id, user=request.user)
             return JsonResponse(
                 {"error": "Order cannot be marked as delivered from its current status."},
                 status=400,
             )
 
-        order.status = Order.STATUS_DELIVERED
-        order.save(update_fields=["status"])
-
         # For AJAX/fetch calls return JSON
         if _is_ajax(request):
-            return JsonResponse({"ok": True, "status": order.status})
+            return JsonResponse({"ok": True, "status": Order.STATUS_DELIVERED})
 
         # Fallback if someone calls it via normal POST
-        messages.success(request, f"Order #{order.id} marked as delivered.")
+        messages.success(request, f"Order #{order_id} marked as delivered.")
         return redirect("orders:my_orders")
 
+
+class OrderCancelView(LoginRequiredMixin, View):
+    """
+    Cancel an order that has not been confirmed yet (customer or restaurant owner).
+    Reserved stock is returned to the products.
+    """
+
+    def post(self, request: HttpRequest, order_id: int) -> HttpResponse:
+        order = get_object_or_404(Order.objects.select_related('restaurant'), pk=order_id)
+
+        is_owner = order.restaurant.owner_id == request.user.id
+        if order.user_id != request.user.id and not is_owner:
+            if _is_ajax(request):
+                return JsonResponse({'error': 'Not allowed.'}, status=403)
+            raise PermissionDenied('You do not have permission to cancel this order.')
+
+        back = 'orders:owner_orders' if is_owner else 'orders:my_orders'
+        if not cancel_order(order, actor=request.user):
+            if _is_ajax(request):
+                return JsonResponse({'error': 'Order cannot be canceled in its current status.'}, status=400)
+            messages.error(request, f'Order #{order.id} can no longer be canceled.')
+            return redirect(back)
+
+        if _is_ajax(request):
+            return JsonResponse({'id': order.id, 'status': order.status})
+
+        messages.success(request, f'Order #{order.id} canceled.')
+        return redirect(back)
@@ -1,8 +1,8 @@
 """
-Admin registration for the Payment model.
+Admin registration for the Payment and PaymentEvent models.
 """
 from django.contrib import admin  # type: ignore
-from .models import Payment
+from .models import Payment, PaymentEvent
 
 
 @admin.register(Payment)
@@ -10,3 +10,20 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ('id', 'order', 'amount', 'currency', 'provider', 'status', 'created_at')
     list_filter = ('provider', 'status')
     search_fields = ('order__id', 'provider_intent_id')
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    """Webhook events are append-only, so the admin is read-only."""
+    list_display = ('event_id', 'type', 'intent_id', 'received_at', 'processed_at')
+    list_filter = ('type', 'provider')
+    search_fields = ('event_id', 'intent_id')
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        return False
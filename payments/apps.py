@@ -8,3 +8,6 @@ class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payments'
     verbose_name = 'Payments'
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
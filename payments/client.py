@@ -0,0 +1,134 @@
+"""
+Background intent creation for the payments app.
+
+Provider calls run on a small background thread pool. `prepare_intent`
+is scheduled when the payment page first asks for an intent, or as soon
+as an order is placed when ``STRIPE_PREFETCH_INTENTS`` is enabled; in
+the latter case the client secret is usually already stored on the
+`Payment` row and the request makes no network call at all.
+
+Which backend is used is decided by `payments.providers.get_provider`.
+If the configured provider fails after its retries, the payment is
+switched to the in-process fake provider so the simulated payment flow
+keeps working.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings  # type: ignore
+from django.db import close_old_connections  # type: ignore
+from django.db.models import Q  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from orders.models import Order
+from .models import Payment
+from .providers import IntentResult, ProviderError, default_provider_name, get_provider
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_pending: dict[int, Future] = {}
+_pending_lock = threading.Lock()
+
+
+def create_intent(payment: Payment) -> tuple[str, IntentResult]:
+    """
+    Create an intent for ``payment`` and return ``(provider_name, intent)``.
+
+    One provider call: the create response already carries the client
+    secret, so no follow-up retrieve is needed.
+    """
+    try:
+        return payment.provider, get_provider(payment.provider).create_intent(payment)
+    except ProviderError:
+        if payment.provider == Payment.PROVIDER_FAKE:
+            raise
+        # Keep app usable even if Stripe errors out; fall back to the fake provider
+        logger.exception("%s intent creation failed for payment %s", payment.provider, payment.pk)
+        return Payment.PROVIDER_FAKE, get_provider(Payment.PROVIDER_FAKE).create_intent(payment)
+
+
+def _create_and_store(payment_id: int) -> Payment | None:
+    try:
+        payment = Payment.objects.select_related('order').filter(pk=payment_id).first()
+        if payment is None or payment.provider_intent_id:
+            return payment
+        provider, intent = create_intent(payment)
+        # Only the first writer wins if two processes raced on the same payment
+        Payment.objects.filter(
+            Q(provider_intent_id__isnull=True) | Q(provider_intent_id=''), pk=payment_id,
+        ).update(
+            provider=provider,
+            provider_intent_id=intent.id,
+            client_secret=intent.client_secret or '',
+            updated_at=timezone.now(),
+        )
+        payment.refresh_from_db()
+        return payment
+    finally:
+        close_old_connections()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _pending_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PAYMENT_PROVIDER_WORKERS', 4),
+                    thread_name_prefix='payments',
+                )
+    return _executor
+
+
+def prepare_intent(payment_id: int) -> Future:
+    """
+    Schedule intent creation for ``payment_id`` on the background pool.
+
+    Calls for a payment that already has a job in flight share its future.
+    """
+    with _pending_lock:
+        future = _pending.get(payment_id)
+        if future is not None:
+            return future
+    executor = _get_executor()
+    with _pending_lock:
+        future = _pending.get(payment_id)
+        if future is None:
+            future = executor.submit(_create_and_store, payment_id)
+            _pending[payment_id] = future
+            future.add_done_callback(lambda _f: _pending.pop(payment_id, None))
+    return future
+
+
+def get_or_create_payment(order: Order) -> Payment:
+    payment, _ = Payment.objects.get_or_create(
+        order=order,
+        defaults={
+            "amount": Decimal(order.total),
+            "currency": "usd",
+            "provider": default_provider_name(),
+        },
+    )
+    return payment
+
+
+def _prefetch(order_id: int) -> None:
+    try:
+        order = Order.objects.filter(pk=order_id).first()
+        if order is not None:
+            prepare_intent(get_or_create_payment(order).pk)
+    finally:
+        close_old_connections()
+
+
+def prefetch_for_order(order_id: int) -> Future:
+    """
+    Create the order's Payment row and start intent creation, all on the
+    background pool so the checkout request does no extra work.
+    """
+    return _get_executor().submit(_prefetch, order_id)
@@ -0,0 +1,155 @@
+"""
+A local stand-in for the Stripe PaymentIntents API.
+
+`FakeStripeServer` speaks just enough of the REST API used by
+`payments.providers.StripeProvider` (create, retrieve and confirm
+PaymentIntents, with ``Idempotency-Key`` support) to run the payment
+flow without network access. Latency and the share of failing requests are configurable so
+timeouts and retries can be exercised and benchmarked offline::
+
+    python manage.py fake_stripe --port 12111 --latency-ms 150 --failure-rate 0.05
+    STRIPE_API_BASE=http://127.0.0.1:12111 python manage.py runserver
+"""
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+_INTENT_PATH = re.compile(r'^/v1/payment_intents/(?P<id>[\w-]+)(?P<confirm>/confirm)?$')
+
+
+class FakeStripeServer:
+    """Threaded HTTP server imitating ``/v1/payment_intents``."""
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        *,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests_served = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._intents: dict[str, dict] = {}
+        self._idempotent: dict[str, dict] = {}
+        self._thread: threading.Thread | None = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeStripeServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-stripe', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # -- request handling ---------------------------------------------------
+
+    def _roll(self) -> tuple[float, bool]:
+        with self._lock:
+            self.requests_served += 1
+            jitter = self._random.uniform(0.5, 1.5) if self.latency else 0.0
+            return self.latency * jitter, self._random.random() < self.failure_rate
+
+    def _create(self, form: dict[str, str]) -> dict:
+        intent_id = f'pi_fake_{uuid.uuid4().hex[:24]}'
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(form.get('amount', 0)),
+            'currency': form.get('currency', 'usd'),
+            'status': 'requires_payment_method',
+            'client_secret': f'{intent_id}_secret_{uuid.uuid4().hex[:16]}',
+            'metadata': {
+                key[len('metadata['):-1]: value
+                for key, value in form.items() if key.startswith('metadata[')
+            },
+        }
+        self._intents[intent_id] = intent
+        return intent
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # noqa: A002 - silence default stderr logging
+                pass
+
+            def _reply(self, status: int, body: dict, headers: dict[str, str] | None = None) -> None:
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _simulate(self) -> bool:
+                delay, fail = server._roll()
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    self._reply(
+                        500,
+                        {'error': {'type': 'api_error', 'message': 'Simulated failure.'}},
+                        {'Stripe-Should-Retry': 'true'},
+                    )
+                return fail
+
+            def do_GET(self):
+                if self._simulate():
+                    return
+                match = _INTENT_PATH.match(self.path)
+                intent = server._intents.get(match.group('id')) if match else None
+                if intent is None:
+                    self._reply(404, {'error': {'type': 'invalid_request_error', 'message': 'No such payment_intent.'}})
+                else:
+                    self._reply(200, intent)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = dict(parse_qsl(self.rfile.read(length).decode('utf-8')))
+                if self._simulate():
+                    return
+
+                key = self.headers.get('Idempotency-Key')
+                with server._lock:
+                    if key and key in server._idempotent:
+                        self._reply(200, server._idempotent[key], {'Idempotent-Replayed': 'true'})
+                        return
+                    if self.path == '/v1/payment_intents':
+                        body = server._create(form)
+                    else:
+                        match = _INTENT_PATH.match(self.path)
+                        body = server._intents.get(match.group('id')) if match and match.group('confirm') else None
+                        if body is None:
+                            self._reply(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown endpoint.'}})
+                            return
+                        body['status'] = 'succeeded'
+                    if key:
+                        server._idempotent[key] = body
+                self._reply(200, body)
+
+        return Handler
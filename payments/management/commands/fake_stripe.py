@@ -0,0 +1,91 @@
+"""
+Run the local fake Stripe server, or benchmark the Stripe client against it.
+
+Usage:
+    python manage.py fake_stripe [--port 12111] [--latency-ms 0] [--failure-rate 0]
+    python manage.py fake_stripe --bench 500 [--concurrency 8] [--latency-ms 100] [--failure-rate 0.05]
+
+In serve mode, export ``STRIPE_API_BASE=http://127.0.0.1:<port>`` for the
+Django process to send all PaymentIntent calls to the fake. In bench mode
+the server runs on an ephemeral port and ``--bench`` intents are created
+through `payments.providers.stripe_provider.build_client` (same timeout
+and retry settings as production), reporting latency percentiles and
+failures after retries.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.providers import stripe_provider
+from payments.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = "Run a local fake Stripe API (or benchmark the Stripe client against it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean latency per request.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of requests answered with 500.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--bench', type=int, default=0, help='Create this many intents and report latency.')
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(
+            port=0 if options['bench'] else options['port'],
+            latency=options['latency_ms'] / 1000,
+            failure_rate=options['failure_rate'],
+            seed=options['seed'],
+        )
+        if not options['bench']:
+            self.stdout.write(f"Fake Stripe listening on {server.url} (Ctrl+C to stop)")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.stop()
+            return
+
+        if stripe_provider.stripe is None:
+            raise CommandError("The stripe package is not installed.")
+        server.start()
+        try:
+            self._bench(server, options['bench'], options['concurrency'])
+        finally:
+            server.stop()
+
+    def _bench(self, server: FakeStripeServer, total: int, concurrency: int) -> None:
+        client = stripe_provider.build_client(api_base=server.url)
+        intents = stripe_provider.payment_intents(client)
+
+        def create(i: int) -> tuple[float, bool]:
+            started = time.perf_counter()
+            try:
+                intents.create(
+                    params={'amount': 1000, 'currency': 'usd', 'metadata': {'bench': i}},
+                    options={'idempotency_key': f'bench-{i}'},
+                )
+                ok = True
+            except Exception:
+                ok = False
+            return (time.perf_counter() - started) * 1000, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(create, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(ms for ms, _ in results)
+        failures = sum(1 for _, ok in results if not ok)
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        self.stdout.write(
+            f"{total} intents in {elapsed:.2f}s ({total / elapsed:.0f}/s), "
+            f"p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms, "
+            f"failed after retries={failures}, HTTP requests={server.requests_served}"
+        )
@@ -0,0 +1,84 @@
+"""
+Load test for the checkout → pay → confirm flow against the fake provider.
+
+Usage:
+    python manage.py loadtest_payments [--orders 2000] [--latency-ms 0] [--failure-rate 0.1] [--seed 0]
+
+Each synthetic order is placed with `orders.services.place_order`, paid
+through an in-process `FakeProvider` (no network) and its outcome applied
+with `payments.services.apply_intent_status`, i.e. exactly the code paths
+used by the web views. Prints throughput and the resulting payment/order
+status counts; all rows created by the run are removed afterwards.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from accounts.models import User
+from orders.cart import resolve_cart
+from orders.models import Order
+from orders.services import place_order
+from payments.client import get_or_create_payment
+from payments.models import Payment
+from payments.providers import FakeProvider
+from payments.services import apply_intent_status
+from restaurants.models import Restaurant, Product
+
+
+class Command(BaseCommand):
+    help = "Run checkout → pay → confirm against the in-process fake payment provider."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Fake provider latency per call.')
+        parser.add_argument('--failure-rate', type=float, default=0.1, help='Share of declined payments.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    @override_settings(STRIPE_PREFETCH_INTENTS=False)
+    def handle(self, *args, **options):
+        provider = FakeProvider(
+            latency=options['latency_ms'] / 1000,
+            failure_rate=options['failure_rate'],
+            seed=options['seed'],
+        )
+        total: int = options['orders']
+
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(username=f'load-owner-{tag}', role=User.ROLE_OWNER)
+        customer = User.objects.create_user(username=f'load-customer-{tag}')
+        try:
+            restaurant = Restaurant.objects.create(name=f'Load {tag}', owner=owner)
+            products = Product.objects.bulk_create([
+                Product(restaurant=restaurant, name=f'Item {i}', price=Decimal('6.00'), quantity=10 ** 7)
+                for i in range(3)
+            ])
+            cart = resolve_cart({str(p.pk): 1 for p in products})
+
+            started = time.perf_counter()
+            for _ in range(total):
+                order = place_order(user=customer, cart=cart, delivery_address='Skopje')
+                payment = get_or_create_payment(order)
+                intent = provider.create_intent(payment)
+                Payment.objects.filter(pk=payment.pk).update(
+                    provider=provider.name, provider_intent_id=intent.id,
+                )
+                result = provider.confirm_intent(intent.id)
+                apply_intent_status(payment, result.payment_status)
+            elapsed = time.perf_counter() - started
+
+            payments = Counter(Payment.objects.filter(order__user=customer).values_list('status', flat=True))
+            orders = Counter(Order.objects.filter(user=customer).values_list('status', flat=True))
+            self.stdout.write(
+                f"{total} orders in {elapsed:.2f}s ({total / elapsed * 60:.0f} orders/min)\n"
+                f"  payments: {dict(payments)}\n"
+                f"  orders:   {dict(orders)}"
+            )
+        finally:
+            customer.delete()
+            owner.delete()
@@ -0,0 +1,42 @@
+"""
+Apply stored webhook events to payments and orders.
+
+Usage:
+    python manage.py process_payment_events [--batch-size 500] [--loop] [--interval 1.0]
+
+Without ``--loop`` the queue is drained once and the command exits; with
+``--loop`` it keeps polling, sleeping ``--interval`` seconds whenever the
+queue is empty.
+"""
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply unprocessed payment webhook events in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Idle sleep between polls (seconds).')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = process_pending_events(options['batch_size'])
+                total += processed
+                if processed:
+                    self.stdout.write(f"Applied {processed} event(s)")
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} event(s) processed."))
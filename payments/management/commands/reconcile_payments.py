@@ -0,0 +1,86 @@
+"""
+Reconcile local payments and orders with the payment provider.
+
+Usage:
+    python manage.py reconcile_payments [--chunk-size 500] [--concurrency 8]
+                                        [--checkpoint reconcile.json] [--reset]
+                                        [--min-age 15] [--dry-run]
+
+Payments are scanned in ``(created_at, id)`` chunks (see
+`payments.reconcile`). Within a chunk, open payments are looked up on the
+provider ``--concurrency`` at a time and all fixes are applied in bulk.
+
+With ``--checkpoint`` the cursor is written to that file after every
+chunk, and a later run resumes from it. The file is removed once the scan
+reaches the end, so the next run starts from the beginning again.
+Payments younger than ``--min-age`` minutes are skipped, as they are
+usually still being paid.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments.reconcile import ChunkResult, Cursor, iter_payment_chunks, reconcile_chunk
+
+
+class Command(BaseCommand):
+    help = "Find payments stuck in an open state (or orders stuck behind final payments) and fix them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8, help='Parallel provider lookups.')
+        parser.add_argument('--checkpoint', help='JSON file used to persist and resume the scan position.')
+        parser.add_argument('--reset', action='store_true', help='Ignore an existing checkpoint.')
+        parser.add_argument('--min-age', type=float, default=15.0, help='Skip payments younger than this (minutes).')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing.')
+
+    def handle(self, *args, **options):
+        checkpoint = Path(options['checkpoint']) if options['checkpoint'] else None
+        cursor = None
+        if checkpoint and checkpoint.exists() and not options['reset']:
+            try:
+                cursor = Cursor.from_json(json.loads(checkpoint.read_text()))
+            except (ValueError, KeyError) as exc:
+                raise CommandError(f"Unreadable checkpoint {checkpoint}: {exc}")
+            self.stdout.write(f"Resuming after payment #{cursor.id} ({cursor.created_at.isoformat()})")
+
+        created_before = timezone.now() - timedelta(minutes=options['min_age'])
+        totals = ChunkResult()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='reconcile') as pool:
+            for rows in iter_payment_chunks(cursor, options['chunk_size'], created_before):
+                result = reconcile_chunk(rows, pool, dry_run=options['dry_run'])
+                for name in ('scanned', 'looked_up', 'lookup_errors', 'payments_fixed', 'orders_fixed'):
+                    setattr(totals, name, getattr(totals, name) + getattr(result, name))
+                if checkpoint and not options['dry_run']:
+                    self._save(checkpoint, Cursor(rows[-1]['created_at'], rows[-1]['id']))
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f"  up to #{rows[-1]['id']}: {result.payments_fixed} payment(s), "
+                        f"{result.orders_fixed} order(s) fixed"
+                    )
+
+        if checkpoint and checkpoint.exists() and not options['dry_run']:
+            checkpoint.unlink()
+
+        verb = 'would fix' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {totals.scanned} payment(s) in {time.perf_counter() - started:.2f}s, "
+            f"looked up {totals.looked_up} ({totals.lookup_errors} failed); "
+            f"{verb} {totals.payments_fixed} payment(s) and {totals.orders_fixed} order(s)."
+        ))
+
+    @staticmethod
+    def _save(path: Path, cursor: Cursor) -> None:
+        # Write-then-rename so an interrupted run never leaves a truncated checkpoint
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(cursor.to_json()))
+        os.replace(tmp, path)
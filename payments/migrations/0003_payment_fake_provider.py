@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_client_secret'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='provider',
+            field=models.CharField(choices=[('stripe', 'Stripe'), ('fake', 'Fake (in-process)')], default='stripe', max_length=20),
+        ),
+    ]
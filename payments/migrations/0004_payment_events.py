@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_fake_provider'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='provider_intent_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(help_text='Provider event id (deduplication key)', max_length=255, unique=True)),
+                ('provider', models.CharField(choices=[('stripe', 'Stripe'), ('fake', 'Fake (in-process)')], default='stripe', max_length=20)),
+                ('type', models.CharField(max_length=100)),
+                ('intent_id', models.CharField(blank=True, help_text='PaymentIntent the event refers to', max_length=255)),
+                ('payload', models.JSONField()),
+                ('provider_created', models.DateTimeField(blank=True, help_text='When the provider emitted the event', null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='paymentevent_unprocessed_idx')],
+            },
+        ),
+    ]
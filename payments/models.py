@@ -5,6 +5,9 @@ Defines the `Payment` model which records payment attempts for orders.
 The payment provider and status fields mirror those in the original
 project. Amount and currency are stored redundantly to capture the
 price at time of payment.
+
+`PaymentEvent` is the append-only log of provider webhook events; rows
+are inserted once per provider event id and only ever marked processed.
 """
 from __future__ import annotations
 
@@ -15,8 +18,10 @@ from orders.models import Order
 
 class Payment(models.Model):
     PROVIDER_STRIPE = 'stripe'
+    PROVIDER_FAKE = 'fake'
     PROVIDER_CHOICES = [
         (PROVIDER_STRIPE, 'Stripe'),
+        (PROVIDER_FAKE, 'Fake (in-process)'),
     ]
 
     STATUS_REQUIRES_ACTION = 'requires_action'
@@ -35,12 +40,46 @@ class Payment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_REQUIRES_ACTION)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=10, default='usd')
-    provider_intent_id = models.CharField(max_length=255, blank=True, null=True)
+    provider_intent_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    client_secret = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text='Client secret returned when the provider intent was created.',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset scans by (created_at, id), e.g. reconcile_payments
+            models.Index(fields=['created_at', 'id'], name='payment_created_id_idx'),
+        ]
 
     def __str__(self) -> str:  # type: ignore[override]
         return f"Payment #{self.pk} for Order #{self.order_id}" if self.pk else 'Unsaved Payment'
+
+
+class PaymentEvent(models.Model):
+    event_id = models.CharField(max_length=255, unique=True, help_text='Provider event id (deduplication key)')
+    provider = models.CharField(max_length=20, choices=Payment.PROVIDER_CHOICES, default=Payment.PROVIDER_STRIPE)
+    type = models.CharField(max_length=100)
+    intent_id = models.CharField(max_length=255, blank=True, help_text='PaymentIntent the event refers to')
+    payload = models.JSONField()
+    provider_created = models.DateTimeField(null=True, blank=True, help_text='When the provider emitted the event')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='paymentevent_unprocessed_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"{self.type} ({self.event_id})"
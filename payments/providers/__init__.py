@@ -0,0 +1,54 @@
+"""
+Payment providers.
+
+`get_provider` returns the process-wide backend for a `Payment.provider`
+value. Without an explicit name it picks ``PAYMENT_PROVIDER`` from
+settings, falling back to the fake backend when Stripe is not installed
+or configured.
+"""
+from __future__ import annotations
+
+import threading
+
+from django.conf import settings  # type: ignore
+
+from ..models import Payment
+from .base import IntentResult, PaymentProvider, ProviderError, payment_status
+from .fake import FakeProvider
+from .stripe_provider import StripeProvider, stripe_enabled
+
+__all__ = [
+    'FakeProvider',
+    'IntentResult',
+    'PaymentProvider',
+    'ProviderError',
+    'StripeProvider',
+    'default_provider_name',
+    'get_provider',
+    'payment_status',
+]
+
+_PROVIDER_CLASSES: dict[str, type[PaymentProvider]] = {
+    Payment.PROVIDER_STRIPE: StripeProvider,
+    Payment.PROVIDER_FAKE: FakeProvider,
+}
+_instances: dict[str, PaymentProvider] = {}
+_lock = threading.Lock()
+
+
+def default_provider_name() -> str:
+    name = getattr(settings, 'PAYMENT_PROVIDER', Payment.PROVIDER_STRIPE)
+    if name == Payment.PROVIDER_STRIPE and not stripe_enabled():
+        return Payment.PROVIDER_FAKE
+    return name
+
+
+def get_provider(name: str | None = None) -> PaymentProvider:
+    name = name or default_provider_name()
+    provider = _instances.get(name)
+    if provider is None:
+        with _lock:
+            provider = _instances.get(name)
+            if provider is None:
+                provider = _instances[name] = _PROVIDER_CLASSES[name]()
+    return provider
@@ -0,0 +1,64 @@
+"""
+Provider interface for the payments app.
+
+Every payment backend (Stripe, the in-process fake used for load tests)
+implements `PaymentProvider`. Provider-specific intent statuses are
+translated into `Payment` statuses in one place, `payment_status`, so
+views, webhooks and reconciliation all apply the same transitions.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from ..models import Payment
+
+# Stripe's PaymentIntent statuses (the fake provider uses the same vocabulary)
+INTENT_STATUS_MAP: dict[str, str] = {
+    'requires_payment_method': Payment.STATUS_REQUIRES_ACTION,
+    'requires_confirmation': Payment.STATUS_REQUIRES_ACTION,
+    'requires_action': Payment.STATUS_REQUIRES_ACTION,
+    'processing': Payment.STATUS_REQUIRES_ACTION,
+    'requires_capture': Payment.STATUS_AUTHORIZED,
+    'succeeded': Payment.STATUS_CAPTURED,
+    'canceled': Payment.STATUS_FAILED,
+}
+
+
+def payment_status(intent_status: str) -> str:
+    """Map a provider intent status onto `Payment.STATUS_CHOICES`."""
+    return INTENT_STATUS_MAP.get(intent_status, Payment.STATUS_REQUIRES_ACTION)
+
+
+class ProviderError(Exception):
+    """Raised when a provider call fails after its retries."""
+
+
+@dataclass(frozen=True)
+class IntentResult:
+    id: str
+    status: str
+    client_secret: str | None = None
+
+    @property
+    def payment_status(self) -> str:
+        return payment_status(self.status)
+
+
+class PaymentProvider(ABC):
+    """A payment backend able to create, look up and confirm intents."""
+
+    #: Value stored in `Payment.provider`
+    name: str
+
+    @abstractmethod
+    def create_intent(self, payment: Payment) -> IntentResult:
+        """Create an intent for ``payment`` (safe to retry for the same payment)."""
+
+    @abstractmethod
+    def retrieve_intent(self, intent_id: str) -> IntentResult:
+        """Return the current state of an existing intent."""
+
+    @abstractmethod
+    def confirm_intent(self, intent_id: str) -> IntentResult:
+        """Confirm an intent server-side (used by simulations and load tests)."""
@@ -0,0 +1,75 @@
+"""
+Deterministic in-process payment backend.
+
+Used when Stripe is not configured and for load tests: no network, a
+configurable artificial latency (``PAYMENT_FAKE_LATENCY`` seconds) and a
+configurable share of declined confirmations (``PAYMENT_FAKE_FAILURE_RATE``).
+Whether an intent is declined depends only on its id and
+``PAYMENT_FAKE_SEED``, so repeated runs produce the same outcomes.
+
+The fake keeps no state of its own. Intent ids are derived from the
+payment (``pi_fake_<payment id>``) and an intent's status is read back
+from the `Payment` row that stores it, so every worker, management
+command and restart sees the same intents. Confirming an intent only
+reports the outcome; like a Stripe confirmation it takes effect once the
+caller records it on the payment (`payments.services.apply_intent_status`).
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+
+from django.conf import settings  # type: ignore
+
+from ..models import Payment
+from .base import IntentResult, PaymentProvider, ProviderError
+
+# Payment status -> the intent status the fake reports for it
+_INTENT_STATUS: dict[str, str] = {
+    Payment.STATUS_REQUIRES_ACTION: 'requires_payment_method',
+    Payment.STATUS_AUTHORIZED: 'requires_capture',
+    Payment.STATUS_CAPTURED: 'succeeded',
+    Payment.STATUS_FAILED: 'canceled',
+}
+
+
+class FakeProvider(PaymentProvider):
+    name = Payment.PROVIDER_FAKE
+
+    def __init__(self, *, latency: float | None = None, failure_rate: float | None = None, seed: int | None = None) -> None:
+        self.latency = getattr(settings, 'PAYMENT_FAKE_LATENCY', 0.0) if latency is None else latency
+        self.failure_rate = getattr(settings, 'PAYMENT_FAKE_FAILURE_RATE', 0.0) if failure_rate is None else failure_rate
+        self.seed = getattr(settings, 'PAYMENT_FAKE_SEED', 0) if seed is None else seed
+
+    def _sleep(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def declines(self, intent_id: str) -> bool:
+        digest = hashlib.sha256(f'{self.seed}:{intent_id}'.encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF < self.failure_rate
+
+    def _stored_status(self, intent_id: str) -> str:
+        status = (
+            Payment.objects.filter(provider_intent_id=intent_id)
+            .values_list('status', flat=True).first()
+        )
+        if status is None:
+            raise ProviderError(f'No such payment_intent: {intent_id}')
+        return _INTENT_STATUS.get(status, 'requires_payment_method')
+
+    def create_intent(self, payment: Payment) -> IntentResult:
+        self._sleep()
+        # The fake has no client-side confirmation, so no client secret is issued
+        return IntentResult(id=f'pi_fake_{payment.pk}', status=_INTENT_STATUS.get(payment.status, 'requires_payment_method'))
+
+    def retrieve_intent(self, intent_id: str) -> IntentResult:
+        self._sleep()
+        return IntentResult(id=intent_id, status=self._stored_status(intent_id))
+
+    def confirm_intent(self, intent_id: str) -> IntentResult:
+        self._sleep()
+        status = self._stored_status(intent_id)
+        if status in ('succeeded', 'canceled'):
+            return IntentResult(id=intent_id, status=status)  # already final
+        return IntentResult(id=intent_id, status='canceled' if self.declines(intent_id) else 'succeeded')
@@ -0,0 +1,96 @@
+"""
+Stripe backend.
+
+A single `stripe.StripeClient` is built lazily per process with its own
+API key (the global ``stripe.api_key`` is never touched), a pooled HTTP
+session, a request timeout and a bounded number of network retries. The
+API host can be pointed at the local fake server (``STRIPE_API_BASE``,
+see `payments.fake_stripe`) for offline tests and benchmarks.
+"""
+from __future__ import annotations
+
+import threading
+from decimal import Decimal
+
+from django.conf import settings  # type: ignore
+
+from ..models import Payment
+from .base import IntentResult, PaymentProvider, ProviderError
+
+try:
+    import stripe  # type: ignore
+except ImportError:
+    stripe = None  # type: ignore
+
+
+def stripe_enabled() -> bool:
+    return stripe is not None and bool(getattr(settings, 'STRIPE_SECRET_KEY', None))
+
+
+def build_client(api_base: str | None = None):
+    """Build a StripeClient with the configured key, timeout and retry budget."""
+    base = api_base or getattr(settings, 'STRIPE_API_BASE', None)
+    return stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        base_addresses={'api': base} if base else None,
+        max_network_retries=getattr(settings, 'STRIPE_MAX_RETRIES', 2),
+        http_client=stripe.RequestsClient(timeout=getattr(settings, 'STRIPE_TIMEOUT', 10)),
+    )
+
+
+def payment_intents(client):
+    # stripe>=12 moved services under the ``v1`` namespace
+    return getattr(client, 'v1', client).payment_intents
+
+
+def _result(intent) -> IntentResult:
+    return IntentResult(id=intent.id, status=intent.status, client_secret=getattr(intent, 'client_secret', None))
+
+
+class StripeProvider(PaymentProvider):
+    name = Payment.PROVIDER_STRIPE
+
+    def __init__(self, api_base: str | None = None) -> None:
+        self._api_base = api_base
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = build_client(self._api_base)
+        return self._client
+
+    def create_intent(self, payment: Payment) -> IntentResult:
+        try:
+            intent = payment_intents(self.client).create(
+                params={
+                    'amount': int(Decimal(payment.amount) * 100),
+                    'currency': payment.currency,
+                    'automatic_payment_methods': {'enabled': True},
+                    'metadata': {
+                        'order_id': payment.order_id,
+                        'user_id': payment.order.user_id,
+                        'payment_id': payment.pk,
+                    },
+                },
+                # Stripe collapses concurrent creates for the same payment
+                options={'idempotency_key': f"payment-{payment.pk}-intent"},
+            )
+        except Exception as exc:
+            raise ProviderError(str(exc)) from exc
+        return _result(intent)
+
+    def retrieve_intent(self, intent_id: str) -> IntentResult:
+        try:
+            return _result(payment_intents(self.client).retrieve(intent_id))
+        except Exception as exc:
+            raise ProviderError(str(exc)) from exc
+
+    def confirm_intent(self, intent_id: str) -> IntentResult:
+        try:
+            return _result(payment_intents(self.client).confirm(intent_id))
+        except Exception as exc:
+            raise ProviderError(str(exc)) from exc
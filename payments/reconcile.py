@@ -0,0 +1,126 @@
+"""
+Payment reconciliation.
+
+Finds payments whose local state drifted from the provider and repairs
+them with the same transitions used everywhere else
+(`payments.services`):
+
+- open payments (``requires_action`` / ``authorized``) with a provider
+  intent are looked up and their real outcome is applied in bulk;
+- final payments whose order never followed (e.g. ``captured`` but the
+  order still ``placed``) get the order transition re-applied.
+
+`Payment` is walked in keyset order on ``(created_at, id)`` so every chunk
+is one indexed range query and memory stays flat however many rows there
+are. The position after each chunk is a `Cursor` that callers can persist
+to resume an interrupted run (see ``manage.py reconcile_payments``).
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, NamedTuple
+
+from django.db.models import Q  # type: ignore
+
+from orders.models import Order
+from .models import Payment
+from .providers import ProviderError, get_provider
+from .services import OPEN_STATUSES, apply_intent_statuses, sync_orders
+
+# Order statuses that still expect a payment outcome
+_AWAITING_ORDER_STATUSES = (Order.STATUS_PLACED, Order.STATUS_PENDING)
+
+_CHUNK_FIELDS = ('id', 'created_at', 'status', 'provider', 'provider_intent_id', 'order_id', 'order__status')
+
+
+class Cursor(NamedTuple):
+    created_at: datetime
+    id: int
+
+    def to_json(self) -> dict:
+        return {'created_at': self.created_at.isoformat(), 'id': self.id}
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Cursor':
+        return cls(datetime.fromisoformat(data['created_at']), int(data['id']))
+
+
+@dataclass
+class ChunkResult:
+    scanned: int = 0
+    looked_up: int = 0
+    lookup_errors: int = 0
+    payments_fixed: int = 0
+    orders_fixed: int = 0
+    # Intent id → Payment status the provider reports (filled on dry runs too)
+    outcomes: dict[str, str] = field(default_factory=dict)
+
+
+def iter_payment_chunks(
+    after: Cursor | None = None,
+    chunk_size: int = 500,
+    created_before: datetime | None = None,
+) -> Iterator[list[dict]]:
+    """
+    Yield payments as lists of plain dicts in ``(created_at, id)`` order.
+
+    Each chunk is fetched with a fresh ``WHERE (created_at, id) > cursor``
+    query, so rows changed by earlier chunks never shift later ones.
+    """
+    queryset = Payment.objects.order_by('created_at', 'id').values(*_CHUNK_FIELDS)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    while True:
+        page = queryset
+        if after is not None:
+            page = page.filter(
+                Q(created_at__gt=after.created_at) | Q(created_at=after.created_at, id__gt=after.id)
+            )
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        after = Cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+
+def _lookup(row: dict) -> tuple[str, str | None]:
+    intent_id = row['provider_intent_id']
+    try:
+        return intent_id, get_provider(row['provider']).retrieve_intent(intent_id).payment_status
+    except (ProviderError, KeyError):
+        return intent_id, None
+
+
+def reconcile_chunk(rows: list[dict], pool: ThreadPoolExecutor, dry_run: bool = False) -> ChunkResult:
+    """Look up the open payments of one chunk concurrently and apply the fixes in bulk."""
+    result = ChunkResult(scanned=len(rows))
+
+    open_rows = [row for row in rows if row['status'] in OPEN_STATUSES and row['provider_intent_id']]
+    for intent_id, status in pool.map(_lookup, open_rows):
+        result.looked_up += 1
+        if status is None:
+            result.lookup_errors += 1
+        else:
+            result.outcomes[intent_id] = status
+
+    # Orders left behind by payments that were already final
+    stranded: dict[str, list[int]] = defaultdict(list)
+    for row in rows:
+        if row['order__status'] not in _AWAITING_ORDER_STATUSES:
+            continue
+        if row['status'] in (Payment.STATUS_CAPTURED, Payment.STATUS_FAILED):
+            stranded[row['status']].append(row['order_id'])
+
+    if dry_run:
+        current = {row['provider_intent_id']: row['status'] for row in open_rows}
+        result.payments_fixed = sum(1 for i, s in result.outcomes.items() if current.get(i) != s)
+        result.orders_fixed = sum(len(ids) for ids in stranded.values())
+        return result
+
+    result.payments_fixed = apply_intent_statuses(result.outcomes)
+    for status, order_ids in stranded.items():
+        result.orders_fixed += len(sync_orders(status, order_ids))
+    return result
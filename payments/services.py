@@ -0,0 +1,103 @@
+"""
+Payment status transitions.
+
+All code that learns the outcome of a payment (simulation endpoints, the
+load-test harness, webhook processing) goes through `apply_intent_status`
+or its bulk form `apply_intent_statuses`, so `Payment` and `Order` always
+move together:
+
+- captured → the order is confirmed (``placed`` → ``confirmed``)
+- failed   → the order is canceled and its reserved stock released
+
+Each step is a conditional UPDATE on the current status, so applying the
+same outcome twice is a no-op.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Mapping
+
+from django.db import transaction  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from orders.models import Order
+from orders.services import cancel_orders
+from orders.state import transition
+from .models import Payment
+
+# Statuses a payment may move out of; captured and failed are final.
+OPEN_STATUSES = (Payment.STATUS_REQUIRES_ACTION, Payment.STATUS_AUTHORIZED)
+
+
+def sync_orders(status: str, order_ids: list[int]) -> list[int]:
+    """
+    Move the orders of payments in ``status`` to match it; returns the ids changed.
+
+    Safe to call for payments that reached ``status`` long ago, which is how
+    reconciliation repairs orders left behind by an interrupted update.
+    """
+    if status == Payment.STATUS_CAPTURED:
+        return transition('confirm', order_ids)
+    if status == Payment.STATUS_FAILED:
+        return cancel_orders(order_ids)
+    return []
+
+
+def apply_intent_status(payment: Payment, status: str) -> bool:
+    """
+    Move ``payment`` to ``status`` and update its order accordingly.
+
+    Returns ``True`` if the payment changed.
+    """
+    with transaction.atomic():
+        changed = (
+            Payment.objects
+            .filter(pk=payment.pk, status__in=OPEN_STATUSES)
+            .exclude(status=status)
+            .update(status=status, updated_at=timezone.now())
+        )
+        if not changed:
+            return False
+        payment.status = status
+        moved = sync_orders(status, [payment.order_id])
+    if moved and 'order' in payment._state.fields_cache:
+        payment.order.status = Order.STATUS_CONFIRMED if status == Payment.STATUS_CAPTURED else Order.STATUS_CANCELED
+    return True
+
+
+def apply_intent_statuses(outcomes: Mapping[str, str]) -> int:
+    """
+    Bulk form of `apply_intent_status` keyed by ``provider_intent_id``.
+
+    Issues one payment UPDATE (plus the matching order UPDATEs) per target
+    status inside a single transaction. Returns the number of payments
+    that changed.
+    """
+    by_status: dict[str, list[str]] = defaultdict(list)
+    for intent_id, status in outcomes.items():
+        by_status[status].append(intent_id)
+
+    changed = 0
+    with transaction.atomic():
+        for status, intent_ids in by_status.items():
+            payments = (
+                Payment.objects
+                .filter(provider_intent_id__in=intent_ids, status__in=OPEN_STATUSES)
+                .exclude(status=status)
+            )
+            locked = list(payments.select_for_update().values_list('pk', 'order_id'))
+            if not locked:
+                continue
+            changed += Payment.objects.filter(pk__in=[pk for pk, _ in locked]).update(
+                status=status, updated_at=timezone.now(),
+            )
+            sync_orders(status, [order_id for _, order_id in locked])
+    return changed
+
+
+def mark_captured(payment: Payment) -> bool:
+    return apply_intent_status(payment, Payment.STATUS_CAPTURED)
+
+
+def mark_failed(payment: Payment) -> bool:
+    return apply_intent_status(payment, Payment.STATUS_FAILED)
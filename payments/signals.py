@@ -0,0 +1,26 @@
+"""
+Signal handlers for the payments app.
+
+Intents are normally created when the payment page first asks for one
+(see `payments.views.PaymentIntentView`). With ``STRIPE_PREFETCH_INTENTS``
+enabled, placing an order also starts its intent in the background once
+the checkout transaction commits.
+"""
+from __future__ import annotations
+
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models.signals import post_save  # type: ignore
+from django.dispatch import receiver  # type: ignore
+
+from orders.models import Order
+
+
+@receiver(post_save, sender=Order, dispatch_uid='payments_prefetch_intent')
+def prefetch_intent_on_order_placed(sender, instance: Order, created: bool, raw: bool = False, **kwargs) -> None:
+    if not created or raw or not getattr(settings, 'STRIPE_PREFETCH_INTENTS', False):
+        return
+    from .client import prefetch_for_order
+
+    order_id = instance.pk
+    transaction.on_commit(lambda: prefetch_for_order(order_id))
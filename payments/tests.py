@@ -0,0 +1,199 @@
+"""
+Tests for the payments app: intent prefetching, the fake provider and
+webhook ingestion.
+"""
+from __future__ import annotations
+
+import json
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from accounts.models import User
+from orders.models import Order
+from restaurants.models import Restaurant
+from .models import Payment, PaymentEvent
+from .providers import FakeProvider, ProviderError
+from .services import apply_intent_status
+from .webhooks import SignatureError, process_pending_events, sign_payload, verify_signature
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+def make_payment(username: str = 'payer', **fields) -> Payment:
+    owner = User.objects.create_user(username=f'{username}-owner', role=User.ROLE_OWNER)
+    customer = User.objects.create_user(username=username)
+    restaurant = Restaurant.objects.create(name=f'{username} restaurant', owner=owner)
+    order = Order.objects.create(
+        user=customer, restaurant=restaurant, delivery_address='Skopje',
+        subtotal=Decimal('12.00'), total=Decimal('12.00'),
+    )
+    return Payment.objects.create(order=order, amount=order.total, provider=Payment.PROVIDER_FAKE, **fields)
+
+
+class IntentPrefetchTests(TestCase):
+    """Placing an order only starts a provider intent when prefetching is switched on."""
+
+    def test_off_by_default(self):
+        with mock.patch('payments.client.prefetch_for_order') as prefetch, \
+                self.captureOnCommitCallbacks(execute=True):
+            payment = make_payment()
+        prefetch.assert_not_called()
+        self.assertFalse(payment.provider_intent_id)
+
+    @override_settings(STRIPE_PREFETCH_INTENTS=True)
+    def test_opt_in(self):
+        with mock.patch('payments.client.prefetch_for_order') as prefetch, \
+                self.captureOnCommitCallbacks(execute=True):
+            payment = make_payment()
+        prefetch.assert_called_once_with(payment.order_id)
+
+
+class FakeProviderTests(TestCase):
+    """Intents live in the database, so any provider instance (worker, command, restart) sees them."""
+
+    def setUp(self):
+        self.payment = make_payment()
+        intent = FakeProvider().create_intent(self.payment)
+        Payment.objects.filter(pk=self.payment.pk).update(provider_intent_id=intent.id)
+        self.intent_id = intent.id
+
+    def test_deterministic_id(self):
+        self.assertEqual(self.intent_id, f'pi_fake_{self.payment.pk}')
+        self.assertEqual(FakeProvider().create_intent(self.payment).id, self.intent_id)
+
+    def test_other_instance_sees_the_intent(self):
+        other = FakeProvider()
+        self.assertEqual(other.retrieve_intent(self.intent_id).status, 'requires_payment_method')
+        result = other.confirm_intent(self.intent_id)
+        self.assertEqual(result.status, 'succeeded')
+        apply_intent_status(self.payment, result.payment_status)
+        # A fresh instance (another process, or after a restart) reads the recorded outcome
+        self.assertEqual(FakeProvider().retrieve_intent(self.intent_id).payment_status, Payment.STATUS_CAPTURED)
+
+    def test_declines_are_final(self):
+        declining = FakeProvider(failure_rate=1.0)
+        result = declining.confirm_intent(self.intent_id)
+        self.assertEqual(result.status, 'canceled')
+        apply_intent_status(self.payment, result.payment_status)
+        self.assertEqual(FakeProvider(failure_rate=0.0).confirm_intent(self.intent_id).status, 'canceled')
+
+    def test_unknown_intent(self):
+        with self.assertRaises(ProviderError):
+            FakeProvider().retrieve_intent('pi_fake_999999')
+
+
+def make_event(event_id: str, event_type: str, intent_id: str, created: int | None = None) -> bytes:
+    return json.dumps({
+        'id': event_id,
+        'type': event_type,
+        'created': int(time.time()) if created is None else created,
+        'data': {'object': {'id': intent_id, 'object': 'payment_intent'}},
+    }).encode('utf-8')
+
+
+class SignatureTests(SimpleTestCase):
+    """``Stripe-Signature`` checks: HMAC over ``<timestamp>.<payload>`` within the tolerance window."""
+
+    payload = make_event('evt_sig', 'payment_intent.succeeded', 'pi_sig')
+
+    def test_valid(self):
+        verify_signature(self.payload, sign_payload(self.payload, WEBHOOK_SECRET), WEBHOOK_SECRET)
+
+    def test_any_v1_may_match(self):
+        # Stripe sends one v1 per active secret while a secret is being rolled
+        header = sign_payload(self.payload, WEBHOOK_SECRET) + ',v1=' + '0' * 64
+        verify_signature(self.payload, header, WEBHOOK_SECRET)
+
+    def test_bad_signature(self):
+        for header in (
+            sign_payload(self.payload, 'whsec_other'),
+            sign_payload(self.payload + b' ', WEBHOOK_SECRET),
+        ):
+            with self.subTest(header=header), self.assertRaises(SignatureError):
+                verify_signature(self.payload, header, WEBHOOK_SECRET)
+
+    def test_stale_timestamp(self):
+        header = sign_payload(self.payload, WEBHOOK_SECRET, timestamp=int(time.time()) - 301)
+        with self.assertRaises(SignatureError):
+            verify_signature(self.payload, header, WEBHOOK_SECRET, tolerance=300)
+
+    def test_malformed_header(self):
+        for header in ('', 'v1=abc', 't=123', 't=soon,v1=abc'):
+            with self.subTest(header=header), self.assertRaises(SignatureError):
+                verify_signature(self.payload, header, WEBHOOK_SECRET)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class WebhookTests(TestCase):
+    """Deliveries are stored once per event id, then applied in batches by `process_pending_events`."""
+
+    def _deliver(self, payload: bytes, header: str | None = None):
+        return self.client.post(
+            reverse('payments:stripe_webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, WEBHOOK_SECRET) if header is None else header,
+        )
+
+    def _payment(self, username: str, intent_id: str) -> Payment:
+        return make_payment(username, provider_intent_id=intent_id)
+
+    def test_rejected_signature_is_not_stored(self):
+        payload = make_event('evt_bad', 'payment_intent.succeeded', 'pi_bad')
+        response = self._deliver(payload, sign_payload(payload, 'whsec_other'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_duplicate_event_id(self):
+        payload = make_event('evt_dup', 'payment_intent.succeeded', 'pi_dup')
+        self.assertEqual(self._deliver(payload).json(), {'received': True, 'duplicate': False})
+        self.assertEqual(self._deliver(payload).json(), {'received': True, 'duplicate': True})
+        self.assertEqual(PaymentEvent.objects.filter(event_id='evt_dup').count(), 1)
+
+    def test_batch(self):
+        now = int(time.time())
+        succeeded = self._payment('succeeded', 'pi_succeeded')
+        retried = self._payment('retried', 'pi_retried')
+        canceled = self._payment('canceled', 'pi_canceled')
+        for payload in (
+            make_event('evt_1', 'payment_intent.succeeded', 'pi_succeeded', now - 20),
+            # Older success already final: a later card decline does not undo it
+            make_event('evt_2', 'payment_intent.payment_failed', 'pi_succeeded', now - 10),
+            make_event('evt_3', 'payment_intent.payment_failed', 'pi_retried', now - 10),
+            make_event('evt_4', 'payment_intent.canceled', 'pi_canceled', now - 10),
+            make_event('evt_5', 'payment_intent.succeeded', 'pi_not_stored_yet', now - 10),
+        ):
+            self.assertEqual(self._deliver(payload).status_code, 200)
+
+        self.assertEqual(process_pending_events(), 4)
+        statuses = {
+            payment.pk: (payment.status, payment.order.status)
+            for payment in Payment.objects.select_related('order')
+        }
+        self.assertEqual(statuses, {
+            succeeded.pk: (Payment.STATUS_CAPTURED, Order.STATUS_CONFIRMED),
+            # payment_failed leaves the intent open for another card
+            retried.pk: (Payment.STATUS_REQUIRES_ACTION, Order.STATUS_PLACED),
+            canceled.pk: (Payment.STATUS_FAILED, Order.STATUS_CANCELED),
+        })
+
+        # The event for an intent no payment carries yet stays queued until one does
+        self.assertEqual(process_pending_events(), 0)
+        queued = PaymentEvent.objects.filter(processed_at__isnull=True).values_list('event_id', flat=True)
+        self.assertEqual(list(queued), ['evt_5'])
+        late = self._payment('late', 'pi_not_stored_yet')
+        self.assertEqual(process_pending_events(), 1)
+        late.refresh_from_db()
+        self.assertEqual(late.status, Payment.STATUS_CAPTURED)
+
+    def test_retry_after_failed_card(self):
+        now = int(time.time())
+        payment = self._payment('retry', 'pi_retry')
+        self._deliver(make_event('evt_fail', 'payment_intent.payment_failed', 'pi_retry', now - 20))
+        process_pending_events()
+        self._deliver(make_event('evt_ok', 'payment_intent.succeeded', 'pi_retry', now - 10))
+        process_pending_events()
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_CAPTURED)
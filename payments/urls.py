@@ -3,10 +3,16 @@ URL configuration for the payments app.
 
 These endpoints return JSON responses intended for consumption by
 JavaScript (AJAX) clients. They are not designed for direct access
-via the browser.
+via the browser. ``webhooks/stripe/`` is called by Stripe itself.
 """
 from django.urls import path  # type: ignore
-from .views import PaymentIntentView, PaymentGetView, PaymentSimulateSuccessView, PaymentSimulateFailureView
+from .views import (
+    PaymentIntentView,
+    PaymentGetView,
+    PaymentSimulateSuccessView,
+    PaymentSimulateFailureView,
+    StripeWebhookView,
+)
 
 app_name = 'payments'
 
@@ -15,4 +21,5 @@ urlpatterns = [
     path('<int:payment_id>/', PaymentGetView.as_view(), name='get'),
     path('<int:payment_id>/simulate-success/', PaymentSimulateSuccessView.as_view(), name='simulate_success'),
     path('<int:payment_id>/simulate-failure/', PaymentSimulateFailureView.as_view(), name='simulate_failure'),
+    path('webhooks/stripe/', StripeWebhookView.as_view(), name='stripe_webhook'),
 ]
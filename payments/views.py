@@ -9,8 +9,7 @@ front-end application.
 """
 from __future__ import annotations
 
-import uuid
-from decimal import Decimal
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 from django.conf import settings  # type: ignore
 from django.contrib.auth.mixins import LoginRequiredMixin  # type: ignore
@@ -21,84 +20,81 @@ from django.http import (
     HttpResponseBadRequest,
     HttpResponseNotAllowed,
 )  # type: ignore
+from django.db import transaction  # type: ignore
 from django.shortcuts import get_object_or_404  # type: ignore
 from django.utils.decorators import method_decorator  # type: ignore
 from django.views import View  # type: ignore
+from django.views.decorators.csrf import csrf_exempt  # type: ignore
 from django.views.decorators.http import require_POST  # type: ignore
 
+from core.conditional import Validators, conditional
+from core.idempotency import idempotent
 from orders.models import Order
+from .client import get_or_create_payment, prepare_intent
 from .models import Payment
-
-try:
-    import stripe  # type: ignore
-except ImportError:
-    stripe = None  # type: ignore
-
-
-def _status_val(model_cls, fallback: str) -> str:
-    """Return a status constant if it exists on the model, otherwise fallback."""
-    return getattr(model_cls, f"STATUS_{fallback.upper()}", fallback)
+from .services import mark_captured, mark_failed
+from .webhooks import SignatureError, record_event
 
 
 class PaymentIntentView(LoginRequiredMixin, View):
     """
     Create or update a PaymentIntent for a given order. Returns JSON with
     the Payment ID, client secret (if available) and other details.
+
+    The provider call runs on the background pool in `payments.client`
+    (already started when the order was placed if ``STRIPE_PREFETCH_INTENTS``
+    is on, otherwise by the first call here). The request waits
+    at most ``STRIPE_INTENT_WAIT`` seconds; if the intent is still being
+    created it answers ``202`` with ``pending: true`` and the page polls
+    `PaymentGetView` for the client secret.
+
+    Retries carrying the same ``Idempotency-Key`` replay the first response.
     """
 
+    @idempotent
     def post(self, request: HttpRequest, order_id: int) -> HttpResponse:
-        order = get_object_or_404(Order, pk=order_id, user=request.user)
-
-        payment, created = Payment.objects.get_or_create(
-            order=order,
-            defaults={"amount": Decimal(order.total), "currency": "usd"},
-        )
-        payment.amount = Decimal(order.total)
-        payment.currency = "usd"
-
-        client_secret = None
-        # Use Stripe when available and API key configured
-        if stripe is not None and getattr(settings, 'STRIPE_SECRET_KEY', None):
+        with transaction.atomic():
+            # Lock the order so concurrent requests cannot create two Payment rows
+            order = get_object_or_404(Order.objects.select_for_update(), pk=order_id, user=request.user)
+            payment = get_or_create_payment(order)
+
+        if not payment.provider_intent_id:
             try:
-                stripe.api_key = settings.STRIPE_SECRET_KEY
-                amount_cents = int(payment.amount * 100)
-
-                if not payment.provider_intent_id:
-                    intent = stripe.PaymentIntent.create(
-                        amount=amount_cents,
-                        currency=payment.currency,
-                        automatic_payment_methods={'enabled': True},
-                        metadata={'order_id': order.id, 'user_id': request.user.id},
-                    )
-                    payment.provider_intent_id = intent.get('id')
-
-                if payment.provider_intent_id:
-                    intent = stripe.PaymentIntent.retrieve(payment.provider_intent_id)
-                    client_secret = intent.client_secret
-            except Exception:
-                # Keep app usable even if Stripe errors out; fall back to fake id
-                if not payment.provider_intent_id:
-                    payment.provider_intent_id = f"pi_{uuid.uuid4().hex}"
-        else:
-            # Stripe not installed/configured: fall back to fake intent id
-            if not payment.provider_intent_id:
-                payment.provider_intent_id = f"pi_{uuid.uuid4().hex}"
-
-        # Move payment into "requires action" state; UI will confirm via Stripe or simulate
-        payment.status = _status_val(Payment, "requires_action")
-        payment.save()
+                payment = prepare_intent(payment.pk).result(
+                    timeout=getattr(settings, 'STRIPE_INTENT_WAIT', 2.0)
+                ) or payment
+            except FutureTimeoutError:
+                pass
 
+        pending = not payment.provider_intent_id
         return JsonResponse({
             'id': payment.id,
-            'client_secret': client_secret,
-            'provider': getattr(payment, "provider", "stripe"),
+            'client_secret': payment.client_secret or None,
+            'provider': payment.provider,
             'status': payment.status,
-        })
+            'pending': pending,
+        }, status=202 if pending else 200)
+
+
+def _payment_validators(request: HttpRequest, payment_id: int) -> Validators | None:
+    if not request.user.is_authenticated:
+        return None
+    updated_at = (
+        Payment.objects.filter(pk=payment_id, order__user=request.user)
+        .values_list('updated_at', flat=True)
+        .first()
+    )
+    return Validators((payment_id, updated_at), updated_at) if updated_at else None
 
 
 class PaymentGetView(LoginRequiredMixin, View):
-    """Return current payment details as JSON."""
+    """
+    Return current payment details as JSON.
 
+    The payment page polls this view; unchanged payments answer ``304``.
+    """
+
+    @conditional(_payment_validators)
     def get(self, request: HttpRequest, payment_id: int) -> HttpResponse:
         payment = get_object_or_404(Payment, pk=payment_id, order__user=request.user)
         return JsonResponse({
@@ -108,26 +104,44 @@ class PaymentGetView(LoginRequiredMixin, View):
             "currency": payment.currency,
             "status": payment.status,
             "provider_intent_id": payment.provider_intent_id,
+            "client_secret": payment.client_secret or None,
         })
 
 
 @method_decorator(require_POST, name="post")
 class PaymentSimulateSuccessView(LoginRequiredMixin, View):
-    """Dev helper: mark payment as succeeded (used when Stripe isn’t configured)."""
+    """Dev helper: capture the payment and confirm its order (used when Stripe isn’t configured)."""
 
     def post(self, request: HttpRequest, payment_id: int) -> HttpResponse:
-        payment = get_object_or_404(Payment, pk=payment_id, order__user=request.user)
-        payment.status = _status_val(Payment, "succeeded")
-        payment.save()
-        return JsonResponse({"ok": True, "status": payment.status})
+        payment = get_object_or_404(Payment.objects.select_related('order'), pk=payment_id, order__user=request.user)
+        mark_captured(payment)
+        return JsonResponse({"ok": True, "status": payment.status, "order_status": payment.order.status})
 
 
 @method_decorator(require_POST, name="post")
 class PaymentSimulateFailureView(LoginRequiredMixin, View):
-    """Dev helper: mark payment as failed."""
+    """Dev helper: mark payment as failed, cancel the order and release its reserved stock."""
 
     def post(self, request: HttpRequest, payment_id: int) -> HttpResponse:
-        payment = get_object_or_404(Payment, pk=payment_id, order__user=request.user)
-        payment.status = _status_val(Payment, "failed")
-        payment.save()
+        payment = get_object_or_404(Payment.objects.select_related('order'), pk=payment_id, order__user=request.user)
+        mark_failed(payment)
         return JsonResponse({"ok": True, "status": payment.status})
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class StripeWebhookView(View):
+    """
+    Receive Stripe webhook deliveries. The event is only verified and
+    stored here; ``manage.py process_payment_events`` applies it.
+    """
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        if not getattr(settings, 'STRIPE_WEBHOOK_SECRET', ''):
+            return JsonResponse({"error": "Webhooks are not configured."}, status=503)
+        try:
+            created = record_event(request.body, request.headers.get('Stripe-Signature', ''))
+        except SignatureError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid payload.")
+        return JsonResponse({"received": True, "duplicate": not created})
@@ -0,0 +1,159 @@
+"""
+Webhook ingestion for the payments app.
+
+Ingestion and processing are split so that bursts of provider events
+cost one INSERT each on the request path:
+
+1. `record_event` verifies the ``Stripe-Signature`` header and appends
+   the raw event to `PaymentEvent`. Redelivered events hit the unique
+   ``event_id`` and are ignored.
+2. `process_pending_events` (run by ``manage.py process_payment_events``)
+   takes unprocessed events in batches, keeps the most significant
+   outcome per PaymentIntent and applies all of them with
+   `payments.services.apply_intent_statuses` in one transaction per batch.
+   Events for an intent no `Payment` carries yet (the webhook can beat
+   the response that stores ``provider_intent_id``) stay queued until it
+   does.
+
+Only ``payment_intent.canceled`` fails a payment. After
+``payment_intent.payment_failed`` Stripe puts the intent back to
+``requires_payment_method`` and the customer may retry the card, so the
+payment stays open (``requires_action``) and a later
+``payment_intent.succeeded`` still confirms the order.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings  # type: ignore
+from django.db import IntegrityError, transaction  # type: ignore
+from django.db.models import Exists, OuterRef, Q  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .models import Payment, PaymentEvent
+from .services import apply_intent_statuses
+
+# Webhook event type → Payment status
+EVENT_STATUS_MAP: dict[str, str] = {
+    'payment_intent.succeeded': Payment.STATUS_CAPTURED,
+    # Not final: the intent returns to requires_payment_method and can be retried
+    'payment_intent.payment_failed': Payment.STATUS_REQUIRES_ACTION,
+    'payment_intent.canceled': Payment.STATUS_FAILED,
+    'payment_intent.amount_capturable_updated': Payment.STATUS_AUTHORIZED,
+    'payment_intent.requires_action': Payment.STATUS_REQUIRES_ACTION,
+}
+_FINAL_STATUSES = (Payment.STATUS_CAPTURED, Payment.STATUS_FAILED)
+
+
+class SignatureError(Exception):
+    """Raised when a webhook payload fails signature verification."""
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: int | None = None) -> str:
+    """Build a ``Stripe-Signature`` header value, e.g. to replay events locally."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signed = f'{timestamp}.'.encode('utf-8') + payload
+    digest = hmac.new(secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def verify_signature(payload: bytes, header: str, secret: str, tolerance: int = 300) -> None:
+    """Check a ``Stripe-Signature`` header (``t=<ts>,v1=<hmac>[,v1=...]``)."""
+    timestamp: int | None = None
+    signatures: list[str] = []
+    for part in (header or '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name == 't' and value.isdigit():
+            timestamp = int(value)
+        elif name == 'v1':
+            signatures.append(value)
+    if timestamp is None or not signatures:
+        raise SignatureError('Malformed signature header.')
+    if tolerance and abs(time.time() - timestamp) > tolerance:
+        raise SignatureError('Signature timestamp outside the tolerance window.')
+
+    signed = f'{timestamp}.'.encode('utf-8') + payload
+    expected = hmac.new(secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, candidate) for candidate in signatures):
+        raise SignatureError('No signature matches the payload.')
+
+
+def record_event(payload: bytes, signature_header: str, provider: str = Payment.PROVIDER_STRIPE) -> bool:
+    """
+    Verify and persist one webhook delivery.
+
+    Returns ``False`` when the event id was already recorded.
+    Raises `SignatureError` or ``ValueError`` for rejected payloads.
+    """
+    verify_signature(
+        payload,
+        signature_header,
+        settings.STRIPE_WEBHOOK_SECRET,
+        getattr(settings, 'STRIPE_WEBHOOK_TOLERANCE', 300),
+    )
+    event = json.loads(payload)
+    if not isinstance(event, dict) or not event.get('id') or not event.get('type'):
+        raise ValueError('Webhook payload is not an event.')
+
+    obj = (event.get('data') or {}).get('object') or {}
+    created = event.get('created')
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                event_id=event['id'],
+                provider=provider,
+                type=event['type'],
+                intent_id=obj.get('id', '') if obj.get('object') == 'payment_intent' else '',
+                payload=event,
+                provider_created=(
+                    datetime.fromtimestamp(created, tz=dt_timezone.utc) if isinstance(created, int) else None
+                ),
+            )
+    except IntegrityError:
+        # Provider redelivery of an event we already stored
+        return False
+    return True
+
+
+def _outcome_rank(event: PaymentEvent, status: str) -> tuple:
+    # Final outcomes beat intermediate ones; otherwise the newest event wins
+    return (status in _FINAL_STATUSES, event.provider_created or event.received_at, event.pk)
+
+
+def process_pending_events(batch_size: int = 500) -> int:
+    """
+    Apply one batch of unprocessed events and mark them processed.
+
+    Events that would change a payment are only taken once a `Payment`
+    with their intent id exists. Returns the number of events consumed
+    (0 when nothing can be processed yet).
+    """
+    known_intent = Payment.objects.filter(provider_intent_id=OuterRef('intent_id'))
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .filter(Q(intent_id='') | ~Q(type__in=list(EVENT_STATUS_MAP)) | Exists(known_intent))
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        outcomes: dict[str, tuple[tuple, str]] = {}
+        for event in events:
+            status = EVENT_STATUS_MAP.get(event.type)
+            if status is None or not event.intent_id:
+                continue
+            rank = _outcome_rank(event, status)
+            current = outcomes.get(event.intent_id)
+            if current is None or rank > current[0]:
+                outcomes[event.intent_id] = (rank, status)
+
+        apply_intent_statuses({intent_id: status for intent_id, (_, status) in outcomes.items()})
+        PaymentEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=timezone.now())
+    return len(events)
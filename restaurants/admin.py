@@ -2,19 +2,32 @@
 Admin registration for restaurants, products and reviews.
 """
 from django.contrib import admin  # type: ignore
-from .models import Restaurant, Product, Review
+from .models import Restaurant, RestaurantOpenInterval, Product, Review
+
+
+class RestaurantOpenIntervalInline(admin.TabularInline):
+    """Parsed from ``open_hours`` on save; shown for reference only."""
+    model = RestaurantOpenInterval
+    fields = ('start_minute', 'end_minute')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None) -> bool:
+        return False
 
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
-    list_display = ('name', 'owner', 'category', 'is_open')
+    list_display = ('name', 'owner', 'category', 'is_open', 'rating_count')
     list_filter = ('category', 'is_open')
     search_fields = ('name', 'owner__username')
+    inlines = [RestaurantOpenIntervalInline]
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'restaurant', 'price', 'quantity', 'is_available')
+    list_display = ('name', 'restaurant', 'price', 'quantity', 'is_available', 'rating_count')
     list_filter = ('restaurant', 'is_available')
     search_fields = ('name', 'restaurant__name')
 
@@ -8,3 +8,6 @@ class RestaurantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurants'
     verbose_name = 'Restaurants'
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
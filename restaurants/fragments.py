@@ -0,0 +1,47 @@
+"""
+Pre-rendered menu card fragments.
+
+``restaurant_detail.html`` wraps every product card in
+``{% cache FRAGMENT_CACHE_TTL product_card product.pk product.updated_at.timestamp %}``.
+The functions here render the same card (``restaurants/_product_card.html``)
+outside a request and store it under the key that tag will look up, so
+the first visitor after an edit already gets cached HTML.
+
+Pre-rendering on save is enabled with ``PRERENDER_MENU_FRAGMENTS``;
+``manage.py prerender_menus`` warms every menu at once (e.g. after a
+deploy or a cache flush).
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.conf import settings  # type: ignore
+from django.core.cache import InvalidCacheBackendError, caches  # type: ignore
+from django.core.cache.utils import make_template_fragment_key  # type: ignore
+from django.template.loader import render_to_string  # type: ignore
+
+from .models import Product
+
+PRODUCT_CARD_TEMPLATE = 'restaurants/_product_card.html'
+
+
+def _fragment_cache():
+    # Same lookup as the {% cache %} tag
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def product_card_key(product: Product) -> str:
+    return make_template_fragment_key('product_card', [product.pk, product.updated_at.timestamp()])
+
+
+def prerender_product_cards(products: Iterable[Product]) -> int:
+    """Render and cache the menu cards of ``products``; returns how many were stored."""
+    fragments = {
+        product_card_key(product): render_to_string(PRODUCT_CARD_TEMPLATE, {'product': product})
+        for product in products
+    }
+    _fragment_cache().set_many(fragments, timeout=getattr(settings, 'FRAGMENT_CACHE_TTL', 3600))
+    return len(fragments)
@@ -0,0 +1,63 @@
+"""
+Opening hours.
+
+`Restaurant.open_hours` is free text such as ``"09:00-14:00, 17:00-22:00"``.
+Intervals may cross midnight (``"18:00-02:00"``); an empty value means
+`DEFAULT_OPEN_HOURS`. Times are local to ``RESTAURANT_TIME_ZONE``.
+
+The parsed, midnight-split ranges are stored in `RestaurantOpenInterval`
+so "open now" / "open at" are database range lookups
+(`RestaurantQuerySet.open_at`).
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings  # type: ignore
+from django.utils import timezone  # type: ignore
+
+DEFAULT_OPEN_HOURS = '09:00-22:00'
+MINUTES_PER_DAY = 24 * 60
+
+_INTERVAL = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+
+def parse_open_hours(text: str) -> list[tuple[int, int]]:
+    """Parse ``text`` into ``(start, end)`` minutes after midnight; malformed parts are skipped."""
+    intervals: list[tuple[int, int]] = []
+    for part in (text or DEFAULT_OPEN_HOURS).split(','):
+        match = _INTERVAL.match(part)
+        if not match:
+            continue
+        start_h, start_m, end_h, end_m = map(int, match.groups())
+        start, end = start_h * 60 + start_m, end_h * 60 + end_m
+        # 24:00 is a valid end of day
+        if start >= MINUTES_PER_DAY or end > MINUTES_PER_DAY or start_m > 59 or end_m > 59 or start == end:
+            continue
+        intervals.append((start, end))
+    return intervals
+
+
+def split_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Split intervals that cross midnight (``22:00-02:00``) into two same-day ranges."""
+    result: list[tuple[int, int]] = []
+    for start, end in intervals:
+        if start < end:
+            result.append((start, end))
+        else:
+            result.append((start, MINUTES_PER_DAY))
+            if end:
+                result.append((0, end))
+    return result
+
+
+def restaurant_now(now: datetime | None = None) -> datetime:
+    """``now`` (default: the current time) in the restaurants' local time zone."""
+    zone = ZoneInfo(getattr(settings, 'RESTAURANT_TIME_ZONE', settings.TIME_ZONE))
+    return timezone.localtime(now or timezone.now(), zone)
+
+
+def minute_of_day(moment: datetime) -> int:
+    return moment.hour * 60 + moment.minute
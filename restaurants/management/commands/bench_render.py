@@ -0,0 +1,93 @@
+"""
+Benchmark catalog page rendering with and without caching.
+
+Usage:
+    python manage.py bench_render [--rounds 20]
+
+Uses the seed data (running ``seed_data`` first, inside a transaction that
+is rolled back, if the database has no restaurants). Requests the home page
+and every restaurant page as an anonymous visitor through the test client:
+
+- ``uncached``: every cache replaced by ``DummyCache``, i.e. menu queries and
+  all card templates run on every request;
+- ``cached``: a fresh local-memory cache, measured after one warm-up round,
+  i.e. menus come from the menu cache and cards from fragment caching.
+
+Prints p50/p99 per page type and the speed-up.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from restaurants.models import Restaurant
+
+_UNCACHED = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+_CACHED = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-render',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark home/restaurant page rendering with and without fragment + menu caching."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help='Passes over all pages per variant.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not Restaurant.objects.exists():
+                call_command('seed_data', stdout=StringIO())
+            urls = {
+                'home': [reverse('home')],
+                'detail': [reverse('restaurants:detail', args=[pk]) for pk in Restaurant.objects.values_list('pk', flat=True)],
+            }
+            results: dict[str, dict[str, list[float]]] = {}
+            for label, caches in (('uncached', _UNCACHED), ('cached', _CACHED)):
+                with override_settings(CACHES=caches, PRERENDER_MENU_FRAGMENTS=False):
+                    results[label] = self._run(urls, options['rounds'], warm=(label == 'cached'))
+            transaction.set_rollback(True)
+
+        for page in urls:
+            uncached, cached = results['uncached'][page], results['cached'][page]
+            self.stdout.write(
+                f"{page:>6} ({len(urls[page])} page(s)): "
+                f"uncached p50={statistics.median(uncached):.2f}ms p99={_percentile(uncached, 99):.2f}ms | "
+                f"cached p50={statistics.median(cached):.2f}ms p99={_percentile(cached, 99):.2f}ms | "
+                f"x{statistics.median(uncached) / statistics.median(cached):.1f}"
+            )
+
+    @staticmethod
+    def _run(urls: dict[str, list[str]], rounds: int, warm: bool) -> dict[str, list[float]]:
+        client = Client(HTTP_HOST='localhost')
+        if warm:
+            for page_urls in urls.values():
+                for url in page_urls:
+                    client.get(url)
+        timings: dict[str, list[float]] = {page: [] for page in urls}
+        for _ in range(rounds):
+            for page, page_urls in urls.items():
+                for url in page_urls:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings[page].append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200, (url, response.status_code)
+        return timings
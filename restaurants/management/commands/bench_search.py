@@ -0,0 +1,138 @@
+"""
+Benchmark restaurant search.
+
+Usage:
+    python manage.py bench_search [--products 100000] [--restaurants 2000] [--queries 200]
+
+Generates a synthetic catalogue and times the same random queries through:
+
+- ``legacy``: the previous HomeView filter (``name__icontains | description__icontains``);
+- ``icontains``: ``icontains`` over the indexed fields, product names included
+  (what `search_restaurants` does without FTS5);
+- ``fts``: `restaurants.search.search_restaurants` on the FTS5 index.
+
+It prints p50/p99 latency and the average number of hits for each. The whole run happens in
+one transaction that is rolled back at the end, so nothing is left behind.
+"""
+from __future__ import annotations
+
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+
+from accounts.models import User
+from restaurants.models import Restaurant, Product
+from restaurants.search import index_available, rebuild_index, search_restaurants
+
+_WORDS = (
+    'pizza margherita pepperoni burger cheese chicken kebab sushi salmon tuna ramen noodle '
+    'salad caesar greek taco burrito nachos pasta carbonara lasagna steak grill shopska '
+    'pastrmajlija burek ajvar falafel hummus gyro wrap soup tomato mushroom spicy vegan '
+    'chocolate pancake waffle icecream lemonade espresso latte'
+).split()
+_CATEGORIES = ('Pizza', 'Burgers', 'Sushi', 'Mexican', 'Grill', 'Desserts', 'Vegan', 'Traditional')
+_SYLLABLES = ('ka', 'ro', 'mi', 'ze', 'lu', 'pa', 'to', 'ni', 'sa', 've', 'do', 'ri', 'ba', 'ko', 'le')
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _legacy_search(term: str) -> models.QuerySet:
+    """The filter HomeView used before the search index, kept for comparison only."""
+    return Restaurant.objects.filter(is_open=True).filter(
+        models.Q(name__icontains=term) | models.Q(description__icontains=term)
+    )
+
+
+def _icontains_search(term: str) -> models.QuerySet:
+    """Same fields as the index (incl. product names) with icontains, i.e. the no-FTS fallback."""
+    return Restaurant.objects.filter(is_open=True).filter(
+        models.Q(name__icontains=term)
+        | models.Q(description__icontains=term)
+        | models.Q(category__icontains=term)
+        | models.Q(pk__in=Restaurant.objects.filter(products__name__icontains=term).values('pk'))
+    )
+
+
+def _fts_search(term: str) -> models.QuerySet:
+    return search_restaurants(term, Restaurant.objects.filter(is_open=True))
+
+
+class Command(BaseCommand):
+    help = "Benchmark restaurant search (icontains vs. full-text index)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not index_available():
+            raise CommandError("No full-text index on this database (SQLite with FTS5 required).")
+        rng = random.Random(options['seed'])
+        # A few thousand made-up words on top of the real dish names, so terms are not all ubiquitous
+        words = list(_WORDS) + [
+            ''.join(rng.choices(_SYLLABLES, k=rng.randint(2, 4))) for _ in range(3000)
+        ]
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._generate(rng, words, options['restaurants'], options['products'])
+            # bulk_create bypasses the signals, so index in one pass
+            rebuild_index()
+            self.stdout.write(
+                f"Generated {options['restaurants']} restaurants / {options['products']} products "
+                f"and indexed them in {time.perf_counter() - started:.1f}s"
+            )
+
+            terms = [
+                ' '.join(rng.sample(words, rng.choice((1, 1, 2))))[:rng.choice((3, 5, 40))].strip()
+                for _ in range(options['queries'])
+            ]
+            variants = (('legacy', _legacy_search), ('icontains', _icontains_search), ('fts', _fts_search))
+            for label, search in variants:
+                latencies: list[float] = []
+                hits = 0
+                for term in terms:
+                    started = time.perf_counter()
+                    hits += len(list(search(term)))
+                    latencies.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:>9}: p50={statistics.median(latencies):.2f}ms "
+                    f"p99={_percentile(latencies, 99):.2f}ms, "
+                    f"{hits / len(terms):.1f} hits/query ({len(terms)} queries)"
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _generate(rng: random.Random, words: list[str], n_restaurants: int, n_products: int) -> None:
+        owner = User.objects.create_user(username=f'bench-owner-{uuid.uuid4().hex[:8]}', role=User.ROLE_OWNER)
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(
+                name=f"{rng.choice(words).title()} {rng.choice(words).title()} {i}",
+                description=' '.join(rng.choices(words, k=12)),
+                category=rng.choice(_CATEGORIES),
+                owner=owner,
+            )
+            for i in range(n_restaurants)
+        ], batch_size=1000)
+        batch: list[Product] = []
+        for i in range(n_products):
+            batch.append(Product(
+                restaurant=restaurants[i % n_restaurants],
+                name=' '.join(rng.choices(words, k=rng.randint(1, 3))).title(),
+                price=Decimal('5.00'),
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch.clear()
+        Product.objects.bulk_create(batch)
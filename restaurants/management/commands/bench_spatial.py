@@ -0,0 +1,96 @@
+"""
+Benchmark the spatial index behind "near me" lookups.
+
+Usage:
+    python manage.py bench_spatial [--points 5000] [--queries 2000] [--k 10] [--radius 2]
+
+Indexes random points spread over Skopje in a `core.spatial.GridIndex`
+and prints p50/p99 per query for k-nearest and within-radius lookups,
+next to a linear scan over the same points (what ranking every restaurant
+in Python costs). Every index answer is checked against the scan; the
+command fails on a mismatch. No database access.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.spatial import GridIndex, project
+
+_LAT, _LNG = (41.90, 42.10), (21.30, 21.55)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark k-nearest and within-radius queries on the grid index against a linear scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--radius', type=float, default=2.0, help='Radius in km.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def point():
+            return (rng.uniform(*_LAT), rng.uniform(*_LNG))
+
+        points = {i: point() for i in range(options['points'])}
+        queries = [point() for _ in range(options['queries'])]
+        k, radius = options['k'], options['radius']
+
+        index = GridIndex(getattr(settings, 'SPATIAL_INDEX_CELL_KM', 0.5), getattr(settings, 'DISPATCH_DEPOT')[0])
+        started = time.perf_counter()
+        for key, value in points.items():
+            index.insert(key, value)
+        self.stdout.write(f"build: {len(index)} points in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        projected = [(key, *project(value, index.ref_lat)) for key, value in points.items()]
+
+        def scan(query):
+            x, y = project(query, index.ref_lat)
+            return [(math.hypot(px - x, py - y), key) for key, px, py in projected]
+
+        cases = {
+            f'knn k={k}': (
+                lambda q: index.nearest(q, k),
+                lambda q: heapq.nsmallest(k, scan(q)),
+            ),
+            f'within {radius:g}km': (
+                lambda q: index.within(q, radius),
+                lambda q: sorted(item for item in scan(q) if item[0] <= radius),
+            ),
+        }
+        for label, (indexed, linear) in cases.items():
+            timings: dict[str, list[float]] = {'index': [], 'scan': []}
+            found = 0
+            for query in queries:
+                started = time.perf_counter()
+                got = indexed(query)
+                timings['index'].append((time.perf_counter() - started) * 1e6)
+                started = time.perf_counter()
+                expected = linear(query)
+                timings['scan'].append((time.perf_counter() - started) * 1e6)
+                # Keys may tie on distance; compare the distances
+                if [round(d, 9) for d, _ in got] != [round(d, 9) for d, _ in expected]:
+                    raise CommandError(f"{label}: index and scan disagree for query {query}.")
+                found += len(got)
+            for name, samples in timings.items():
+                self.stdout.write(
+                    f"{label:>14} {name:>5}: p50={statistics.median(samples):.0f}us "
+                    f"p99={_percentile(samples, 99):.0f}us ({found / len(queries):.1f} results/query)"
+                )
+        self.stdout.write(self.style.SUCCESS('Index answers match the linear scan.'))
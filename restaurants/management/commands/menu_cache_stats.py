@@ -0,0 +1,34 @@
+"""
+Show (or reset) the menu cache counters.
+
+Usage:
+    python manage.py menu_cache_stats [--reset]
+
+Counters live in ``MENU_CACHE_ALIAS``, so with a shared cache backend they
+cover every web process; with the default local-memory cache only the
+current process is visible, which makes this command useful mainly in
+``manage.py shell`` sessions or against Redis/Memcached.
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from restaurants.menu_cache import menu_cache_stats, reset_menu_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Print menu cache hit/miss counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = menu_cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        ratio = f"{stats['hits'] / lookups:.1%}" if lookups else 'n/a'
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} (hit rate {ratio}), "
+            f"rebuilds={stats['rebuilds']} waits={stats['waits']} fallbacks={stats['fallbacks']}"
+        )
+        if options['reset']:
+            reset_menu_cache_stats()
@@ -0,0 +1,37 @@
+"""
+Warm the menu caches: menu product lists and pre-rendered product cards.
+
+Usage:
+    python manage.py prerender_menus [--restaurant <id> ...]
+
+Runs the same code paths as a first visit to each restaurant page
+(`restaurants.menu_cache.get_menu` and
+`restaurants.fragments.prerender_product_cards`), so it only helps when
+the cache is shared with the web processes (not the default local-memory
+cache).
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from restaurants.fragments import prerender_product_cards
+from restaurants.menu_cache import get_menu
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Fill the menu cache and pre-render product card fragments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, action='append', help='Only these restaurant ids.')
+
+    def handle(self, *args, **options):
+        restaurant_ids = Restaurant.objects.values_list('pk', flat=True)
+        if options['restaurant']:
+            restaurant_ids = restaurant_ids.filter(pk__in=options['restaurant'])
+
+        restaurants = cards = 0
+        for restaurant_id in restaurant_ids.iterator():
+            cards += prerender_product_cards(get_menu(restaurant_id))
+            restaurants += 1
+        self.stdout.write(self.style.SUCCESS(f"Warmed {restaurants} menu(s), {cards} product card(s)."))
@@ -0,0 +1,33 @@
+"""
+Re-parse every restaurant's opening hours into `RestaurantOpenInterval` rows.
+
+Usage:
+    python manage.py rebuild_open_intervals
+
+Needed after writes that bypass ``Restaurant.save`` (``bulk_create``,
+``QuerySet.update(open_hours=...)``).
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurants.hours import parse_open_hours, split_intervals
+from restaurants.models import Restaurant, RestaurantOpenInterval
+
+
+class Command(BaseCommand):
+    help = "Rebuild the structured opening-hours table from Restaurant.open_hours."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            RestaurantOpenInterval.objects.all().delete()
+            intervals = RestaurantOpenInterval.objects.bulk_create(
+                (
+                    RestaurantOpenInterval(restaurant_id=pk, start_minute=start, end_minute=end)
+                    for pk, open_hours in Restaurant.objects.values_list('pk', 'open_hours').iterator()
+                    for start, end in split_intervals(parse_open_hours(open_hours))
+                ),
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Stored {len(intervals)} interval(s)."))
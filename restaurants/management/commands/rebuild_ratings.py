@@ -0,0 +1,24 @@
+"""
+Recompute the rating aggregates of every product and restaurant.
+
+Usage:
+    python manage.py rebuild_ratings
+
+Needed after writes that bypass the review signals (``bulk_create``,
+``QuerySet.update(rating=...)``, ``QuerySet.delete``) or a data import.
+Reads all reviews in one GROUP BY query and only writes rows whose
+aggregates are off.
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from restaurants.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Rebuild Product/Restaurant rating_count and rating_sum from the reviews."
+
+    def handle(self, *args, **options):
+        changed = rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Updated ratings of {len(changed)} restaurant(s)."))
@@ -0,0 +1,27 @@
+"""
+Rebuild the restaurant full-text search index.
+
+Usage:
+    python manage.py rebuild_search_index
+
+Needed after writes that bypass model signals (``bulk_create``,
+``QuerySet.update``, fixtures loaded with raw SQL).
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurants.search import index_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over restaurants and products."
+
+    def handle(self, *args, **options):
+        if not index_available():
+            self.stdout.write(self.style.WARNING("No full-text index on this database; search uses icontains."))
+            return
+        with transaction.atomic():
+            indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} restaurant(s)."))
@@ -0,0 +1,121 @@
+"""
+Versioned per-restaurant menu cache.
+
+Menus are read on every restaurant page and change rarely, so
+`get_menu` serves the list of available products from the cache:
+
+- Every restaurant has a version number under ``menu:v:<id>``; the menu
+  itself is stored under ``menu:<id>:<version>``. `invalidate_menu`
+  (called from `restaurants.signals` on product/restaurant changes) only
+  bumps the version, so stale menus are never read again and simply
+  expire.
+- On a miss, one request wins a short ``cache.add`` lock and rebuilds the
+  menu; concurrent requests for the same menu wait briefly for that
+  rebuild instead of all querying the database at once (stampede
+  protection). If the rebuild takes too long they fall back to the
+  database without writing to the cache.
+- Hits, misses, rebuilds and lock waits are counted in the cache itself,
+  so `menu_cache_stats` (and ``manage.py menu_cache_stats``) report
+  totals across all processes sharing it.
+
+``MENU_CACHE_ALIAS`` selects the cache, ``MENU_CACHE_TTL`` the lifetime of
+a menu. Stock changes (``Product.quantity``) are not part of the cached
+menu and do not invalidate it.
+"""
+from __future__ import annotations
+
+import time
+
+from django.conf import settings  # type: ignore
+from django.core.cache import caches  # type: ignore
+
+from .models import Product
+
+_LOCK_TTL = 10
+_WAIT_STEP = 0.05
+_WAIT_TOTAL = 2.0
+STAT_NAMES = ('hits', 'misses', 'rebuilds', 'waits', 'fallbacks')
+
+
+def _cache():
+    return caches[getattr(settings, 'MENU_CACHE_ALIAS', 'default')]
+
+
+def _version_key(restaurant_id: int) -> str:
+    return f'menu:v:{restaurant_id}'
+
+
+def _count(name: str) -> None:
+    cache = _cache()
+    key = f'menu:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event since start or eviction; a lost race here only loses one count
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def menu_version(restaurant_id: int) -> int:
+    cache = _cache()
+    version = cache.get(_version_key(restaurant_id))
+    if version is None:
+        # Start from the clock so a version lost to eviction is never reused
+        cache.add(_version_key(restaurant_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(restaurant_id))
+    return version
+
+
+def invalidate_menu(restaurant_id: int) -> None:
+    cache = _cache()
+    try:
+        cache.incr(_version_key(restaurant_id))
+    except ValueError:
+        # No version yet, so nothing can be cached under it either
+        pass
+
+
+def load_menu(restaurant_id: int) -> list[Product]:
+    """The uncached menu query."""
+    return list(Product.objects.filter(restaurant_id=restaurant_id, is_available=True))
+
+
+def get_menu(restaurant_id: int) -> list[Product]:
+    """Available products of ``restaurant_id``, from the cache when possible."""
+    cache = _cache()
+    key = f'menu:{restaurant_id}:{menu_version(restaurant_id)}'
+    menu = cache.get(key)
+    if menu is not None:
+        _count('hits')
+        return menu
+    _count('misses')
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, timeout=_LOCK_TTL):
+        try:
+            menu = load_menu(restaurant_id)
+            cache.set(key, menu, timeout=getattr(settings, 'MENU_CACHE_TTL', 600))
+            _count('rebuilds')
+            return menu
+        finally:
+            cache.delete(lock)
+
+    # Someone else is rebuilding this menu; wait for their result
+    _count('waits')
+    deadline = time.monotonic() + _WAIT_TOTAL
+    while time.monotonic() < deadline:
+        time.sleep(_WAIT_STEP)
+        menu = cache.get(key)
+        if menu is not None:
+            return menu
+    _count('fallbacks')
+    return load_menu(restaurant_id)
+
+
+def menu_cache_stats() -> dict[str, int]:
+    values = _cache().get_many([f'menu:stats:{name}' for name in STAT_NAMES])
+    return {name: values.get(f'menu:stats:{name}', 0) for name in STAT_NAMES}
+
+
+def reset_menu_cache_stats() -> None:
+    _cache().delete_many([f'menu:stats:{name}' for name in STAT_NAMES])
@@ -0,0 +1,43 @@
+from django.db import DatabaseError, migrations
+
+# Frozen copy of the index schema in restaurants.search, so later changes to
+# that module cannot alter what this migration does.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS restaurants_search USING fts5("
+    "name, description, category, products, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL_SQL = (
+    "INSERT INTO restaurants_search (rowid, name, description, category, products) "
+    "SELECT r.id, r.name, r.description, r.category, "
+    "COALESCE((SELECT group_concat(p.name, ' ') FROM restaurants_product p WHERE p.restaurant_id = r.id), '') "
+    "FROM restaurants_restaurant r"
+)
+DROP_SQL = "DROP TABLE IF EXISTS restaurants_search"
+
+
+def forwards(apps, schema_editor):
+    # No-op outside SQLite or without FTS5; search falls back to icontains there
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL)
+    except DatabaseError:
+        return
+    schema_editor.execute(FILL_SQL)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from restaurants.hours import parse_open_hours, split_intervals
+
+
+def populate_intervals(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    RestaurantOpenInterval = apps.get_model('restaurants', 'RestaurantOpenInterval')
+    RestaurantOpenInterval.objects.bulk_create(
+        RestaurantOpenInterval(restaurant_id=pk, start_minute=start, end_minute=end)
+        for pk, open_hours in Restaurant.objects.values_list('pk', 'open_hours').iterator()
+        for start, end in split_intervals(parse_open_hours(open_hours))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantOpenInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_minute', models.PositiveSmallIntegerField()),
+                ('end_minute', models.PositiveSmallIntegerField()),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_intervals', to='restaurants.restaurant')),
+            ],
+            options={
+                'ordering': ['restaurant', 'start_minute'],
+                'indexes': [models.Index(fields=['restaurant', 'start_minute', 'end_minute'], name='openinterval_lookup_idx'), models.Index(fields=['start_minute', 'end_minute'], name='openinterval_range_idx')],
+            },
+        ),
+        migrations.RunPython(populate_intervals, migrations.RunPython.noop),
+    ]
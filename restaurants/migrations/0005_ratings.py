@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:27
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_ratings(apps, schema_editor):
+    Product = apps.get_model('restaurants', 'Product')
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review = apps.get_model('restaurants', 'Review')
+    restaurants = {}
+    rows = (
+        Review.objects.order_by()
+        .values_list('product_id', 'product__restaurant_id')
+        .annotate(count=Count('id'), total=Sum('rating'))
+    )
+    for product_id, restaurant_id, count, total in rows:
+        Product.objects.filter(pk=product_id).update(rating_count=count, rating_sum=total)
+        previous = restaurants.get(restaurant_id, (0, 0))
+        restaurants[restaurant_id] = (previous[0] + count, previous[1] + total)
+    for restaurant_id, (count, total) in restaurants.items():
+        Restaurant.objects.filter(pk=restaurant_id).update(rating_count=count, rating_sum=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0004_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+    ]
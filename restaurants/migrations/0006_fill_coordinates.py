@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:20
+
+import hashlib
+
+from django.db import migrations
+
+
+def _hash_point(address):
+    # Frozen copy of core.geocoding: normalize_address + HashGeocoder, the
+    # offline backend. Run ``manage.py geocode_addresses --all`` afterwards
+    # when another GEOCODER_BACKEND is configured.
+    address = ' '.join((address or '').lower().split()) or 'skopje'
+    digest = hashlib.sha256(address.encode('utf-8')).digest()
+    x = int.from_bytes(digest[0:2], 'big') / 65535
+    y = int.from_bytes(digest[2:4], 'big') / 65535
+    return round(41.97 + 0.06 * x, 6), round(21.38 + 0.10 * y, 6)
+
+
+def fill_coordinates(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    rows = Restaurant.objects.filter(latitude__isnull=True).values_list('pk', 'address')
+    changed = []
+    for pk, address in list(rows):
+        latitude, longitude = _hash_point(address)
+        changed.append(Restaurant(pk=pk, latitude=latitude, longitude=longitude))
+    Restaurant.objects.bulk_update(changed, ['latitude', 'longitude'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_ratings'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_coordinates, migrations.RunPython.noop),
+    ]
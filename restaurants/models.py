@@ -4,22 +4,83 @@ Models for the restaurants app.
 This module defines the core entities: `Restaurant`, `Product`, and
 `Review`. Restaurants are owned by users with the owner role and can
 contain multiple products. Customers can leave reviews on products.
+
+Products and restaurants carry ``rating_count``/``rating_sum`` over their
+reviews, kept up to date by `restaurants.ratings` so menus can show and
+sort by rating without an aggregate per card.
+
+`RestaurantOpenInterval` is the parsed form of `Restaurant.open_hours`,
+rebuilt whenever a restaurant is saved, so "open now" is an indexed
+range lookup instead of string parsing.
 """
 from __future__ import annotations
 
+from datetime import datetime
+
 from django.conf import settings  # type: ignore
-from django.db import models  # type: ignore
+from django.db import models, transaction  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .hours import minute_of_day, parse_open_hours, restaurant_now, split_intervals
+
+
+class RestaurantQuerySet(models.QuerySet):
+    def open_at(self, moment: datetime) -> 'RestaurantQuerySet':
+        """Restaurants that are enabled and inside one of their intervals at ``moment``."""
+        return self.filter(models.Exists(_intervals_covering(moment)), is_open=True)
+
+    def open_now(self) -> 'RestaurantQuerySet':
+        return self.open_at(timezone.now())
+
+    def by_rating(self) -> 'RestaurantQuerySet':
+        """Best average rating first; unrated restaurants last."""
+        return self.annotate(rating_avg=_rating_avg()).order_by(
+            models.F('rating_avg').desc(nulls_last=True), '-rating_count', 'name',
+        )
+
+    def with_open_now(self, moment: datetime | None = None) -> 'RestaurantQuerySet':
+        """Annotate ``is_open_now`` (at ``moment``, default now) for display and sorting."""
+        covering = models.Exists(_intervals_covering(moment or timezone.now()))
+        return self.annotate(
+            is_open_now=models.ExpressionWrapper(
+                covering & models.Q(is_open=True), output_field=models.BooleanField(),
+            )
+        )
+
+
+def _rating_avg() -> models.Expression:
+    return models.Case(
+        models.When(rating_count=0, then=None),
+        default=models.F('rating_sum') * 1.0 / models.F('rating_count'),
+        output_field=models.FloatField(),
+    )
+
 
+class RatedMixin:
+    """Average of the ``rating_count``/``rating_sum`` aggregates."""
 
-class Restaurant(models.Model):
+    @property
+    def rating(self) -> float | None:
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class Restaurant(RatedMixin, models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     address = models.CharField(max_length=255, blank=True)
+    # Geocoded from ``address`` on save (restaurants/signals.py)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     image = models.ImageField(upload_to='restaurants/', blank=True, null=True)
     image_url = models.URLField(blank=True)   # added
     open_hours = models.CharField(max_length=255, blank=True)
     category = models.CharField(max_length=100, blank=True)
     is_open = models.BooleanField(default=True)
+    # Over all reviews of its products (restaurants/ratings.py)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -29,14 +90,25 @@ class Restaurant(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RestaurantQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
 
     def __str__(self) -> str:  # type: ignore[override]
         return self.name
 
+    def sync_open_intervals(self) -> None:
+        """Replace this restaurant's `RestaurantOpenInterval` rows with the parsed `open_hours`."""
+        with transaction.atomic():
+            self.open_intervals.all().delete()
+            RestaurantOpenInterval.objects.bulk_create(
+                RestaurantOpenInterval(restaurant=self, start_minute=start, end_minute=end)
+                for start, end in split_intervals(parse_open_hours(self.open_hours))
+            )
+
 
-class Product(models.Model):
+class Product(RatedMixin, models.Model):
     restaurant = models.ForeignKey(
         Restaurant,
         on_delete=models.CASCADE,
@@ -51,6 +123,9 @@ class Product(models.Model):
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     image_url = models.URLField(blank=True) #added
     is_available = models.BooleanField(default=True)
+    # Over its reviews (restaurants/ratings.py)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -61,14 +136,46 @@ class Product(models.Model):
         return f"{self.name} ({self.restaurant.name})"
 
     def increase_quantity(self, amount: int = 1) -> None:
-        self.quantity = (self.quantity or 0) + amount
-        self.save(update_fields=['quantity'])
+        Product.objects.filter(pk=self.pk).update(quantity=models.F('quantity') + amount)
+        self.refresh_from_db(fields=['quantity'])
 
     def decrease_quantity(self, amount: int = 1) -> None:
-        if self.quantity < amount:
+        # Guarded UPDATE so concurrent callers cannot both take the last unit
+        updated = (
+            Product.objects
+            .filter(pk=self.pk, quantity__gte=amount)
+            .update(quantity=models.F('quantity') - amount)
+        )
+        if not updated:
             raise ValueError('Insufficient quantity')
-        self.quantity -= amount
-        self.save(update_fields=['quantity'])
+        self.refresh_from_db(fields=['quantity'])
+
+
+def _intervals_covering(moment: datetime) -> models.QuerySet:
+    minute = minute_of_day(restaurant_now(moment))
+    return RestaurantOpenInterval.objects.filter(
+        restaurant=models.OuterRef('pk'),
+        start_minute__lte=minute,
+        end_minute__gt=minute,
+    )
+
+
+class RestaurantOpenInterval(models.Model):
+    """One daily opening range, in minutes after local midnight (``end_minute`` exclusive)."""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='open_intervals')
+    start_minute = models.PositiveSmallIntegerField()
+    end_minute = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['restaurant', 'start_minute']
+        indexes = [
+            models.Index(fields=['restaurant', 'start_minute', 'end_minute'], name='openinterval_lookup_idx'),
+            models.Index(fields=['start_minute', 'end_minute'], name='openinterval_range_idx'),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        (start_h, start_m), (end_h, end_m) = divmod(self.start_minute, 60), divmod(self.end_minute, 60)
+        return f"Restaurant #{self.restaurant_id} {start_h:02d}:{start_m:02d}-{end_h:02d}:{end_m:02d}"
 
 
 class Review(models.Model):
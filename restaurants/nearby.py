@@ -0,0 +1,59 @@
+"""
+Location-aware restaurant lookups.
+
+`restaurant_index` is a `core.spatial.SharedIndex` over every restaurant
+with coordinates. `restaurants.signals` updates it when a restaurant's
+address is geocoded or the restaurant is deleted, so queries never scan
+the table: `restaurants_within` and `nearest_restaurants` answer from the
+grid in microseconds to a few milliseconds and return
+``(distance_km, restaurant_id)`` pairs, nearest first.
+"""
+from __future__ import annotations
+
+import math
+
+from django.conf import settings  # type: ignore
+
+from core.spatial import Point, SharedIndex
+from .models import Restaurant
+
+
+def _load():
+    return (
+        Restaurant.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .values_list('pk', 'latitude', 'longitude')
+        .iterator()
+    )
+
+
+restaurant_index = SharedIndex('restaurants', _load, cell_km=getattr(settings, 'SPATIAL_INDEX_CELL_KM', 0.5))
+
+
+def parse_point(value: str) -> Point:
+    """``"lat,lng"`` to a point; raises ValueError for anything else."""
+    lat, lng = (float(part) for part in value.split(','))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Coordinates out of range.')
+    return lat, lng
+
+
+def parse_radius(value: str | None) -> float | None:
+    """
+    ``radius`` (km) from a query string. ``None`` (use ``NEARBY_RADIUS_KM``)
+    when it is missing, zero, negative, infinite or NaN; raises ValueError
+    when it is not a number.
+    """
+    if not value:
+        return None
+    radius = float(value)
+    return radius if math.isfinite(radius) and radius > 0 else None
+
+
+def restaurants_within(point: Point, radius_km: float | None = None) -> list[tuple[float, int]]:
+    if radius_km is None:
+        radius_km = getattr(settings, 'NEARBY_RADIUS_KM', 10.0)
+    return restaurant_index.within(point, radius_km)
+
+
+def nearest_restaurants(point: Point, k: int = 10, max_km: float | None = None) -> list[tuple[float, int]]:
+    return restaurant_index.nearest(point, k, max_km)
@@ -0,0 +1,71 @@
+"""
+Rating aggregates of products and restaurants.
+
+``rating_count`` and ``rating_sum`` on `Product` and `Restaurant` are
+adjusted in place with ``F()`` expressions whenever a `Review` is
+created, changed or deleted (`restaurants.signals`), so concurrent
+reviews never overwrite each other's counts and reading an average is a
+division on the loaded row. Both rows also get a new ``updated_at``,
+which is what the menu card fragments and the conditional GET validators
+key on.
+
+`rebuild_ratings` recomputes every aggregate from the reviews in one
+GROUP BY query and drops the cached menus it changed; ``manage.py
+rebuild_ratings`` runs it after writes that bypass the signals
+(``bulk_create``, ``QuerySet.update``/``delete``).
+"""
+from __future__ import annotations
+
+from django.db import transaction  # type: ignore
+from django.db.models import Count, F, Sum  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .menu_cache import invalidate_menu
+from .models import Product, Restaurant, Review
+
+
+def adjust_rating(product_id: int, count: int, total: int) -> int | None:
+    """Add ``count`` reviews worth ``total`` stars to a product and its restaurant; returns the restaurant id."""
+    restaurant_id = Product.objects.filter(pk=product_id).values_list('restaurant_id', flat=True).first()
+    if restaurant_id is None:
+        return None  # the product is being deleted along with its reviews
+    changes = {
+        'rating_count': F('rating_count') + count,
+        'rating_sum': F('rating_sum') + total,
+        'updated_at': timezone.now(),
+    }
+    with transaction.atomic():
+        Product.objects.filter(pk=product_id).update(**changes)
+        Restaurant.objects.filter(pk=restaurant_id).update(**changes)
+    return restaurant_id
+
+
+def rebuild_ratings() -> set[int]:
+    """Recompute every aggregate from `Review`; returns the ids of restaurants whose ratings changed."""
+    products: dict[int, tuple[int, int]] = {}
+    restaurants: dict[int, tuple[int, int]] = {}
+    rows = (
+        Review.objects.order_by()
+        .values_list('product_id', 'product__restaurant_id')
+        .annotate(count=Count('id'), total=Sum('rating'))
+    )
+    for product_id, restaurant_id, count, total in rows:
+        products[product_id] = (count, total)
+        previous = restaurants.get(restaurant_id, (0, 0))
+        restaurants[restaurant_id] = (previous[0] + count, previous[1] + total)
+
+    now = timezone.now()
+    changed: set[int] = set()
+    with transaction.atomic():
+        for model, aggregates in ((Product, products), (Restaurant, restaurants)):
+            stale = []
+            current = model.objects.values_list('pk', 'restaurant_id' if model is Product else 'pk', 'rating_count', 'rating_sum')
+            for pk, restaurant_id, count, total in current.iterator():
+                expected = aggregates.get(pk, (0, 0))
+                if (count, total) != expected:
+                    stale.append(model(pk=pk, rating_count=expected[0], rating_sum=expected[1], updated_at=now))
+                    changed.add(restaurant_id)
+            model.objects.bulk_update(stale, ['rating_count', 'rating_sum', 'updated_at'], batch_size=500)
+    for restaurant_id in changed:
+        invalidate_menu(restaurant_id)
+    return changed
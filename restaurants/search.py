@@ -0,0 +1,128 @@
+"""
+Full-text search over restaurants.
+
+On SQLite the index is an FTS5 virtual table (``restaurants_search``,
+created by migration ``0002_search_index``) with one row per restaurant:
+its name, description, category and the names of its products. Results
+are ranked with ``bm25`` (a name match outweighs a product match) and
+every query term is matched as a prefix, so "piz marg" finds "Pizza
+Margherita".
+
+The index is kept current by `restaurants.signals`. Writes that bypass
+model signals (``bulk_create``, ``QuerySet.update``, raw SQL) should be
+followed by `reindex_restaurants` or ``manage.py rebuild_search_index``.
+
+On other databases, or if SQLite was built without FTS5, `search_restaurants`
+falls back to ``icontains`` over the same fields (unranked).
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+from django.db import connection, models  # type: ignore
+from django.db.models.expressions import RawSQL  # type: ignore
+
+from .models import Restaurant
+
+SEARCH_TABLE = 'restaurants_search'
+
+# bm25 column weights: name, description, category, products
+_WEIGHTS = (10.0, 2.0, 5.0, 4.0)
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+# One document per restaurant; product names are concatenated into ``products``
+_DOCUMENTS_SQL = (
+    "SELECT r.id, r.name, r.description, r.category, "
+    "COALESCE((SELECT group_concat(p.name, ' ') FROM restaurants_product p WHERE p.restaurant_id = r.id), '') "
+    "FROM restaurants_restaurant r"
+)
+_INSERT_SQL = f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, category, products) "
+
+_available: bool | None = None
+
+
+def clear_index_cache() -> None:
+    """Forget whether the index exists; migrations may have created or dropped it."""
+    global _available
+    _available = None
+
+
+def index_available() -> bool:
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def reindex_restaurants(restaurant_ids: Iterable[int]) -> None:
+    """Refresh the index rows of the given restaurants (deleted ones are dropped)."""
+    restaurant_ids = sorted(set(restaurant_ids))
+    if not restaurant_ids or not index_available():
+        return
+    placeholders = ', '.join(['%s'] * len(restaurant_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", restaurant_ids)
+        cursor.execute(_INSERT_SQL + _DOCUMENTS_SQL + f" WHERE r.id IN ({placeholders})", restaurant_ids)
+
+
+def rebuild_index() -> int:
+    """Recreate every index row; returns the number of restaurants indexed."""
+    if not index_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(_INSERT_SQL + _DOCUMENTS_SQL)
+        indexed = cursor.rowcount
+        # Merge the b-tree segments left by the bulk insert
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def match_expression(term: str) -> str:
+    """Turn user input into an FTS5 query: every word must match as a prefix."""
+    # Quoting each token keeps FTS5 operators (AND, NEAR, ``*``, ``:``) literal
+    return ' '.join(f'"{token}"*' for token in _TOKEN.findall(term))
+
+
+def search_restaurants(
+    term: str,
+    queryset: models.QuerySet | None = None,
+    ranked: bool = True,
+) -> models.QuerySet:
+    """
+    Filter ``queryset`` (default: all restaurants) down to matches for ``term``.
+
+    With the FTS index this is a single query joined to the index and, if
+    ``ranked``, ordered by relevance (best first). Pass ``ranked=False``
+    when the caller imposes its own ordering (e.g. keyset pagination).
+    The result stays a lazy queryset that callers can filter or slice.
+    """
+    queryset = Restaurant.objects.all() if queryset is None else queryset
+    if not index_available():
+        return queryset.filter(
+            models.Q(name__icontains=term)
+            | models.Q(description__icontains=term)
+            | models.Q(category__icontains=term)
+            | models.Q(pk__in=Restaurant.objects.filter(products__name__icontains=term).values('pk'))
+        )
+
+    expression = match_expression(term)
+    if not expression:
+        return queryset.none()
+    if not ranked:
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [expression],
+        ))
+    table = Restaurant._meta.db_table
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[f'{SEARCH_TABLE}.rowid = {table}.id', f'{SEARCH_TABLE} MATCH %s'],
+        params=[expression],
+        select={'search_rank': f"bm25({SEARCH_TABLE}, {', '.join(map(str, _WEIGHTS))})"},
+        order_by=['search_rank'],
+    )
@@ -0,0 +1,167 @@
+"""
+Signal handlers for the restaurants app.
+
+Keep derived data in step with restaurant and product edits:
+
+- the full-text search index (`restaurants.search`);
+- the per-restaurant menu cache (`restaurants.menu_cache`).
+
+Changed restaurants are collected per thread and processed once the
+surrounding transaction commits, so deleting a restaurant with hundreds
+of products reindexes it and bumps its menu version once, and readers
+never cache a menu from uncommitted data.
+
+Saving a restaurant also re-parses ``open_hours`` into its
+`RestaurantOpenInterval` rows and geocodes a changed ``address`` into
+``latitude``/``longitude``, which also updates the spatial index of
+`restaurants.nearby` after commit. With ``PRERENDER_MENU_FRAGMENTS`` a
+saved product's menu card is rendered into the fragment cache after
+commit.
+
+Review changes adjust the rating aggregates of the product and its
+restaurant (`restaurants.ratings`) and drop that restaurant's cached menu.
+"""
+from __future__ import annotations
+
+import threading
+
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save  # type: ignore
+from django.dispatch import receiver  # type: ignore
+
+from core.geocoding import GeocodingError, geocode
+
+from .fragments import prerender_product_cards
+from .menu_cache import invalidate_menu
+from .nearby import restaurant_index
+from .models import Product, Restaurant, Review
+from .ratings import adjust_rating
+from .search import clear_index_cache, reindex_restaurants
+
+# Fields that feed the search document
+_RESTAURANT_FIELDS = frozenset({'name', 'description', 'category'})
+_PRODUCT_FIELDS = frozenset({'name', 'restaurant'})
+_HOURS_FIELDS = frozenset({'open_hours'})
+_ADDRESS_FIELDS = frozenset({'address'})
+# Product fields that are not part of the cached menu
+_STOCK_FIELDS = frozenset({'quantity', 'updated_at'})
+
+_pending = threading.local()
+
+
+def _flush() -> None:
+    search, menus = getattr(_pending, 'search', None), getattr(_pending, 'menus', None)
+    _pending.search, _pending.menus = set(), set()
+    if search:
+        reindex_restaurants(search)
+    for restaurant_id in menus or ():
+        invalidate_menu(restaurant_id)
+
+
+def _schedule(restaurant_id: int, *, search: bool = True, menu: bool = True) -> None:
+    if not hasattr(_pending, 'search'):
+        _pending.search, _pending.menus = set(), set()
+    if search:
+        _pending.search.add(restaurant_id)
+    if menu:
+        _pending.menus.add(restaurant_id)
+    # Later callbacks of the same transaction find the sets already flushed
+    transaction.on_commit(_flush)
+
+
+def _touches(update_fields, fields: frozenset) -> bool:
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=Restaurant, dispatch_uid='restaurants_search_restaurant_saved')
+def index_saved_restaurant(sender, instance: Restaurant, update_fields=None, **kwargs) -> None:
+    _schedule(instance.pk, search=_touches(update_fields, _RESTAURANT_FIELDS))
+
+
+@receiver(post_save, sender=Product, dispatch_uid='restaurants_search_product_saved')
+def index_saved_product(sender, instance: Product, update_fields=None, **kwargs) -> None:
+    search = _touches(update_fields, _PRODUCT_FIELDS)
+    menu = update_fields is None or not set(update_fields) <= _STOCK_FIELDS
+    if search or menu:
+        _schedule(instance.restaurant_id, search=search, menu=menu)
+
+
+@receiver(post_delete, sender=Restaurant, dispatch_uid='restaurants_search_restaurant_deleted')
+@receiver(post_delete, sender=Product, dispatch_uid='restaurants_search_product_deleted')
+def index_deleted(sender, instance, **kwargs) -> None:
+    _schedule(instance.pk if sender is Restaurant else instance.restaurant_id)
+
+
+@receiver(post_migrate, dispatch_uid='restaurants_search_migrated')
+def forget_search_index(sender, **kwargs) -> None:
+    # 0002_search_index creates the table (or not, without FTS5)
+    clear_index_cache()
+
+
+@receiver(post_save, sender=Restaurant, dispatch_uid='restaurants_sync_open_intervals')
+def sync_open_intervals(sender, instance: Restaurant, update_fields=None, **kwargs) -> None:
+    if _touches(update_fields, _HOURS_FIELDS):
+        instance.sync_open_intervals()
+
+
+@receiver(post_save, sender=Restaurant, dispatch_uid='restaurants_geocode_address')
+def geocode_address(sender, instance: Restaurant, update_fields=None, **kwargs) -> None:
+    if not _touches(update_fields, _ADDRESS_FIELDS):
+        return
+    try:
+        point = geocode(instance.address)
+    except GeocodingError:
+        point = None  # retried by manage.py geocode_addresses
+    latitude, longitude = point or (None, None)
+    if (latitude, longitude) != (instance.latitude, instance.longitude):
+        instance.latitude, instance.longitude = latitude, longitude
+        Restaurant.objects.filter(pk=instance.pk).update(latitude=latitude, longitude=longitude)
+    restaurant_pk = instance.pk
+    transaction.on_commit(lambda: restaurant_index.upsert(restaurant_pk, point))
+
+
+@receiver(post_delete, sender=Restaurant, dispatch_uid='restaurants_spatial_deleted')
+def unindex_deleted_restaurant(sender, instance: Restaurant, **kwargs) -> None:
+    restaurant_pk = instance.pk
+    transaction.on_commit(lambda: restaurant_index.discard(restaurant_pk))
+
+
+@receiver(post_save, sender=Product, dispatch_uid='restaurants_prerender_product_card')
+def prerender_product_card(sender, instance: Product, update_fields=None, **kwargs) -> None:
+    if not getattr(settings, 'PRERENDER_MENU_FRAGMENTS', False) or not instance.is_available:
+        return
+    if update_fields is not None and set(update_fields) <= _STOCK_FIELDS:
+        return
+    transaction.on_commit(lambda: prerender_product_cards([instance]))
+
+
+@receiver(pre_save, sender=Review, dispatch_uid='restaurants_rating_review_before')
+def remember_review(sender, instance: Review, raw=False, **kwargs) -> None:
+    # The rating (and product) being replaced, so post_save can apply the difference
+    instance._rated = None
+    if instance.pk is not None and not raw:
+        instance._rated = Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review, dispatch_uid='restaurants_rating_review_saved')
+def rate_saved_review(sender, instance: Review, created: bool, raw=False, **kwargs) -> None:
+    if raw:
+        return  # fixtures: manage.py rebuild_ratings
+    before = None if created else getattr(instance, '_rated', None)
+    if before == (instance.product_id, instance.rating):
+        return
+    if before is not None:
+        _rated(*before, count=-1)
+    _rated(instance.product_id, instance.rating, count=1)
+
+
+@receiver(post_delete, sender=Review, dispatch_uid='restaurants_rating_review_deleted')
+def unrate_deleted_review(sender, instance: Review, **kwargs) -> None:
+    _rated(instance.product_id, instance.rating, count=-1)
+
+
+def _rated(product_id: int, rating: int, *, count: int) -> None:
+    restaurant_id = adjust_rating(product_id, count, count * rating)
+    if restaurant_id is not None:
+        _schedule(restaurant_id, search=False)
@@ -0,0 +1,62 @@
+"""
+Stock reservation for products.
+
+Stock is never read into Python and written back. Reservations are
+guarded ``UPDATE ... SET quantity = quantity - n WHERE quantity >= n``
+statements, so two concurrent checkouts cannot both take the last unit,
+and releases add the quantity back in one batched ``UPDATE``.
+
+`reserve_stock` does not roll anything back by itself: call it inside
+the checkout transaction and abort the transaction when it reports
+failures.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from django.db.models import Case, F, IntegerField, Value, When  # type: ignore
+
+from .models import Product
+
+
+def _totals(lines: Iterable[tuple[int, int]]) -> Counter[int]:
+    totals: Counter[int] = Counter()
+    for product_id, quantity in lines:
+        if quantity > 0:
+            totals[product_id] += quantity
+    return totals
+
+
+def reserve_stock(lines: Iterable[tuple[int, int]]) -> list[int]:
+    """
+    Take ``quantity`` units of each ``(product_id, quantity)`` line.
+
+    Returns the ids of products that did not have enough stock (empty
+    list on success). Products that could be reserved stay decremented,
+    so callers must run this inside a transaction and roll back on failure.
+    """
+    failed: list[int] = []
+    for product_id, quantity in sorted(_totals(lines).items()):
+        updated = (
+            Product.objects
+            .filter(pk=product_id, quantity__gte=quantity)
+            .update(quantity=F('quantity') - quantity)
+        )
+        if not updated:
+            failed.append(product_id)
+    return failed
+
+
+def release_stock(lines: Iterable[tuple[int, int]]) -> None:
+    """Return ``(product_id, quantity)`` lines to stock in one statement."""
+    totals = _totals(lines)
+    if not totals:
+        return
+    Product.objects.filter(pk__in=list(totals)).update(
+        quantity=F('quantity') + Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in totals.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
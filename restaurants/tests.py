@@ -0,0 +1,222 @@
+"""
+Tests for stock reservation under concurrent checkouts, location query
+parsing, the listing validators and the rating aggregates.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection, transaction  # type: ignore
+from django.db.models import Count, Sum  # type: ignore
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from accounts.models import User
+from orders.cart import resolve_cart
+from orders.models import Order
+from orders.services import OutOfStockError, place_order
+from .models import Product, Restaurant, Review
+from .hours import restaurant_now
+from .nearby import parse_radius
+from .ratings import rebuild_ratings
+from .stock import reserve_stock
+
+STOCK = 5
+BUYERS = 12
+
+
+@override_settings(PAYMENT_PROVIDER='fake')
+class ConcurrentStockTests(TransactionTestCase):
+    """Many buyers racing for the last units of one product."""
+
+    def setUp(self):
+        owner = User.objects.create_user(username='stock-owner', role=User.ROLE_OWNER)
+        restaurant = Restaurant.objects.create(name='Stock test', owner=owner)
+        self.product = Product.objects.create(
+            restaurant=restaurant, name='Burek', price=Decimal('3.50'), quantity=STOCK,
+        )
+        self.buyers = [User.objects.create_user(username=f'stock-buyer-{i}') for i in range(BUYERS)]
+
+    def _race(self, buy) -> tuple[int, list[Exception]]:
+        """Run ``buy(index)`` from BUYERS threads at once; returns (successes, unexpected errors)."""
+        successes: list[int] = []
+        errors: list[Exception] = []
+        lock = threading.Lock()
+        start = threading.Barrier(BUYERS)
+
+        def work(index: int) -> None:
+            try:
+                start.wait()
+                if buy(index):
+                    with lock:
+                        successes.append(index)
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(BUYERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return len(successes), errors
+
+    def assertStockConsistent(self, successes: int) -> None:
+        remaining = Product.objects.values_list('quantity', flat=True).get(pk=self.product.pk)
+        self.assertGreaterEqual(remaining, 0)
+        self.assertLessEqual(successes, STOCK)
+        self.assertEqual(successes + remaining, STOCK)
+
+    def test_reserve_stock_never_oversells(self):
+        def buy(index: int) -> bool:
+            with transaction.atomic():
+                failed = reserve_stock([(self.product.pk, 1)])
+                if failed:
+                    transaction.set_rollback(True)
+            return not failed
+
+        successes, errors = self._race(buy)
+        self.assertEqual(errors, [])
+        self.assertEqual(successes, STOCK)
+        self.assertStockConsistent(successes)
+
+    def test_place_order_never_oversells(self):
+        def buy(index: int) -> bool:
+            try:
+                place_order(
+                    user=self.buyers[index],
+                    cart=resolve_cart({str(self.product.pk): 1}),
+                    delivery_address='',
+                )
+            except OutOfStockError:
+                return False
+            return True
+
+        successes, errors = self._race(buy)
+        self.assertEqual(errors, [])
+        self.assertStockConsistent(successes)
+        self.assertEqual(Order.objects.count(), successes)
+
+
+class ParseRadiusTests(SimpleTestCase):
+    def test_positive_finite_radius(self):
+        self.assertEqual(parse_radius('2.5'), 2.5)
+
+    def test_unusable_radius_falls_back_to_default(self):
+        for value in (None, '', '0', '-3', 'inf', '-inf', 'nan', '1e999'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_radius(value))
+
+    def test_not_a_number(self):
+        with self.assertRaises(ValueError):
+            parse_radius('far')
+
+
+class CatalogEtagTests(TestCase):
+    """The listing ETag follows opening hours without reading every open restaurant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='etag-owner', role=User.ROLE_OWNER)
+        Restaurant.objects.create(name='Lunch', owner=owner, open_hours='09:00-14:00')
+        Restaurant.objects.create(name='Late', owner=owner, open_hours='18:00-02:00')
+
+    def _etag(self, hour: int, minute: int = 0) -> str:
+        moment = restaurant_now().replace(hour=hour, minute=minute)
+        with mock.patch('restaurants.views.restaurant_now', return_value=moment):
+            return self.client.get(reverse('home'))['ETag']
+
+    def test_stable_between_boundaries(self):
+        self.assertEqual(self._etag(9, 30), self._etag(13, 59))
+        self.assertEqual(self._etag(0, 0), self._etag(1, 59))
+
+    def test_changes_when_a_restaurant_opens_or_closes(self):
+        etags = [self._etag(0, 30), self._etag(8), self._etag(9), self._etag(14), self._etag(18)]
+        self.assertEqual(len(set(etags)), len(etags))
+        # Closed from 02:00 to 09:00 either way
+        self.assertEqual(self._etag(2), self._etag(8, 59))
+
+    def test_validator_query_count_does_not_grow(self):
+        owner = User.objects.get(username='etag-owner')
+        moment = restaurant_now().replace(hour=10, minute=0)
+        with mock.patch('restaurants.views.restaurant_now', return_value=moment):
+            for more in (0, 20):
+                Restaurant.objects.bulk_create([
+                    Restaurant(name=f'More {more}-{i}', owner=owner, open_hours='09:00-14:00') for i in range(more)
+                ])
+                etag = self.client.get(reverse('home'))['ETag']
+                # One aggregate over the restaurants, one over the opening intervals
+                with self.assertNumQueries(2):
+                    response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+
+class RatingAggregateTests(TestCase):
+    """``rating_count``/``rating_sum`` always equal what the reviews add up to."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='rating-owner', role=User.ROLE_OWNER)
+        cls.pizzeria = Restaurant.objects.create(name='Rated pizzeria', owner=owner)
+        cls.grill = Restaurant.objects.create(name='Rated grill', owner=owner)
+        cls.pizza = Product.objects.create(restaurant=cls.pizzeria, name='Pizza', price=Decimal('8.00'))
+        cls.calzone = Product.objects.create(restaurant=cls.pizzeria, name='Calzone', price=Decimal('9.00'))
+        cls.kebab = Product.objects.create(restaurant=cls.grill, name='Kebab', price=Decimal('6.00'))
+        cls.reviewers = [User.objects.create_user(username=f'rating-reviewer-{i}') for i in range(3)]
+
+    def assertAggregatesMatchReviews(self):
+        for model, path in ((Product, 'reviews'), (Restaurant, 'products__reviews')):
+            recomputed = model.objects.annotate(
+                review_count=Count(f'{path}__id'), review_sum=Sum(f'{path}__rating', default=0),
+            ).values_list('pk', 'review_count', 'review_sum')
+            stored = model.objects.values_list('pk', 'rating_count', 'rating_sum')
+            with self.subTest(model=model.__name__):
+                self.assertEqual(sorted(stored), sorted(recomputed))
+
+    def test_signals_follow_review_changes(self):
+        first, second, third = self.reviewers
+        reviews = [
+            Review.objects.create(product=self.pizza, user=first, rating=5),
+            Review.objects.create(product=self.pizza, user=second, rating=2),
+            Review.objects.create(product=self.calzone, user=first, rating=4),
+            Review.objects.create(product=self.kebab, user=third, rating=3),
+        ]
+        self.assertAggregatesMatchReviews()
+        self.pizzeria.refresh_from_db()
+        self.assertEqual((self.pizzeria.rating_count, self.pizzeria.rating_sum), (3, 11))
+
+        reviews[1].rating = 1
+        reviews[1].save()
+        self.assertAggregatesMatchReviews()
+
+        # Moving a review to another restaurant's product moves its stars too
+        reviews[2].product = self.kebab
+        reviews[2].save()
+        self.assertAggregatesMatchReviews()
+
+        reviews[0].delete()
+        self.assertAggregatesMatchReviews()
+
+        self.pizza.delete()
+        self.assertAggregatesMatchReviews()
+        self.pizzeria.refresh_from_db()
+        self.assertEqual((self.pizzeria.rating_count, self.pizzeria.rating_sum), (0, 0))
+
+    def test_rebuild_after_bulk_writes(self):
+        first, second, _ = self.reviewers
+        Review.objects.create(product=self.kebab, user=first, rating=4)
+        # Bypass the signals, as fixtures and data fixes do
+        Review.objects.bulk_create([
+            Review(product=self.pizza, user=first, rating=5),
+            Review(product=self.calzone, user=second, rating=3),
+        ])
+        Review.objects.filter(product=self.kebab).update(rating=2)
+
+        self.assertEqual(rebuild_ratings(), {self.pizzeria.pk, self.grill.pk})
+        self.assertAggregatesMatchReviews()
+        self.assertEqual(rebuild_ratings(), set())
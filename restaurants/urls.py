@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import (
-    RestaurantListView, RestaurantDetailView,
+    RestaurantListView, RestaurantSearchView, RestaurantDetailView,
     OwnerRestaurantListView, RestaurantCreateView, RestaurantUpdateView,
     OwnerRestaurantProductsView, ProductCreateView, ProductUpdateView, ProductDeleteView,
 )
@@ -9,6 +9,7 @@ app_name = 'restaurants'
 
 urlpatterns = [
     path('', RestaurantListView.as_view(), name='list'),
+    path('search/', RestaurantSearchView.as_view(), name='search'),
     path('<int:pk>/', RestaurantDetailView.as_view(), name='detail'),
 
     path('owner/create/', RestaurantCreateView.as_view(), name='create'),
@@ -1,19 +1,80 @@
 from __future__ import annotations
 
+from datetime import datetime
+from functools import partial
 from typing import Any
-from django.db import models
 from django.contrib.auth.mixins import LoginRequiredMixin  # type: ignore
 from django.core.exceptions import PermissionDenied  # type: ignore
 from django.shortcuts import get_object_or_404, redirect  # type: ignore
-from django.urls import reverse_lazy  # type: ignore
+from django.urls import reverse, reverse_lazy  # type: ignore
+from django.utils.text import Truncator  # type: ignore
 from django.views import View  # type: ignore
-from django.views.generic import ListView, DetailView, CreateView, UpdateView  # type: ignore
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView  # type: ignore
 from django.contrib import messages  # type: ignore
 
-from .models import Restaurant, Product
+from .models import Restaurant, RestaurantOpenInterval, Product
 from .forms import RestaurantForm, ProductForm
-
-from django.http import HttpResponse  # type: ignore
+from .hours import minute_of_day, restaurant_now
+from .menu_cache import get_menu, menu_version
+from .nearby import parse_point, parse_radius, restaurants_within
+from .search import search_restaurants
+from core.conditional import Validators, conditional
+from core.pagination import InvalidCursor, paginate_keyset
+
+from django.db.models import Count, Max, Q  # type: ignore
+from django.http import HttpResponse, JsonResponse  # type: ignore
+
+
+# --- Conditional GET validators (a few aggregate queries, no rendering) ---
+
+def _catalog_state(request) -> tuple:
+    """Version of the restaurant catalog as far as listings and search results can tell."""
+    state = Restaurant.objects.aggregate(updated=Max('updated_at'), count=Count('id'))
+    parts: tuple = (state['updated'], state['count'])
+    if request.GET.get('q', '').strip():
+        # Search also matches product names
+        products = Product.objects.aggregate(updated=Max('updated_at'), count=Count('id'))
+        parts += (products['updated'], products['count'])
+    # Open/closed badges change with the clock, not with updated_at
+    parts += (_opening_boundary(),)
+    return parts
+
+
+def _opening_boundary() -> int:
+    """
+    The last opening or closing minute of the day at or before now (-1 before
+    the first). Opening hours repeat daily and every edit bumps the
+    restaurant's updated_at, so the set of open restaurants only changes
+    when this does.
+    """
+    minute = minute_of_day(restaurant_now())
+    bounds = RestaurantOpenInterval.objects.aggregate(
+        opened=Max('start_minute', filter=Q(start_minute__lte=minute)),
+        closed=Max('end_minute', filter=Q(end_minute__lte=minute)),
+    )
+    return max((value for value in bounds.values() if value is not None), default=-1)
+
+
+def _listing_validators(request, *args, **kwargs) -> Validators:
+    # No Last-Modified: the open-now part of the page changes without any row changing
+    return Validators(_catalog_state(request))
+
+
+def _categories_validators(request, *args, **kwargs) -> Validators:
+    state = Restaurant.objects.aggregate(updated=Max('updated_at'), count=Count('id'))
+    return Validators((state['updated'], state['count']), state['updated'])
+
+
+def _detail_validators(request, *args, **kwargs) -> Validators | None:
+    row = (
+        Restaurant.objects.filter(pk=kwargs['pk'])
+        .annotate(menu_updated=Max('products__updated_at'), menu_count=Count('products'))
+        .values_list('updated_at', 'menu_updated', 'menu_count')
+        .first()
+    )
+    if row is None:
+        return None
+    return Validators(row, max(value for value in row[:2] if value is not None))
 
 
 class HomeView(ListView):
@@ -23,17 +84,56 @@ class HomeView(ListView):
     context_object_name = 'restaurants'
 
     def get_queryset(self):
-        qs = Restaurant.objects.filter(is_open=True)
+        qs = Restaurant.objects.filter(is_open=True).with_open_now()
+        if self.request.GET.get("open_now") in ("1", "true"):
+            qs = qs.open_now()
         term = self.request.GET.get("q", "").strip()
-        if term:
-            qs = qs.filter(
-                models.Q(name__icontains=term) | models.Q(description__icontains=term)
-            )
-        return qs
+        near = self._near()
+        if near is not None:
+            # Distances come from the spatial index; only the ids in range are queried
+            distances = {pk: distance for distance, pk in restaurants_within(*near)}
+            qs = qs.filter(pk__in=distances)
+        if self._sort() == 'rating':
+            # Stored aggregates, so this is a plain ORDER BY
+            if term:
+                qs = search_restaurants(term, qs, ranked=False)
+            qs = qs.by_rating()
+        elif term:
+            # Ranked full-text match over names, categories and product names
+            qs = search_restaurants(term, qs)
+        else:
+            # Restaurants that are open right now first
+            qs = qs.order_by('-is_open_now', 'name')
+        if near is None:
+            return qs
+        restaurants = list(qs)
+        for restaurant in restaurants:
+            restaurant.distance_km = distances[restaurant.pk]
+        if not term and self._sort() != 'rating':
+            restaurants.sort(key=lambda restaurant: restaurant.distance_km)
+        return restaurants
+
+    def _sort(self) -> str:
+        return self.request.GET.get("sort", "")
+
+    def _near(self) -> tuple | None:
+        """``?near=lat,lng`` (and optional ``&radius=km``), or ``None`` when absent or malformed."""
+        try:
+            point = parse_point(self.request.GET['near'])
+            radius = parse_radius(self.request.GET.get('radius'))
+        except (KeyError, ValueError):
+            return None
+        return point, radius
+
+    @conditional(_listing_validators)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         ctx = super().get_context_data(**kwargs)
         ctx['search_term'] = self.request.GET.get("q", "")
+        ctx['near'] = self.request.GET.get("near", "") if self._near() else ""
+        ctx['sort'] = self._sort()
         return ctx
 
 
@@ -44,10 +144,95 @@ class OwnerRequiredMixin(LoginRequiredMixin):
         return super().dispatch(request, *args, **kwargs)
 
 
-class RestaurantListView(ListView):
-    model = Restaurant
+class RestaurantListView(TemplateView):
+    """Restaurant browser; the cards themselves are loaded page by page from `RestaurantSearchView`."""
     template_name = 'restaurants/restaurant_list.html'
-    context_object_name = 'restaurants'
+
+    @conditional(_categories_validators)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        ctx = super().get_context_data(**kwargs)
+        ctx['categories'] = (
+            Restaurant.objects.exclude(category='')
+            .order_by('category').values_list('category', flat=True).distinct()
+        )
+        return ctx
+
+
+def _parse_open_at(value: str) -> datetime | None:
+    """``HH:MM`` in restaurant local time today → aware datetime (``None`` if empty)."""
+    if not value:
+        return None
+    hour, _, minute = value.partition(':')
+    return restaurant_now().replace(hour=int(hour), minute=int(minute or 0), second=0, microsecond=0)
+
+
+class RestaurantSearchView(View):
+    """
+    JSON search over restaurants with keyset pagination.
+
+    GET parameters: ``q`` (full-text), ``category``, ``open_now=1`` or
+    ``open_at=HH:MM`` (local time today), ``limit`` and ``cursor`` (the
+    ``next`` value of the previous page).
+    """
+    ordering = ('name', 'id')
+
+    @conditional(_listing_validators)
+    def get(self, request, *args, **kwargs) -> JsonResponse:
+        qs = Restaurant.objects.only(
+            'id', 'name', 'description', 'category', 'image_url', 'open_hours', 'is_open',
+            'rating_count', 'rating_sum',
+        )
+        term = request.GET.get('q', '').strip()
+        if term:
+            qs = search_restaurants(term, qs, ranked=False)
+        category = request.GET.get('category', '').strip()
+        if category:
+            qs = qs.filter(category=category)
+
+        try:
+            moment = _parse_open_at(request.GET.get('open_at', ''))
+            limit = int(request.GET.get('limit', 24))
+            qs = qs.with_open_now(moment)
+            if moment is not None:
+                qs = qs.open_at(moment)
+            elif request.GET.get('open_now') in ('1', 'true'):
+                qs = qs.open_now()
+            page = paginate_keyset(qs, self.ordering, request.GET.get('cursor') or None, limit)
+        except (ValueError, InvalidCursor):
+            return JsonResponse({'error': 'Invalid open_at, limit or cursor.'}, status=400)
+
+        return JsonResponse({
+            'results': [
+                {
+                    'id': r.pk,
+                    'name': r.name,
+                    'category': r.category,
+                    'description': Truncator(r.description).chars(100),
+                    'image_url': r.image_url,
+                    'open_hours': r.open_hours,
+                    'is_open_now': r.is_open_now,
+                    'rating': r.rating,
+                    'rating_count': r.rating_count,
+                    'url': reverse('restaurants:detail', args=[r.pk]),
+                }
+                for r in page.items
+            ],
+            'next': page.next_cursor,
+        })
+
+
+# Menu orderings on top of the cached menu (which is sorted by name); ratings are stored aggregates
+_MENU_SORTS = {
+    'rating': lambda product: (product.rating is None, -(product.rating or 0), -product.rating_count, product.name),
+}
+
+
+def _sorted_menu(restaurant_id: int, sort: str) -> list[Product]:
+    menu = get_menu(restaurant_id)
+    return sorted(menu, key=_MENU_SORTS[sort]) if sort else menu
 
 
 class RestaurantDetailView(DetailView):
@@ -55,9 +240,18 @@ class RestaurantDetailView(DetailView):
     template_name = 'restaurants/restaurant_detail.html'
     context_object_name = 'restaurant'
 
+    @conditional(_detail_validators)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context['products'] = self.object.products.filter(is_available=True)
+        # Served from the versioned menu cache (restaurants/menu_cache.py). The template
+        # caches the rendered menu per version and sort, so the callable is only invoked on a miss.
+        sort = self.request.GET.get('sort', '')
+        context['menu_version'] = menu_version(self.object.pk)
+        context['menu_sort'] = sort if sort in _MENU_SORTS else ''
+        context['products'] = partial(_sorted_menu, self.object.pk, context['menu_sort'])
         return context
 
 